@@ -0,0 +1,194 @@
+"""Асинхронные (ASGI) версии горячих эндпоинтов чтения.
+
+Под uvicorn эти представления выполняются в цикле событий. Async ORM в
+Django 4.2 — обёртка ``sync_to_async(thread_sensitive=True)``: запросы к
+БД всех одновременных запросов воркера выполняются по очереди в одном
+общем потоке, поэтому на запросах к БД воркер не обслуживает больше
+клиентов, чем синхронный; ожидающий запрос лишь не занимает свой поток.
+Данные читаются async ORM, включая ``prefetch_related``; дальше
+используются те же сериализаторы DRF, что и в синхронных viewset — к
+моменту сериализации всё уже загружено, так что ответ совпадает с
+синхронным байт в байт. Случайный запрос к БД из сериализатора здесь
+упадёт с ``SynchronousOnlyOperation``, а не заблокирует цикл.
+
+Аутентификация — тот же токен ``Authorization: Token <key>``, что и в
+синхронном API; сессии не поддерживаются.
+"""
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib.auth.models import AnonymousUser
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.utils.translation import gettext as _
+from rest_framework import exceptions
+from rest_framework.authtoken.models import Token
+from rest_framework.request import Request
+
+from exercises.autocomplete import autocomplete
+from exercises.catalog import CONTEXT_KEY, catalog, list_response
+from foodgram.pagination import parse_limit
+from foodgram.renderers import ORJSONRenderer
+from workout_plans import response_cache, short_links
+from workout_plans.read_serializer import (
+    ITEMS_CONTEXT_KEY,
+    WorkoutPlanReadSerializer,
+    load_items,
+)
+from workout_plans.views import WorkoutPlanViewSet
+
+TOKEN_KEYWORD = "token"
+
+
+def _render(data, status=200):
+    return HttpResponse(
+        ORJSONRenderer().render(data),
+        status=status,
+        content_type="application/json",
+    )
+
+
+def async_api_view(view):
+    """GET-представление: DRF-обёртка запроса, токен, ошибки как в DRF."""
+
+    @wraps(view)
+    async def wrapper(request, *args, **kwargs):
+        if request.method not in ("GET", "HEAD"):
+            exc = exceptions.MethodNotAllowed(request.method)
+            response = _render({"detail": exc.detail}, exc.status_code)
+            response["Allow"] = "GET, HEAD"
+            return response
+        drf_request = Request(request)
+        try:
+            drf_request.user = await _authenticate(request)
+            return await view(drf_request, *args, **kwargs)
+        except exceptions.APIException as exc:
+            detail = exc.detail
+            if not isinstance(detail, (list, dict)):
+                detail = {"detail": detail}
+            response = _render(detail, exc.status_code)
+            if isinstance(exc, exceptions.AuthenticationFailed):
+                response["WWW-Authenticate"] = "Token"
+            return response
+
+    return wrapper
+
+
+async def _authenticate(request):
+    """Асинхронный аналог TokenAuthentication."""
+    auth = request.headers.get("Authorization", "").split()
+    if not auth or auth[0].lower() != TOKEN_KEYWORD:
+        return AnonymousUser()
+    if len(auth) != 2:
+        raise exceptions.AuthenticationFailed(_(
+            "Invalid token header. Token string should not contain spaces."
+        ))
+    token = await Token.objects.select_related("user").filter(
+        key=auth[1],
+    ).afirst()
+    if token is None:
+        raise exceptions.AuthenticationFailed(_("Invalid token."))
+    if not token.user.is_active:
+        raise exceptions.AuthenticationFailed(
+            _("User inactive or deleted.")
+        )
+    return token.user
+
+
+def _plan_view(request, action, **kwargs):
+    view = WorkoutPlanViewSet(
+        request=request, args=(), kwargs=kwargs, format_kwarg=None,
+        action=action,
+    )
+    view.shared_response = response_cache.is_cacheable(request)
+    return view
+
+
+def _filter_queryset(view):
+    queryset = view.get_queryset()
+    for backend in view.filter_backends:
+        queryset = backend().filter_queryset(view.request, queryset, view)
+    return queryset
+
+
+async def _serializer_context(view, plan_ids):
+    # Снимок каталога и строки планов читаются заранее и в потоке:
+    # сериализатор в цикле событий к БД не обращается.
+    context = view.get_serializer_context()
+    if "exercises" not in view.requested_fields():
+        return context
+    snapshot = context[CONTEXT_KEY] = await sync_to_async(catalog.get)()
+    context[ITEMS_CONTEXT_KEY] = await sync_to_async(load_items)(
+        plan_ids, snapshot
+    )
+    return context
+
+
+@async_api_view
+async def plan_list(request):
+    cacheable = response_cache.is_cacheable(request)
+    key = await response_cache.alist_key(request) if cacheable else None
+    data = await response_cache.aload(key) if cacheable else None
+    if data is None:
+        view = _plan_view(request, "list")
+        paginator = view.paginator
+        page = await paginator.apaginate_queryset(
+            _filter_queryset(view), request, view
+        )
+        serializer = WorkoutPlanReadSerializer(
+            page, many=True, context=await _serializer_context(
+                view, [row["id"] for row in page]
+            ),
+        )
+        data = paginator.get_paginated_response(serializer.data).data
+        if not cacheable:
+            return _render(data)
+        await response_cache.astore(key, data)
+    plans = data["results"] if isinstance(data, dict) else data
+    await response_cache.aoverlay_favorited(plans, request.user)
+    return _render(data)
+
+
+@async_api_view
+async def plan_detail(request, pk):
+    cacheable = response_cache.is_cacheable(request)
+    key = await response_cache.adetail_key(request, pk) if cacheable else None
+    data = await response_cache.aload(key) if cacheable else None
+    if data is None:
+        view = _plan_view(request, "retrieve", pk=pk)
+        queryset = view.get_queryset()
+        plan = await queryset.filter(pk=pk).afirst()
+        if plan is None:
+            # То же сообщение, что у get_object_or_404 в синхронном API.
+            raise exceptions.NotFound(
+                f"No {queryset.model._meta.object_name} matches the given "
+                "query."
+            )
+        data = WorkoutPlanReadSerializer(
+            plan, context=await _serializer_context(view, [plan["id"]])
+        ).data
+        if not cacheable:
+            return _render(data)
+        await response_cache.astore(key, data)
+    await response_cache.aoverlay_favorited([data], request.user)
+    return _render(data)
+
+
+@async_api_view
+async def exercise_list(request):
+    name = request.query_params.get("name")
+    if name:
+        # Индекс в памяти; обращение к БД — только при его перестройке.
+        return _render(await sync_to_async(autocomplete.search)(
+            name, parse_limit(request.query_params.get("limit")),
+        ))
+    return await sync_to_async(list_response)(request)
+
+
+async def redirect_by_hash(request, url_hash):
+    workout_plan_id = await short_links.aresolve(url_hash)
+    if workout_plan_id is None:
+        raise Http404("Ссылка не найдена")
+    return HttpResponseRedirect(
+        f"{settings.BASE_URL}/api/workout-plans/{workout_plan_id}"
+    )
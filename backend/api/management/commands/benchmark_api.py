@@ -0,0 +1,177 @@
+import json
+import platform
+import statistics
+import subprocess
+import time
+from contextlib import nullcontext
+
+import django
+from django.conf import settings
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+
+from api import scenarios, synthetic
+from foodgram.benchmarking import summarize
+from workout_plans import short_links
+
+# Точки сохранения появляются только из-за отката запросов на запись.
+SAVEPOINT_PREFIXES = ('SAVEPOINT', 'RELEASE SAVEPOINT', 'ROLLBACK TO')
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            cwd=settings.BASE_DIR, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a reproducible synthetic dataset into a throwaway test '
+        'database and measure latency and queries per request for every '
+        'route in api/urls.py'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=1.0,
+            help='Dataset size multiplier (1.0 = 5000 plans, 1000 users)',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--requests', type=int, default=100,
+            help='Warm requests per route after the first (cold) one',
+        )
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument(
+            '--compare', metavar='JSON',
+            help='Print the difference with a previous result file',
+        )
+
+    def handle(self, *args, **options):
+        scenarios.check_coverage()
+        size = synthetic.DatasetSize().scaled(options['scale'])
+
+        with synthetic.seeded_database(
+            size, options['seed'], options['verbosity'], self.stdout
+        ) as user:
+            routes = self.measure(user, options['requests'])
+
+        results = {
+            'meta': {
+                'commit': git_commit(),
+                'database': connection.vendor,
+                'django': django.get_version(),
+                'python': platform.python_version(),
+                'requests': options['requests'],
+                'seed': options['seed'],
+                'size': vars(size),
+            },
+            'routes': routes,
+            'skipped': scenarios.SKIPPED,
+        }
+        with open(options['output'], 'w', encoding='utf-8') as file:
+            json.dump(
+                results, file, ensure_ascii=False, indent=2, sort_keys=True
+            )
+            file.write('\n')
+        if options['compare']:
+            self.compare(options['compare'], results)
+        self.stdout.write(self.style.SUCCESS(
+            f"Results written to {options['output']}"
+        ))
+
+    def measure(self, user, requests):
+        client = scenarios.api_client(user)
+        context = scenarios.build_context(user)
+        routes = {}
+        for name, method, template, payload in scenarios.SCENARIOS:
+            path = template.format(**context)
+            body = payload(context) if payload else None
+            # Первый запрос — с пустыми кэшами процесса.
+            cache.clear()
+            short_links.local_cache.clear()
+            samples = [
+                self.request(client, method, path, body)
+                for _ in range(requests + 1)
+            ]
+            status, cold_ms, cold_queries = samples[0]
+            latencies = [sample[1] for sample in samples[1:]]
+            queries = [sample[2] for sample in samples[1:]]
+            routes[f'{method} {template}'] = {
+                'route': name,
+                'status': status,
+                'cold_ms': round(cold_ms, 3),
+                'cold_queries': cold_queries,
+                'latency_ms': summarize(latencies),
+                'queries': {
+                    'median': statistics.median(queries) if queries else None,
+                    'max': max(queries, default=None),
+                },
+            }
+            line = (
+                f'{method:<6} {template:<58} {status}  '
+                f"p50 {routes[f'{method} {template}']['latency_ms']['p50']}"
+                f' ms  queries {cold_queries}/{max(queries, default="-")}'
+            )
+            self.stdout.write(
+                self.style.WARNING(line) if status >= 400 else line
+            )
+        return routes
+
+    @staticmethod
+    def request(client, method, path, body):
+        data = '' if body is None else json.dumps(body)
+        write = method not in ('GET', 'HEAD')
+        with transaction.atomic() if write else nullcontext(), \
+                CaptureQueriesContext(connection) as ctx:
+            started = time.perf_counter()
+            response = client.generic(
+                method, path, data, content_type='application/json'
+            )
+            elapsed = (time.perf_counter() - started) * 1000
+            if write:
+                transaction.set_rollback(True)
+        queries = sum(
+            1 for query in ctx.captured_queries
+            if not query['sql'].startswith(SAVEPOINT_PREFIXES)
+        )
+        return response.status_code, elapsed, queries
+
+    def compare(self, path, results):
+        with open(path, encoding='utf-8') as file:
+            previous = json.load(file)
+        self.stdout.write(f'\nCompared with {path} (p50 ms, queries):')
+        for field in ('database', 'seed', 'size'):
+            if previous['meta'].get(field) != results['meta'][field]:
+                self.stdout.write(self.style.WARNING(
+                    f'Runs differ in {field}, numbers are not comparable'
+                ))
+        previous, routes = previous['routes'], results['routes']
+        for key in sorted(set(routes) | set(previous)):
+            old, new = previous.get(key), routes.get(key)
+            if old is None or new is None:
+                status = 'added' if old is None else 'removed'
+                self.stdout.write(f'{key}: {status}')
+                continue
+            old_p50 = old['latency_ms']['p50']
+            new_p50 = new['latency_ms']['p50']
+            change = (
+                f'{(new_p50 - old_p50) / old_p50:+.0%}'
+                if old_p50 and new_p50 is not None else '-'
+            )
+            line = (
+                f"{key}: {old_p50} -> {new_p50} ({change}), "
+                f"queries {old['queries']['max']} -> {new['queries']['max']}"
+            )
+            regressed = (new['queries']['max'] or 0) > (
+                old['queries']['max'] or 0
+            )
+            self.stdout.write(
+                self.style.WARNING(line) if regressed else line
+            )
@@ -0,0 +1,246 @@
+import json
+import re
+from contextlib import nullcontext
+
+from django.core.cache import cache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext, override_settings
+
+from api import scenarios, synthetic
+from workout_plans import short_links
+
+# Без ANALYZE EXPLAIN ничего не выполняет, поэтому можно и UPDATE/DELETE.
+EXPLAINABLE = ('SELECT', 'UPDATE', 'DELETE', 'WITH')
+SCAN_NODES = ('Seq Scan', 'Parallel Seq Scan')
+SORT_NODES = ('Sort', 'Incremental Sort')
+CONDITIONS = ('Index Cond', 'Recheck Cond', 'Filter')
+IDENTIFIER_RE = re.compile(r'"?([a-z_][a-z0-9_]*)"?\s*(?:=|<|>|IN\b|~~|@@)')
+SORT_KEY_RE = re.compile(r'^(?:\w+\.)?"?([a-z_][a-z0-9_]*)"?( DESC)?')
+
+
+def plan_nodes(node, parent=None):
+    yield node, parent
+    for child in node.get('Plans', ()):
+        yield from plan_nodes(child, node)
+
+
+def table_rows():
+    """Оценка числа строк по статистике PostgreSQL: {таблица: строки}."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT relname, reltuples::bigint FROM pg_class "
+            "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace"
+        )
+        return dict(cursor.fetchall())
+
+
+def table_indexes():
+    """Колонки существующих индексов: {таблица: [(колонка, ...), ...]}."""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT t.relname, array_agg(a.attname ORDER BY k.n) "
+            "FROM pg_index i "
+            "JOIN pg_class t ON t.oid = i.indrelid "
+            "CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY k(attnum, n) "
+            "JOIN pg_attribute a ON a.attrelid = t.oid "
+            "AND a.attnum = k.attnum "
+            "WHERE t.relnamespace = 'public'::regnamespace "
+            "GROUP BY t.relname, i.indexrelid"
+        )
+        indexes = {}
+        for table, columns in cursor.fetchall():
+            indexes.setdefault(table, []).append(tuple(columns))
+        return indexes
+
+
+def table_columns():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT table_name, column_name FROM information_schema.columns "
+            "WHERE table_schema = 'public'"
+        )
+        columns = {}
+        for table, column in cursor.fetchall():
+            columns.setdefault(table, set()).add(column)
+        return columns
+
+
+def proposed_index(node, parent, columns, indexes, sort_rows):
+    """Составной индекс, который заменил бы чтение таблицы и сортировку.
+
+    Сначала колонки из условий отбора, затем ключи сортировки над этим
+    чтением — такой индекс отдаёт строки уже в нужном порядке.
+    """
+    table = node['Relation Name']
+    known = columns.get(table, set())
+    fields = []
+    for condition in CONDITIONS:
+        for name in IDENTIFIER_RE.findall(node.get(condition, '')):
+            if name in known and name not in fields:
+                fields.append(name)
+    sorted_by = (
+        parent is not None
+        and parent['Node Type'] in SORT_NODES
+        and node['Plan Rows'] >= sort_rows
+    )
+    if sorted_by:
+        for key in parent.get('Sort Key', ()):
+            match = SORT_KEY_RE.match(key)
+            if match and match.group(1) in known and match.group(1) not in [
+                field.split()[0] for field in fields
+            ]:
+                fields.append(match.group(1) + (match.group(2) or ''))
+    if not fields or node['Node Type'] not in SCAN_NODES and not sorted_by:
+        return None
+    wanted = tuple(field.split()[0] for field in fields)
+    if any(
+        existing[:len(wanted)] == wanted
+        for existing in indexes.get(table, ())
+    ):
+        return None
+    return f'CREATE INDEX CONCURRENTLY ON {table} ({", ".join(fields)});'
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed the synthetic dataset into a throwaway PostgreSQL database, '
+        'run EXPLAIN (FORMAT JSON) for every SQL query issued by the '
+        'routes in api/urls.py and fail on sequential scans of large '
+        'tables or plans over the cost budget'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--scale', type=float, default=4.0,
+            help='Dataset size multiplier (4.0 = 20000 plans)',
+        )
+        parser.add_argument('--seed', type=int, default=0)
+        parser.add_argument(
+            '--large-table-rows', type=int, default=10000,
+            help='A sequential scan of a table with this many rows fails',
+        )
+        parser.add_argument(
+            '--sort-rows', type=int, default=1000,
+            help='Propose an index for sorts of at least this many rows',
+        )
+        # Бюджет рассчитан на --scale 4 (по умолчанию). Ранжированный
+        # ?search= по очень частому слову ранжирует все совпадения, и его
+        # стоимость растёт с каталогом: на --scale 10 он выходит за 10000.
+        parser.add_argument(
+            '--max-cost', type=float, default=10000.0,
+            help=(
+                'A plan with a higher total cost fails; the default budget '
+                'holds for the default --scale, raise it for larger datasets'
+            ),
+        )
+        parser.add_argument(
+            '--output', metavar='JSON',
+            help='Write every captured plan to this file',
+        )
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError(
+                'Query plans are only checked on PostgreSQL, '
+                f'the default database is {connection.vendor}'
+            )
+        scenarios.check_coverage()
+        size = synthetic.DatasetSize().scaled(options['scale'])
+        with synthetic.seeded_database(
+            size, options['seed'], options['verbosity'], self.stdout
+        ) as user:
+            with connection.cursor() as cursor:
+                cursor.execute('VACUUM ANALYZE')
+            queries = self.capture(user)
+            problems, proposals, plans = self.check_plans(queries, options)
+
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(plans, file, ensure_ascii=False, indent=2)
+                file.write('\n')
+        for index in sorted(proposals):
+            self.stdout.write(
+                f'Proposed index ({", ".join(sorted(proposals[index]))}):\n'
+                f'  {index}'
+            )
+        if problems:
+            for problem in problems:
+                self.stderr.write(self.style.ERROR(problem))
+            raise CommandError(f'{len(problems)} query plan problem(s)')
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(queries)} queries checked, no plan problems'
+        ))
+
+    @staticmethod
+    @override_settings(THUMBNAIL_WORKERS=0)
+    def capture(user):
+        """{SQL: маршрут} для первого (холодного) запроса каждого сценария.
+
+        Запись выполняется в транзакции, которая откатывается, но колбэки
+        ``on_commit`` (пересчёты фасетов, подписей, соседей, ленты, версии
+        кэша) выполняются перед откатом: их запросы тоже проверяются.
+        Копии изображений при этом рендерятся синхронно, без пула.
+        """
+        client = scenarios.api_client(user)
+        context = scenarios.build_context(user)
+        queries = {}
+        for name, method, template, payload in scenarios.SCENARIOS:
+            path = template.format(**context)
+            body = json.dumps(payload(context)) if payload else ''
+            cache.clear()
+            short_links.local_cache.clear()
+            write = method not in ('GET', 'HEAD')
+            with transaction.atomic() if write else nullcontext(), \
+                    CaptureQueriesContext(connection) as ctx:
+                with TestCase.captureOnCommitCallbacks(
+                    execute=True
+                ) if write else nullcontext():
+                    client.generic(
+                        method, path, body, content_type='application/json'
+                    )
+                if write:
+                    transaction.set_rollback(True)
+            for query in ctx.captured_queries:
+                sql = query['sql']
+                if sql.lstrip().upper().startswith(EXPLAINABLE):
+                    queries.setdefault(sql, f'{method} {template} ({name})')
+        return queries
+
+    def check_plans(self, queries, options):
+        rows = table_rows()
+        columns = table_columns()
+        indexes = table_indexes()
+        problems, proposals, plans = [], {}, []
+        with connection.cursor() as cursor:
+            for sql, route in queries.items():
+                cursor.execute(f'EXPLAIN (FORMAT JSON) {sql}')
+                plan = cursor.fetchone()[0]
+                if isinstance(plan, str):
+                    plan = json.loads(plan)
+                root = plan[0]['Plan']
+                plans.append({'route': route, 'sql': sql, 'plan': plan})
+                cost = root['Total Cost']
+                if cost > options['max_cost']:
+                    problems.append(
+                        f'{route}: cost {cost:.0f} > {options["max_cost"]:.0f}'
+                        f'\n  {sql[:300]}'
+                    )
+                for node, parent in plan_nodes(root):
+                    table = node.get('Relation Name')
+                    if rows.get(table, 0) < options['large_table_rows']:
+                        continue
+                    if node['Node Type'] in SCAN_NODES:
+                        problems.append(
+                            f'{route}: Seq Scan on {table} '
+                            f'({rows[table]} rows)\n  {sql[:300]}'
+                        )
+                    # Предлагается и для сортировки прочитанных по индексу
+                    # строк: её убрал бы составной индекс.
+                    index = proposed_index(
+                        node, parent, columns, indexes, options['sort_rows']
+                    )
+                    if index:
+                        proposals.setdefault(index, set()).add(route)
+        return problems, proposals, plans
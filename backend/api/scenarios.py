@@ -0,0 +1,209 @@
+"""Запросы к каждому маршруту ``api/urls.py`` на синтетических данных.
+
+Общие для ``benchmark_api`` и ``explain_queries``: сценарии рассчитаны на
+набор ``api.synthetic`` и клиента — пользователя, которого вернул
+``synthetic.seed``.
+"""
+from django.core.management.base import CommandError
+from django.urls import URLPattern, get_resolver
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from exercises.models import Exercise
+from users.models import User
+from workout_plans.models import WorkoutPlan, WorkoutPlanShortLink
+
+PNG = (
+    'data:image/png;base64,iVBORw0KGgoAAAANSUhEUgAAAAEAAAABCAYAAAAfFcSJAAA'
+    'ADUlEQVR42mNk+M9QDwADhgGAWjR9awAAAABJRU5ErkJggg=='
+)
+
+
+def plan_payload(context):
+    return {
+        'name': 'Бенчмарк',
+        'description': 'План для замера',
+        'image': PNG,
+        'duration': 45,
+        'exercises': [
+            {'id': exercise_id, 'sets': 3, 'reps': 10}
+            for exercise_id in context['exercises']
+        ],
+    }
+
+
+def plan_patch_payload(context):
+    return {
+        'duration': 50,
+        'exercises': [
+            {'id': exercise_id, 'sets': 4, 'reps': 8}
+            for exercise_id in context['exercises']
+        ],
+    }
+
+
+# (имя маршрута, метод, путь, тело). Запросы на запись выполняются в
+# транзакции, которая откатывается, поэтому каждый повтор одинаков.
+SCENARIOS = (
+    ('api-root', 'GET', '/api/', None),
+    ('user-list', 'GET', '/api/users/?page=1&limit=6', None),
+    ('user-me', 'GET', '/api/users/me/', None),
+    ('user-avatar', 'GET', '/api/users/me/avatar/', None),
+    ('user-subscriptions', 'GET', '/api/users/subscriptions/?limit=6', None),
+    ('user-detail', 'GET', '/api/users/{author}/', None),
+    ('user-subscribe', 'POST', '/api/users/{stranger}/subscribe/', None),
+    ('exercise-list', 'GET', '/api/exercises/', None),
+    ('exercise-list', 'GET', '/api/exercises/?name=жим', None),
+    ('exercise-detail', 'GET', '/api/exercises/{exercise}/', None),
+    ('workoutplan-list', 'GET', '/api/workout-plans/?page=1&limit=6', None),
+    ('workoutplan-list', 'GET', '/api/workout-plans/?page=50&limit=6', None),
+    ('workoutplan-list', 'GET', '/api/workout-plans/?cursor=&limit=6', None),
+    (
+        'workoutplan-list', 'GET',
+        '/api/workout-plans/?ordering=-favorites_count&limit=6', None,
+    ),
+    (
+        'workoutplan-list', 'GET',
+        '/api/workout-plans/?search=силовой&limit=6', None,
+    ),
+    (
+        'workoutplan-list', 'GET',
+        '/api/workout-plans/?is_favorited=true&limit=6', None,
+    ),
+    (
+        'workoutplan-list', 'GET',
+        '/api/workout-plans/?fields=id,name,duration&limit=6', None,
+    ),
+    (
+        'workoutplan-list', 'GET',
+        '/api/workout-plans/?exercises={exercise_ids}&limit=6', None,
+    ),
+    (
+        'workoutplan-list', 'GET',
+        '/api/workout-plans/?author={author}&limit=6', None,
+    ),
+    ('workoutplan-list', 'POST', '/api/workout-plans/', plan_payload),
+    ('workoutplan-feed', 'GET', '/api/workout-plans/feed/?limit=6', None),
+    (
+        'workoutplan-feed', 'GET', '/api/workout-plans/feed/?cursor=&limit=6',
+        None,
+    ),
+    ('workoutplan-facets', 'GET', '/api/workout-plans/facets/', None),
+    (
+        'workoutplan-facets', 'GET',
+        '/api/workout-plans/facets/?duration_range=30-59', None,
+    ),
+    ('workoutplan-detail', 'GET', '/api/workout-plans/{plan}/', None),
+    (
+        'workoutplan-similar', 'GET', '/api/workout-plans/{plan}/similar/',
+        None,
+    ),
+    (
+        'workoutplan-recommended', 'GET', '/api/workout-plans/recommended/',
+        None,
+    ),
+    (
+        'workoutplan-analytics', 'GET', '/api/workout-plans/{plan}/analytics/',
+        None,
+    ),
+    (
+        'workoutplan-batch-analytics', 'GET',
+        '/api/workout-plans/analytics/?ids={plan},{own_plan}', None,
+    ),
+    (
+        'workoutplan-favorites-analytics', 'GET',
+        '/api/workout-plans/favorites/analytics/', None,
+    ),
+    (
+        'workoutplan-detail', 'PATCH', '/api/workout-plans/{own_plan}/',
+        plan_patch_payload,
+    ),
+    (
+        'workoutplan-favorite', 'POST',
+        '/api/workout-plans/{unfavorited_plan}/favorite/', None,
+    ),
+    (
+        'workoutplan-create-short-link', 'POST',
+        '/api/workout-plans/{unlinked_plan}/create_short_link/', None,
+    ),
+    ('logout', 'POST', '/api/auth/token/logout/', None),
+    ('short-link', 'GET', '/api/s/{url_hash}/', None),
+    ('catalog-workout-plans', 'GET', '/api/catalog/workout-plans/', None),
+    (
+        'catalog-workout-plan', 'GET', '/api/catalog/workout-plans/{plan}/',
+        None,
+    ),
+    ('catalog-exercises', 'GET', '/api/catalog/exercises/', None),
+    ('catalog-short-link', 'GET', '/api/catalog/s/{url_hash}/', None),
+)
+# Маршруты, которые сознательно не замеряются, с причиной.
+SKIPPED = {
+    'login': 'dominated by the password hasher, not by the API',
+    'user-set-password': 'dominated by the password hasher, not by the API',
+}
+
+
+def api_route_names():
+    names = set()
+    patterns = list(get_resolver('api.urls').url_patterns)
+    while patterns:
+        pattern = patterns.pop()
+        if isinstance(pattern, URLPattern):
+            names.add(pattern.name)
+        else:
+            patterns.extend(pattern.url_patterns)
+    names.discard(None)
+    return names
+
+
+def api_client(user):
+    client = APIClient()
+    client.credentials(
+        HTTP_AUTHORIZATION=f'Token {Token.objects.create(user=user).key}'
+    )
+    return client
+
+
+def build_context(user):
+    """Значения для подстановки в пути и тела сценариев."""
+    plans = WorkoutPlan.objects.order_by('id')
+    plan = plans[plans.count() // 2]
+    return {
+        'author': plan.author_id,
+        'stranger': User.objects.exclude(pk=user.pk).exclude(
+            following__user=user
+        ).order_by('id').values_list('id', flat=True).first(),
+        'exercise': Exercise.objects.order_by('id').first().id,
+        'exercises': list(Exercise.objects.order_by('id').values_list(
+            'id', flat=True
+        )[:3]),
+        # Пара упражнений из одного плана: ALL-фильтр не пустой.
+        'exercise_ids': ','.join(map(str, plan.exercises_items.order_by(
+            'id'
+        ).values_list('exercise_id', flat=True)[:2])),
+        'plan': plan.id,
+        'own_plan': (
+            plans.filter(author=user).values_list('id', flat=True).first()
+            or plan.id
+        ),
+        'unfavorited_plan': plans.exclude(
+            favorite__user=user
+        ).values_list('id', flat=True).first(),
+        'unlinked_plan': plans.filter(
+            workoutplanshortlink__isnull=True
+        ).values_list('id', flat=True).first(),
+        'url_hash': WorkoutPlanShortLink.objects.order_by(
+            'id'
+        ).values_list('url_hash', flat=True).first(),
+    }
+
+
+def check_coverage():
+    missing = api_route_names() - set(SKIPPED) - {
+        scenario[0] for scenario in SCENARIOS
+    }
+    if missing:
+        raise CommandError(
+            'No benchmark scenario for routes: '
+            + ', '.join(sorted(missing))
+        )
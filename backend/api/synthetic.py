@@ -0,0 +1,234 @@
+"""Воспроизводимый синтетический набор данных для бенчмарков.
+
+Один и тот же ``seed`` и размеры дают одинаковые строки с одинаковыми id,
+поэтому результаты разных коммитов можно сравнивать. Запись идёт пачками
+через ``foodgram.importing.BatchWriter`` (COPY на PostgreSQL).
+"""
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.db import connection
+from django.test.utils import (
+    override_settings,
+    setup_databases,
+    setup_test_environment,
+    teardown_databases,
+    teardown_test_environment,
+)
+
+from exercises.models import Exercise
+from foodgram.importing import BatchWriter
+from users.models import Follow, User
+from workout_plans import facets, feed, recommendations, similar
+from workout_plans.models import (
+    Favorite,
+    WorkoutPlan,
+    WorkoutPlanExercise,
+    WorkoutPlanShortLink,
+)
+from workout_plans.search import build_search_document
+from workout_plans.short_links import encode
+
+BATCH_SIZE = 5000
+PASSWORD = "benchmark-password"
+IMAGE = "workout_plans_photo/benchmark.png"
+
+MOVEMENTS = (
+    "приседания", "жим", "тяга", "выпады", "подтягивания", "отжимания",
+    "планка", "скручивания", "разведения", "подъёмы", "становая тяга",
+    "бёрпи", "прыжки", "махи", "гиперэкстензия",
+)
+EQUIPMENT = (
+    "со штангой", "с гантелями", "на блоке", "в тренажёре", "с гирей",
+    "с резинкой", "на турнике", "на брусьях", "с собственным весом",
+)
+MUSCLE_GROUPS = ("Ноги", "Грудь", "Спина", "Плечи", "Руки", "Пресс")
+DIFFICULTIES = ("beginner", "intermediate", "advanced")
+WORDS = (
+    "силовой", "круговой", "интервальный", "базовый", "домашний", "быстрый",
+    "план", "тренировка", "выносливость", "масса", "рельеф", "сила",
+    "разминка", "заминка", "неделя", "программа", "новичков", "спортсменов",
+)
+
+
+@dataclass
+class DatasetSize:
+    users: int = 1000
+    exercises: int = 200
+    plans: int = 5000
+    items_per_plan: int = 5
+    favorites: int = 20000
+    follows: int = 5000
+    short_links: int = 2500
+
+    def scaled(self, factor):
+        return DatasetSize(**{
+            name: max(1, round(value * factor))
+            if name != "items_per_plan" else value
+            for name, value in asdict(self).items()
+        })
+
+
+def _sentence(rng, words=8):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+def _unique_pairs(rng, count, left, right, exclude_equal=False):
+    """``count`` различных пар (a, b) из диапазонов 1..left и 1..right."""
+    count = min(count, left * right - (min(left, right) if exclude_equal
+                                       else 0))
+    pairs = set()
+    while len(pairs) < count:
+        pair = (rng.randint(1, left), rng.randint(1, right))
+        if not (exclude_equal and pair[0] == pair[1]):
+            pairs.add(pair)
+    return sorted(pairs)
+
+
+def seed(size, seed_value=0, stdout=None):
+    """Заполняет пустую БД; пользователь с id 1 — «бенчмарк»-клиент."""
+    rng = random.Random(seed_value)
+    writer = BatchWriter()
+
+    def write(model, objs):
+        for start in range(0, len(objs), BATCH_SIZE):
+            writer.insert(model, objs[start:start + BATCH_SIZE])
+        if stdout is not None:
+            stdout.write(f"{model._meta.verbose_name_plural}: {len(objs)}")
+
+    password = make_password(PASSWORD, salt="benchmark")
+    write(User, [
+        User(
+            pk=pk,
+            username=f"user{pk}",
+            email=f"user{pk}@example.com",
+            first_name=f"Имя{pk}",
+            last_name=f"Фамилия{pk}",
+            password=password,
+        )
+        for pk in range(1, size.users + 1)
+    ])
+
+    exercise_names = {}
+    for pk in range(1, size.exercises + 1):
+        exercise_names[pk] = (
+            f"{rng.choice(MOVEMENTS)} {rng.choice(EQUIPMENT)} {pk}"
+        ).capitalize()
+    write(Exercise, [
+        Exercise(
+            pk=pk,
+            name=name,
+            muscle_group=rng.choice(MUSCLE_GROUPS),
+            description=_sentence(rng),
+            difficulty=rng.choice(DIFFICULTIES),
+        )
+        for pk, name in exercise_names.items()
+    ])
+
+    favorites = _unique_pairs(rng, size.favorites, size.users, size.plans)
+    favorites_count = {}
+    for _, plan_id in favorites:
+        favorites_count[plan_id] = favorites_count.get(plan_id, 0) + 1
+
+    plans, items = [], []
+    items_per_plan = min(size.items_per_plan, size.exercises)
+    for pk in range(1, size.plans + 1):
+        exercise_ids = rng.sample(range(1, size.exercises + 1), items_per_plan)
+        name = f"{_sentence(rng, 3)} {pk}"
+        description = _sentence(rng, 20)
+        plans.append(WorkoutPlan(
+            pk=pk,
+            name=name,
+            author_id=rng.randint(1, size.users),
+            description=description,
+            image=IMAGE,
+            # Файла нет: копии считаются уже построенными, иначе первое
+            # сохранение плана попробует их отрендерить.
+            image_variants={"source": IMAGE, "items": []},
+            duration=rng.randint(10, 120),
+            favorites_count=favorites_count.get(pk, 0),
+            search_document=build_search_document(
+                name,
+                description,
+                [exercise_names[exercise_id] for exercise_id in exercise_ids],
+            ),
+        ))
+        items.extend(
+            WorkoutPlanExercise(
+                workout_plan_id=pk,
+                exercise_id=exercise_id,
+                sets=rng.randint(1, 5),
+                reps=rng.randint(5, 20),
+            )
+            for exercise_id in exercise_ids
+        )
+    write(WorkoutPlan, plans)
+    write(WorkoutPlanExercise, items)
+    facets.rebuild()
+    similar.rebuild()
+    write(Favorite, [
+        Favorite(user_id=user_id, workout_plan_id=plan_id)
+        for user_id, plan_id in favorites
+    ])
+    recommendations.rebuild()
+
+    follows = _unique_pairs(
+        rng, size.follows, size.users, size.users, exclude_equal=True,
+    )
+    write(Follow, [
+        Follow(user_id=user_id, author_id=author_id)
+        for user_id, author_id in follows
+    ])
+    followers = {}
+    for _, author_id in follows:
+        followers[author_id] = followers.get(author_id, 0) + 1
+    for author_id, count in followers.items():
+        User.objects.filter(pk=author_id).update(followers_count=count)
+
+    link_ids = sorted(rng.sample(
+        range(1, size.plans + 1), min(size.short_links, size.plans)
+    ))
+    write(WorkoutPlanShortLink, [
+        WorkoutPlanShortLink(workout_plan_id=pk, url_hash=encode(pk))
+        for pk in link_ids
+    ])
+
+    # Лента строится только для пользователя-клиента бенчмарка.
+    client = User.objects.get(pk=1)
+    for follow in Follow.objects.filter(user=client).select_related("author"):
+        feed.backfill(client, follow.author)
+    return client
+
+
+@contextmanager
+def seeded_database(size, seed_value=0, verbosity=1, stdout=None):
+    """Временная тестовая БД с набором ``seed``; отдаёт клиента.
+
+    Файлы пишутся во временный ``MEDIA_ROOT``, debug toolbar отключается.
+    """
+    setup_test_environment()
+    old_config = setup_databases(verbosity, interactive=False)
+    try:
+        with tempfile.TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root,
+            MIDDLEWARE=[
+                item for item in settings.MIDDLEWARE
+                if not item.startswith("debug_toolbar")
+            ],
+        ):
+            started = time.perf_counter()
+            user = seed(size, seed_value, stdout)
+            # Иначе на больших наборах журнал запросов переполнен и
+            # CaptureQueriesContext ничего не ловит.
+            connection.queries_log.clear()
+            if stdout is not None:
+                stdout.write(f"Seeded in {time.perf_counter() - started:.1f}s")
+            yield user
+    finally:
+        teardown_databases(old_config, verbosity)
+        teardown_test_environment()
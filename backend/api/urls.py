@@ -1,7 +1,8 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 
-from .views import UserViewSet
+from . import async_views
+from .views import UserViewSet, redirect_by_hash
 from exercises.views import ExerciseViewSet
 from workout_plans.views import WorkoutPlanViewSet
 
@@ -13,4 +14,26 @@ router.register('workout-plans', WorkoutPlanViewSet)
 urlpatterns = [
     path('', include(router.urls)),
     path('auth/', include('djoser.urls.authtoken')),
+    path('s/<str:url_hash>/', redirect_by_hash, name='short-link'),
+    # Асинхронные версии эндпоинтов чтения для запуска под ASGI.
+    path(
+        'catalog/workout-plans/',
+        async_views.plan_list,
+        name='catalog-workout-plans',
+    ),
+    path(
+        'catalog/workout-plans/<int:pk>/',
+        async_views.plan_detail,
+        name='catalog-workout-plan',
+    ),
+    path(
+        'catalog/exercises/',
+        async_views.exercise_list,
+        name='catalog-exercises',
+    ),
+    path(
+        'catalog/s/<str:url_hash>/',
+        async_views.redirect_by_hash,
+        name='catalog-short-link',
+    ),
 ]
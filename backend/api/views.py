@@ -1,3 +1,4 @@
+from django.http import Http404
 from django.shortcuts import get_object_or_404, redirect
 from django.conf import settings
 from rest_framework import viewsets, status
@@ -6,16 +7,21 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny
 from djoser.serializers import SetPasswordSerializer
 
+from exercises.autocomplete import autocomplete
+from exercises.catalog import list_response
 from exercises.serializers import ExerciseShortSerializer
-from workout_plans.models import (
-    Exercise,
-    WorkoutPlanShortLink,
+from workout_plans import short_links
+from workout_plans.models import Exercise
+from const.errors import ERRORS
+from users.models import Follow, User
+from users.serializers import (
+    FollowSerializer,
+    UserSerializer,
+    UserWithWorkoutPlansSerializer,
 )
-from users.models import User
-from users.serializers import UserSerializer
 
 from .serializers import CustomUserCreateSerializer
-from foodgram.pagination import PageLimitPagination
+from foodgram.pagination import PageLimitPagination, parse_limit
 
 
 class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
@@ -24,12 +30,15 @@ class ExerciseViewSet(viewsets.ReadOnlyModelViewSet):
     permission_classes = (IsAuthenticated,)
     pagination_class = None
 
-    def get_queryset(self):
-        queryset = Exercise.objects.all()
-        name = self.request.query_params.get('name')
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
         if name:
-            queryset = queryset.filter(name__istartswith=name)
-        return queryset
+            return Response(autocomplete.search(
+                name, parse_limit(request.query_params.get('limit')),
+            ))
+        if request.accepted_renderer.format == 'json':
+            return list_response(request)
+        return super().list(request, *args, **kwargs)
 
 
 class UserViewSet(viewsets.ModelViewSet):
@@ -41,6 +50,8 @@ class UserViewSet(viewsets.ModelViewSet):
     def get_serializer_class(self):
         if self.action == 'create':
             return CustomUserCreateSerializer
+        if self.action in ('list', 'retrieve'):
+            return UserWithWorkoutPlansSerializer
         return UserSerializer
 
     def get_permissions(self):
@@ -49,7 +60,64 @@ class UserViewSet(viewsets.ModelViewSet):
         return [IsAuthenticated()]
 
     def get_queryset(self):
-        return User.objects.all()
+        queryset = User.objects.order_by('id')
+        if self.action in ('list', 'retrieve'):
+            queryset = UserWithWorkoutPlansSerializer.setup_eager_loading(
+                queryset, self.request
+            )
+        return queryset
+
+    @action(
+        detail=True,
+        methods=['post', 'delete'],
+        permission_classes=[IsAuthenticated],
+    )
+    def subscribe(self, request, pk=None):
+        user = request.user
+        author = get_object_or_404(User, pk=pk)
+
+        if request.method == 'POST':
+            if user == author:
+                return Response(
+                    {'errors': ERRORS['self_subscribe']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            _, created = Follow.objects.get_or_create(user=user, author=author)
+            if not created:
+                return Response(
+                    {'errors': ERRORS['already_subscribed']},
+                    status=status.HTTP_400_BAD_REQUEST,
+                )
+            author = FollowSerializer.setup_eager_loading(
+                User.objects.filter(pk=author.pk), request
+            ).get()
+            serializer = FollowSerializer(author, context={'request': request})
+            return Response(serializer.data, status=status.HTTP_201_CREATED)
+
+        follow = Follow.objects.filter(user=user, author=author).first()
+        if follow is None:
+            return Response(
+                {'errors': ERRORS['not_subscribed']},
+                status=status.HTTP_400_BAD_REQUEST,
+            )
+        follow.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=[IsAuthenticated],
+    )
+    def subscriptions(self, request):
+        authors = FollowSerializer.setup_eager_loading(
+            User.objects.filter(following__user=request.user).order_by('id'),
+            request,
+        )
+        page = self.paginate_queryset(authors)
+        serializer = FollowSerializer(
+            page, many=True, context={'request': request}
+        )
+        return self.get_paginated_response(serializer.data)
 
     @action(
         detail=False,
@@ -114,12 +182,7 @@ class UserViewSet(viewsets.ModelViewSet):
 
 
 def redirect_by_hash(request, url_hash):
-    try:
-        short_link = get_object_or_404(WorkoutPlanShortLink, url_hash=url_hash)
-        workout_plan_id = short_link.workout_plan.id
-        return redirect(f"{settings.BASE_URL}/api/workout-plans/{workout_plan_id}")
-    except WorkoutPlanShortLink.DoesNotExist:
-        return Response(
-            {"error": "Ссылка не найдена"},
-            status=status.HTTP_404_NOT_FOUND
-        )
+    workout_plan_id = short_links.resolve(url_hash)
+    if workout_plan_id is None:
+        raise Http404("Ссылка не найдена")
+    return redirect(f"{settings.BASE_URL}/api/workout-plans/{workout_plan_id}")
@@ -2,6 +2,8 @@ ERROR_MESSAGES = {
     "invalid_base64": "Некорректный формат base64 изображения",
     "invalid_image_format": "Неподдерживаемый формат изображения",
     "invalid_base64_data": "Некорректные base64 данные",
+    "image_too_large": "Размер изображения не должен превышать 5 МБ",
+    "image_processing_error": "Не удалось обработать изображение",
     "exercise_not_found": "Упражнение с указанным id не существует",
     "exercise_duplicate": "Упражнения не должны повторяться",
     "no_exercises": "Необходимо указать хотя бы одно упражнение",
@@ -21,4 +23,6 @@ ERRORS = {
     "no_image": "Необходимо загрузить изображение",
     "cant_edit": "Вы не можете изменять чужие планы тренировок",
     "cant_delete": "Вы не можете удалять чужие планы тренировок",
+    "unknown_fields": "Неизвестные поля: {}",
+    "invalid_plan_ids": "Укажите id планов через запятую, не больше {}",
 }
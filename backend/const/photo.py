@@ -1,22 +1,81 @@
-import base64
 import binascii
 import logging
-from django.core.files.base import ContentFile
+import re
+from io import BytesIO
+
+from django.conf import settings
+from django.core.files.uploadedfile import (
+    InMemoryUploadedFile, TemporaryUploadedFile
+)
 from rest_framework import serializers
 
 from const.errors import ERROR_MESSAGES
+from foodgram import thumbnails
 
 ALLOWED_IMAGE_FORMATS = ["jpeg", "jpg", "png", "gif"]
 MAX_IMAGE_SIZE = 5 * 1024 * 1024  # 5MB
+# Кратно 4, чтобы куски декодировались независимо.
+DECODE_CHUNK_SIZE = 64 * 1024
+BASE64_SEPARATOR = ";base64,"
+WHITESPACE_RE = re.compile(r"\s+")
+# Сигнатуры файлов: формат определяется по содержимому, а не по MIME
+# из data URI.
+MAGIC_BYTES = (
+    (b"\xff\xd8\xff", "jpeg", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "png", "image/png"),
+    (b"GIF87a", "gif", "image/gif"),
+    (b"GIF89a", "gif", "image/gif"),
+)
 
 logger = logging.getLogger(__name__)
 
 
+def estimate_decoded_size(data, start):
+    """Верхняя оценка размера после декодирования base64-хвоста строки."""
+    return (len(data) - start) * 3 // 4
+
+
+def sniff_format(header):
+    for magic, ext, content_type in MAGIC_BYTES:
+        if header.startswith(magic):
+            return ext, content_type
+    return None
+
+
+def iter_base64_chunks(data, start, chunk_size=DECODE_CHUNK_SIZE):
+    """Декодирует base64 с позиции ``start`` кусками по ``chunk_size``.
+
+    Пробельные символы внутри данных допускаются; неполная четвёрка
+    символов переносится в следующий кусок. Паддинг допускается только
+    в конце: кусок, закончившийся на «=», должен быть последним.
+    """
+    carry = ""
+    padded = False
+    for position in range(start, len(data), chunk_size):
+        part = carry + WHITESPACE_RE.sub(
+            "", data[position:position + chunk_size]
+        )
+        if part and padded:
+            raise binascii.Error("Excess data after padding")
+        cut = len(part) - len(part) % 4
+        carry = part[cut:]
+        if cut:
+            padded = part[cut - 1] == "="
+            yield binascii.a2b_base64(part[:cut], strict_mode=True)
+    if carry:
+        raise binascii.Error("Incorrect padding")
+
+
 class ImageField(serializers.ImageField):
     """Поле для кодирования/декодирования изображения Base64.
 
     Поддерживает загрузку изображений в форматах: jpeg, jpg, png, gif.
     Максимальный размер файла: 5MB.
+
+    Размер проверяется по длине base64 до декодирования, данные
+    декодируются кусками во временный файл (в памяти или на диске — как
+    обычная загрузка Django), так что одновременно в памяти держится
+    только строка запроса и один кусок.
     """
 
     def to_internal_value(self, data):
@@ -33,55 +92,90 @@ class ImageField(serializers.ImageField):
                     ERROR_MESSAGES["invalid_base64"]
                 )
 
-            try:
-                format_part, imgstr = data.split(";base64,", 1)
-            except ValueError:
+            separator = data.find(BASE64_SEPARATOR)
+            if separator == -1:
                 logger.warning("Invalid base64 format: missing separator")
                 raise serializers.ValidationError(
                     ERROR_MESSAGES["invalid_base64"]
                 )
+            start = separator + len(BASE64_SEPARATOR)
 
-            try:
-                ext = format_part.split("/")[-1].lower()
-            except (IndexError, AttributeError):
-                logger.warning("Invalid image format specification")
-                raise serializers.ValidationError(
-                    ERROR_MESSAGES["invalid_image_format"]
-                )
-
-            if ext not in ALLOWED_IMAGE_FORMATS:
-                logger.warning(f"Unsupported image format: {ext}")
+            size = estimate_decoded_size(data, start)
+            if size > MAX_IMAGE_SIZE + 2:
+                logger.warning(f"Image size exceeds limit: ~{size} bytes")
                 raise serializers.ValidationError(
-                    ERROR_MESSAGES["invalid_image_format"]
+                    ERROR_MESSAGES["image_too_large"]
                 )
 
             try:
-                decoded_file = base64.b64decode(imgstr)
-            except (TypeError, binascii.Error) as e:
+                upload = self._decode(data, start, size)
+            except (TypeError, ValueError, binascii.Error) as e:
                 logger.error(f"Base64 decoding error: {str(e)}")
                 raise serializers.ValidationError(
                     ERROR_MESSAGES["invalid_base64_data"]
                 )
-
-            if len(decoded_file) > MAX_IMAGE_SIZE:
-                logger.warning(
-                    f"Image size exceeds limit: "
-                    f"{len(decoded_file)} bytes"
-                )
-                raise serializers.ValidationError(
-                    ERROR_MESSAGES.get(
-                        "image_too_large",
-                        "Image size exceeds limit"
+            try:
+                if upload.size > MAX_IMAGE_SIZE:
+                    logger.warning(
+                        f"Image size exceeds limit: {upload.size} bytes"
                     )
-                )
-
-            data = ContentFile(decoded_file, name=f"photo.{ext}")
-            return super().to_internal_value(data)
+                    raise serializers.ValidationError(
+                        ERROR_MESSAGES["image_too_large"]
+                    )
+                return super().to_internal_value(upload)
+            except serializers.ValidationError:
+                upload.close()
+                raise
 
         except serializers.ValidationError:
             raise
         except Exception as e:
             logger.error(f"Unexpected error in ImageField: {str(e)}")
             raise serializers.ValidationError(
-                ERROR_MESSAGES.get("image_processing_error", str(e))
+                ERROR_MESSAGES["image_processing_error"]
+            )
+
+    @staticmethod
+    def _decode(data, start, size):
+        chunks = iter_base64_chunks(data, start)
+        header = b""
+        for chunk in chunks:
+            header += chunk
+            if len(header) >= 8:
+                break
+        sniffed = sniff_format(header)
+        if sniffed is None:
+            logger.warning("Unsupported image format by signature")
+            raise serializers.ValidationError(
+                ERROR_MESSAGES["invalid_image_format"]
             )
+        ext, content_type = sniffed
+        name = f"photo.{ext}"
+
+        if size > settings.FILE_UPLOAD_MAX_MEMORY_SIZE:
+            upload = TemporaryUploadedFile(name, content_type, 0, None)
+        else:
+            upload = InMemoryUploadedFile(
+                BytesIO(), None, name, content_type, 0, None
+            )
+        try:
+            upload.write(header)
+            for chunk in chunks:
+                upload.write(chunk)
+        except Exception:
+            upload.close()
+            raise
+        upload.size = upload.tell()
+        upload.seek(0)
+        return upload
+
+
+class ImageVariantsField(serializers.Field):
+    """Уменьшенные копии изображения: ``[{width, format, url}]``."""
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, value):
+        return thumbnails.urls(value, self.context.get("request"))
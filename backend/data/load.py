@@ -1,25 +1,16 @@
-import json
-import django
+"""Загрузка тестовых данных без manage.py: python data/load.py"""
 import os
-from exercises.models import Exercise
+import sys
+
+import django
 
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BASE_DIR)
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "foodgram.settings")
 django.setup()
 
-
-def load_exercises():
-    with open(
-        os.path.join(
-            os.path.dirname(__file__),
-            "exercises.json"
-        ),
-        encoding="utf-8",
-    ) as file:
-        data = json.load(file)
-    for item in data:
-            Exercise.objects.create(**item)
-        print(f"Успешно загружено {len(data)} упражнений")
+from django.core.management import call_command  # noqa: E402
 
 
 if __name__ == "__main__":
-    load_exercises()
+    call_command("load_data", data_dir=os.path.join(BASE_DIR, "data"))
@@ -5,3 +5,6 @@ class ExercisesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'exercises'
     verbose_name = 'Упражнения'
+
+    def ready(self):
+        from . import signals  # noqa: F401
@@ -0,0 +1,85 @@
+"""Автодополнение названий упражнений без обращения к БД.
+
+Индекс — отсортированный массив нормализованных ключей: для каждого
+упражнения ключом служит название целиком и каждый его хвост, начинающийся
+с нового слова («жим лёжа» находится и по «жим», и по «лёж»). Поиск по
+префиксу — двоичный поиск ``bisect``.
+
+Индекс строится из снимка каталога (``exercises.catalog``) и
+перестраивается вместе с ним: сразу после изменений в этом процессе,
+а изменения из другого процесса — не позже чем через ``catalog.MAX_AGE``
+секунд (версия каталога лежит в кэше процесса).
+"""
+import threading
+from bisect import bisect_left
+
+from foodgram.pagination import DEFAULT_LIMIT
+
+from .catalog import catalog
+
+
+def normalize(text):
+    return " ".join(text.casefold().replace("ё", "е").split())
+
+
+class ExerciseAutocomplete:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._index = ([], [], {})
+        self._source = None
+
+    def search(self, prefix, limit=DEFAULT_LIMIT):
+        """Возвращает до ``limit`` упражнений, чьё название или слово
+        в названии начинается с ``prefix``.
+
+        Совпадения с начала названия идут первыми, дальше — по алфавиту.
+        """
+        prefix = normalize(prefix)
+        if not prefix:
+            return []
+        keys, entries, items = self._snapshot()
+
+        matches = {}
+        position = bisect_left(keys, prefix)
+        while position < len(keys) and keys[position].startswith(prefix):
+            exercise_id, is_start = entries[position]
+            matches[exercise_id] = matches.get(exercise_id) or is_start
+            position += 1
+
+        ranked = sorted(
+            matches,
+            key=lambda pk: (not matches[pk], items[pk][0]),
+        )
+        return [items[pk][1] for pk in ranked[:limit]]
+
+    def invalidate(self):
+        catalog.invalidate()
+
+    def _snapshot(self):
+        snapshot = catalog.get()
+        if self._source is not snapshot:
+            with self._lock:
+                if self._source is not snapshot:
+                    self._index = self._build(snapshot.rows)
+                    self._source = snapshot
+        return self._index
+
+    @staticmethod
+    def _build(rows):
+        items = {}
+        pairs = []
+        for row in rows.values():
+            name = normalize(row["name"])
+            items[row["id"]] = (name, row)
+            words = name.split(" ")
+            for index in range(len(words)):
+                pairs.append(
+                    (" ".join(words[index:]), row["id"], index == 0)
+                )
+        pairs.sort()
+        keys = [key for key, _, _ in pairs]
+        entries = [(pk, is_start) for _, pk, is_start in pairs]
+        return keys, entries, items
+
+
+autocomplete = ExerciseAutocomplete()
@@ -0,0 +1,120 @@
+"""Снимок каталога упражнений в памяти процесса.
+
+Таблица упражнений маленькая и меняется редко, поэтому каждый воркер
+держит её целиком: строки для сериализации планов (без JOIN с
+``exercises_exercise``) и готовое JSON-тело списка упражнений с ETag.
+
+Актуальность проверяется по версии в кэше — одно чтение ключа вместо
+запроса к БД. Версию меняют сигналы сохранения и удаления ``Exercise`` и
+импорт упражнений; при расхождении снимок перестраивается. Кэш по
+умолчанию (LocMemCache) у каждого процесса свой, поэтому изменения из
+другого процесса (соседний воркер, команда импорта) версию здесь не
+меняют: их подхватывает перестройка снимка старше ``MAX_AGE`` секунд.
+Этот же снимок использует автодополнение (``exercises.autocomplete``).
+"""
+import hashlib
+import threading
+import time
+import uuid
+from dataclasses import dataclass
+
+from django.core.cache import cache
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response
+
+from foodgram.renderers import ORJSONRenderer
+
+VERSION_CACHE_KEY = "exercises:catalog:version"
+# Ключ контекста сериализатора: один снимок на весь ответ.
+CONTEXT_KEY = "exercise_catalog"
+# Поля упражнения, которые отдаются в списке и в строках планов.
+FIELDS = ("id", "name", "muscle_group", "difficulty")
+# Предельный возраст снимка, секунды.
+MAX_AGE = 30
+
+
+def current_version():
+    version = cache.get(VERSION_CACHE_KEY)
+    if version is None:
+        cache.add(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+        version = cache.get(VERSION_CACHE_KEY)
+    return version
+
+
+@dataclass(frozen=True)
+class Snapshot:
+    rows: dict
+    body: bytes
+    etag: str
+
+
+class ExerciseCatalog:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._snapshot = None
+        self._version = None
+        self._built_at = 0.0
+
+    def _is_stale(self, version):
+        return (
+            self._version != version
+            or time.monotonic() - self._built_at > MAX_AGE
+        )
+
+    def get(self):
+        """Текущий снимок; перестраивается, если версия в кэше сменилась
+        или снимок старше ``MAX_AGE``."""
+        version = current_version()
+        if self._is_stale(version):
+            with self._lock:
+                if self._is_stale(version):
+                    snapshot = self._build()
+                    # Данные не изменились — прежний объект: ETag тот же,
+                    # индекс автодополнения не перестраивается.
+                    if self._snapshot is None or (
+                        snapshot.etag != self._snapshot.etag
+                    ):
+                        self._snapshot = snapshot
+                    self._version = version
+                    self._built_at = time.monotonic()
+        return self._snapshot
+
+    def from_context(self, context):
+        """Снимок, общий для всех сериализаторов одного ответа."""
+        snapshot = context.get(CONTEXT_KEY)
+        if snapshot is None:
+            snapshot = context[CONTEXT_KEY] = self.get()
+        return snapshot
+
+    def invalidate(self):
+        cache.set(VERSION_CACHE_KEY, uuid.uuid4().hex, None)
+
+    @staticmethod
+    def _build():
+        from .models import Exercise
+        from .serializers import ExerciseShortSerializer
+
+        # Тело рендерится тем же сериализатором и рендерером, что и в
+        # обычном представлении DRF, — байт в байт тот же ответ.
+        data = ExerciseShortSerializer(
+            Exercise.objects.only(*FIELDS), many=True
+        ).data
+        body = ORJSONRenderer().render(data)
+        return Snapshot(
+            rows={row["id"]: dict(row) for row in data},
+            body=body,
+            etag=f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        )
+
+
+catalog = ExerciseCatalog()
+
+
+def list_response(request):
+    """Список упражнений из снимка; на совпавший If-None-Match — 304."""
+    snapshot = catalog.get()
+    response = get_conditional_response(request, etag=snapshot.etag)
+    if response is None:
+        response = HttpResponse(snapshot.body, content_type="application/json")
+    response["ETag"] = snapshot.etag
+    return response
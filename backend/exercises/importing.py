@@ -0,0 +1,36 @@
+from foodgram.importing import Importer
+
+from .catalog import catalog
+from .models import Exercise
+
+FIELDS = ("name", "muscle_group", "description", "difficulty")
+
+
+class ExerciseImporter(Importer):
+    """Упражнения; повторный импорт пропускает уже существующие названия."""
+
+    label = "exercises"
+    models = ("exercises.exercise",)
+
+    def build(self, record):
+        if not record.get("name"):
+            return None
+        return Exercise(
+            pk=record.get("pk") or record.get("id"),
+            **{name: record[name] for name in FIELDS if name in record},
+        )
+
+    def flush(self, batch):
+        existing = set(Exercise.objects.filter(
+            name__in=[exercise.name for exercise in batch],
+        ).values_list("name", flat=True))
+        new = []
+        for exercise in batch:
+            if exercise.name not in existing:
+                existing.add(exercise.name)
+                new.append(exercise)
+        self.writer.insert(Exercise, new)
+        return len(new)
+
+    def finish(self):
+        catalog.invalidate()
@@ -1,9 +1,14 @@
-import json
-import os
+from pathlib import Path
+
+from django.conf import settings
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
-from exercises.models import Exercise
-from workout_plans.models import WorkoutPlan, WorkoutPlanExercise
+
+from exercises.importing import ExerciseImporter
+from foodgram import importing
+from workout_plans.importing import (
+    WorkoutPlanExerciseImporter, WorkoutPlanImporter
+)
 
 User = get_user_model()
 
@@ -11,66 +16,42 @@ User = get_user_model()
 class Command(BaseCommand):
     help = 'Load test data from JSON files'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--data-dir', default=str(settings.BASE_DIR / 'data'),
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=importing.BATCH_SIZE,
+        )
+        parser.add_argument('--no-copy', action='store_true')
+
     def handle(self, *args, **options):
         # Создаем суперпользователя, если его нет
-        if not User.objects.filter(username='admin').exists():
-            User.objects.create_superuser(
+        admin_user = User.objects.filter(username='admin').first()
+        if admin_user is None:
+            admin_user = User.objects.create_superuser(
                 username='admin',
                 email='admin@example.com',
                 password='admin'
             )
             self.stdout.write(self.style.SUCCESS('Created superuser'))
 
-        # Загружаем упражнения
-        exercises_file = os.path.join('data', 'exercises.json')
-        if not os.path.exists(exercises_file):
-            self.stdout.write(self.style.ERROR(f'File not found: {exercises_file}'))
-            return
-
-        with open(exercises_file, 'r', encoding='utf-8') as f:
-            exercises_data = json.load(f)
-
-        for exercise_data in exercises_data:
-            Exercise.objects.get_or_create(
-                name=exercise_data['name'],
-                defaults={
-                    'muscle_group': exercise_data['muscle_group'],
-                    'description': exercise_data['description'],
-                    'difficulty': exercise_data['difficulty']
-                }
+        data_dir = Path(options['data_dir'])
+        steps = (
+            ('exercises.json', ExerciseImporter, {}),
+            (
+                'workout_plans.json',
+                WorkoutPlanImporter,
+                {'default_author': admin_user},
+            ),
+            ('workout_plans.json', WorkoutPlanExerciseImporter, {}),
+        )
+        for file_name, importer_class, kwargs in steps:
+            path = data_dir / file_name
+            if not path.exists():
+                self.stdout.write(self.style.ERROR(f'File not found: {path}'))
+                return
+            importing.run(
+                importer_class, options, self.stdout, path=path, **kwargs
             )
-        self.stdout.write(self.style.SUCCESS('Loaded exercises'))
-
-        # Загружаем планы тренировок
-        workout_plans_file = os.path.join('data', 'workout_plans.json')
-        if not os.path.exists(workout_plans_file):
-            self.stdout.write(self.style.ERROR(f'File not found: {workout_plans_file}'))
-            return
-
-        with open(workout_plans_file, 'r', encoding='utf-8') as f:
-            workout_plans_data = json.load(f)
-
-        admin_user = User.objects.get(username='admin')
-        for plan_data in workout_plans_data:
-            plan, created = WorkoutPlan.objects.get_or_create(
-                name=plan_data['name'],
-                author=admin_user,
-                defaults={
-                    'description': plan_data['description'],
-                    'duration': plan_data['duration']
-                }
-            )
-
-            # Добавляем упражнения в план
-            for exercise_data in plan_data['exercises']:
-                exercise = Exercise.objects.get(name=exercise_data['name'])
-                WorkoutPlanExercise.objects.get_or_create(
-                    workout_plan=plan,
-                    exercise=exercise,
-                    defaults={
-                        'sets': exercise_data['sets'],
-                        'reps': exercise_data['reps']
-                    }
-                )
-
-        self.stdout.write(self.style.SUCCESS('Loaded workout plans')) 
\ No newline at end of file
+        self.stdout.write(self.style.SUCCESS('Loaded test data'))
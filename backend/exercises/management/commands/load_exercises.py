@@ -1,33 +1,23 @@
-import json
 import os
 
 from django.core.management.base import BaseCommand
 
-from exercises.models import Exercise
+from exercises.importing import ExerciseImporter
+from foodgram import importing
 
 
 class Command(BaseCommand):
-    help = 'Load exercises from JSON file'
+    help = 'Load exercises from a JSON, JSON Lines or CSV file'
+
+    def add_arguments(self, parser):
+        importing.add_arguments(parser, os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+            'data',
+            'exercises.json',
+        ))
 
     def handle(self, *args, **options):
-        with open(
-            os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                "data",
-                "exercises.json"
-            ),
-            encoding="utf-8",
-        ) as file:
-            data = json.load(file)
-            for item in data:
-                Exercise.objects.get_or_create(
-                    name=item['name'],
-                    defaults={
-                        'muscle_group': item['muscle_group'],
-                        'description': item['description'],
-                        'difficulty': item['difficulty']
-                    }
-                )
-            self.stdout.write(
-                self.style.SUCCESS(f'Successfully loaded {len(data)} exercises')
-            ) 
\ No newline at end of file
+        rows = importing.run(ExerciseImporter, options, self.stdout)
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully loaded {rows} exercises')
+        )
@@ -0,0 +1,14 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .catalog import catalog
+from .models import Exercise
+
+
+@receiver(post_save, sender=Exercise)
+@receiver(post_delete, sender=Exercise)
+def exercise_changed(sender, **kwargs):
+    # После коммита: иначе другой воркер может перестроить снимок по
+    # незакоммиченным данным и запомнить его под новой версией.
+    transaction.on_commit(catalog.invalidate)
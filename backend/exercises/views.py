@@ -1,7 +1,12 @@
 from django.shortcuts import render, get_object_or_404
 from rest_framework import viewsets
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from rest_framework.response import Response
 
+from foodgram.pagination import parse_limit
+
+from .autocomplete import autocomplete
+from .catalog import list_response
 from .models import Exercise
 from .serializers import ExerciseSerializer, ExerciseShortSerializer
 
@@ -15,3 +20,13 @@ class ExerciseViewSet(viewsets.ModelViewSet):
         if self.action == 'list':
             return ExerciseShortSerializer
         return ExerciseSerializer
+
+    def list(self, request, *args, **kwargs):
+        name = request.query_params.get('name')
+        if name:
+            return Response(autocomplete.search(
+                name, parse_limit(request.query_params.get('limit')),
+            ))
+        if request.accepted_renderer.format == 'json':
+            return list_response(request)
+        return super().list(request, *args, **kwargs)
@@ -0,0 +1,32 @@
+"""Общие помощники для команд-бенчмарков."""
+import math
+
+PERCENTILES = (50, 90, 95, 99)
+
+
+def percentiles(samples, points=PERCENTILES):
+    """Перцентили по методу ближайшего ранга, в тех же единицах."""
+    ordered = sorted(samples)
+    if not ordered:
+        return {f"p{point}": None for point in points}
+    return {
+        f"p{point}": ordered[max(0, math.ceil(point / 100 * len(ordered)) - 1)]
+        for point in points
+    }
+
+
+def summarize(latencies_ms, elapsed=None):
+    """Сводка по задержкам в миллисекундах (и пропускной способности)."""
+    summary = {
+        "count": len(latencies_ms),
+        "mean": round(sum(latencies_ms) / len(latencies_ms), 3)
+        if latencies_ms else None,
+        **{
+            name: None if value is None else round(value, 3)
+            for name, value in percentiles(latencies_ms).items()
+        },
+        "max": round(max(latencies_ms), 3) if latencies_ms else None,
+    }
+    if elapsed:
+        summary["rps"] = round(len(latencies_ms) / elapsed, 1)
+    return summary
@@ -0,0 +1,328 @@
+"""Потоковый импорт данных для management-команд load_*.
+
+Файл читается по частям (JSON-массив, JSON Lines или CSV) и никогда не
+загружается в память целиком. Строки пишутся пачками: ``bulk_create`` с
+``ignore_conflicts`` либо, на PostgreSQL, ``COPY`` во временную таблицу и
+``INSERT ... ON CONFLICT DO NOTHING``. Ссылки по названию (упражнение в
+плане) разрешаются по словарю, загруженному один раз до начала импорта.
+
+Поддерживаются как плоские записи, так и записи фикстур Django
+(``{"model": ..., "pk": ..., "fields": {...}}``).
+"""
+import csv
+import io
+import json
+import os
+import time
+
+from django.core.management.color import no_style
+from django.db import connection, models, transaction
+
+CHUNK_SIZE = 1 << 16
+BATCH_SIZE = 2000
+REPORT_EVERY = 2.0
+NULL = "\\N"
+
+
+def iter_json_array(fp, chunk_size=CHUNK_SIZE):
+    """Элементы JSON-массива по одному, не читая файл целиком."""
+    decoder = json.JSONDecoder()
+    buffer, position, eof = "", 0, False
+
+    def skip_whitespace():
+        nonlocal position
+        while position < len(buffer) and buffer[position].isspace():
+            position += 1
+
+    def fill():
+        nonlocal buffer, position, eof
+        chunk = fp.read(chunk_size)
+        if not chunk:
+            eof = True
+        buffer = buffer[position:] + chunk
+        position = 0
+
+    started = False
+    while True:
+        skip_whitespace()
+        if position >= len(buffer):
+            if eof:
+                raise ValueError("Unexpected end of JSON array")
+            fill()
+            continue
+        char = buffer[position]
+        if not started:
+            if char != "[":
+                raise ValueError("Expected a JSON array")
+            started = True
+            position += 1
+            continue
+        if char == "]":
+            return
+        if char == ",":
+            position += 1
+            continue
+        try:
+            value, end = decoder.raw_decode(buffer, position)
+        except json.JSONDecodeError:
+            if eof:
+                raise
+            fill()
+            continue
+        if end >= len(buffer) and not eof:
+            # Значение могло оборваться на границе чанка (например, число).
+            fill()
+            continue
+        position = end
+        yield value
+
+
+def iter_json_lines(fp):
+    for line in fp:
+        line = line.strip()
+        if line:
+            yield json.loads(line)
+
+
+def iter_csv(fp, fieldnames=None):
+    yield from csv.DictReader(fp, fieldnames=fieldnames)
+
+
+def detect_format(path):
+    extension = os.path.splitext(path)[1].lower()
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if extension == ".csv":
+        return "csv"
+    return "json"
+
+
+def read_records(path, file_format=None, fieldnames=None):
+    """Записи файла; записи фикстур разворачиваются в плоский вид с
+    ключами ``model`` и ``pk``."""
+    file_format = file_format or detect_format(path)
+    with open(path, encoding="utf-8", newline="") as fp:
+        if file_format == "csv":
+            records = iter_csv(fp, fieldnames)
+        elif file_format == "jsonl":
+            records = iter_json_lines(fp)
+        else:
+            records = iter_json_array(fp)
+        for record in records:
+            if "fields" in record and "model" in record:
+                record = {
+                    **record["fields"],
+                    "model": record["model"],
+                    "pk": record.get("pk"),
+                }
+            yield record
+
+
+def parse_id(value):
+    """Id из записи: число JSON или строка CSV; пустое значение — None.
+
+    Нечисловое или неположительное значение — ``ValueError``.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, (bool, float)):
+        raise ValueError(f"Invalid id: {value!r}")
+    value = int(value)
+    if value <= 0:
+        raise ValueError(f"Invalid id: {value!r}")
+    return value
+
+
+class BatchWriter:
+    """Пишет пачку объектов одним запросом.
+
+    Без ``key`` конфликтующие строки пропускаются. С ``key`` (кортеж
+    полей, уникальных внутри пачки) конфликтов быть не должно, а id
+    вставленных строк проставляются обратно в объекты без id.
+    """
+
+    def __init__(self, use_copy=True):
+        self.use_copy = use_copy and connection.vendor == "postgresql"
+
+    def insert(self, model, objs, key=None):
+        with_pk = [obj for obj in objs if obj.pk is not None]
+        without_pk = [obj for obj in objs if obj.pk is None]
+        if with_pk:
+            self._insert(model, with_pk, None, True)
+            # Явные id не двигают последовательность.
+            with connection.cursor() as cursor:
+                for sql in connection.ops.sequence_reset_sql(
+                    no_style(), [model]
+                ):
+                    cursor.execute(sql)
+        if without_pk:
+            self._insert(model, without_pk, key, False)
+
+    def _insert(self, model, objs, key, with_pk):
+        if self.use_copy:
+            self._copy(model, objs, key, with_pk)
+        else:
+            model.objects.bulk_create(objs, ignore_conflicts=key is None)
+
+    def _copy(self, model, objs, key, with_pk):
+        fields = [
+            field for field in model._meta.concrete_fields
+            if with_pk or not field.primary_key
+        ]
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for obj in objs:
+            writer.writerow([
+                self._copy_value(field, field.pre_save(obj, True))
+                for field in fields
+            ])
+        buffer.seek(0)
+
+        quote = connection.ops.quote_name
+        table = quote(model._meta.db_table)
+        columns = ", ".join(quote(field.column) for field in fields)
+        sql = f"INSERT INTO {table} ({columns}) SELECT {columns} FROM _import"
+        if key is None:
+            sql += " ON CONFLICT DO NOTHING"
+        else:
+            key_fields = [model._meta.get_field(name) for name in key]
+            sql += " RETURNING {}, {}".format(
+                quote(model._meta.pk.column),
+                ", ".join(quote(field.column) for field in key_fields),
+            )
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(
+                f"CREATE TEMP TABLE _import ON COMMIT DROP AS "
+                f"SELECT {columns} FROM {table} WITH NO DATA"
+            )
+            cursor.cursor.copy_expert(
+                f"COPY _import ({columns}) FROM STDIN "
+                f"WITH (FORMAT csv, NULL '{NULL}')",
+                buffer,
+            )
+            cursor.execute(sql)
+            if key is not None:
+                ids = {tuple(row[1:]): row[0] for row in cursor.fetchall()}
+                for obj in objs:
+                    obj.pk = ids[tuple(
+                        getattr(obj, field.attname) for field in key_fields
+                    )]
+            cursor.execute("DROP TABLE _import")
+
+    @staticmethod
+    def _copy_value(field, value):
+        if value is None:
+            return NULL
+        if isinstance(field, models.JSONField):
+            # Адаптер драйвера не годится для CSV: нужен сам текст JSON.
+            return json.dumps(value, cls=field.encoder)
+        return field.get_db_prep_save(value, connection)
+
+
+class Importer:
+    """Базовый импортёр: собирает пачки из записей и пишет их."""
+
+    label = None
+    models = ()
+
+    def __init__(self, writer, stdout=None, batch_size=BATCH_SIZE):
+        self.writer = writer
+        self.stdout = stdout
+        self.batch_size = batch_size
+        self.rows = 0
+        self.skipped = 0
+
+    def prepare(self):
+        """Загрузка словарей для разрешения ссылок перед импортом."""
+
+    def accepts(self, record):
+        model = record.get("model")
+        return model is None or model in self.models
+
+    def build(self, record):
+        raise NotImplementedError
+
+    def flush(self, batch):
+        """Пишет пачку; может вернуть число реально записанных строк."""
+        raise NotImplementedError
+
+    def finish(self):
+        """Действия после записи всех пачек."""
+
+    def run(self, records):
+        self.prepare()
+        started = reported = time.monotonic()
+        batch = []
+        for record in records:
+            if not self.accepts(record):
+                continue
+            item = self.build(record)
+            if item is None:
+                self.skipped += 1
+                continue
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+                if time.monotonic() - reported >= REPORT_EVERY:
+                    reported = time.monotonic()
+                    self.report(started)
+        self._flush(batch)
+        self.finish()
+        self.report(started)
+        return self.rows
+
+    def _flush(self, batch):
+        if batch:
+            with transaction.atomic():
+                written = self.flush(batch)
+            if written is None:
+                written = len(batch)
+            self.rows += written
+            self.skipped += len(batch) - written
+
+    def report(self, started):
+        if self.stdout is None:
+            return
+        elapsed = max(time.monotonic() - started, 1e-6)
+        self.stdout.write(
+            f"{self.label}: {self.rows} rows, {self.skipped} skipped, "
+            f"{self.rows / elapsed:.0f} rows/s"
+        )
+
+
+def add_arguments(parser, path):
+    parser.add_argument(
+        "path", nargs="?", default=str(path),
+        help="JSON array, JSON Lines or CSV file",
+    )
+    parser.add_argument(
+        "--format", choices=("json", "jsonl", "csv"),
+        help="File format; detected by extension by default",
+    )
+    parser.add_argument(
+        "--fields",
+        help="Comma-separated column names for a CSV file without a header",
+    )
+    parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+    parser.add_argument(
+        "--no-copy", action="store_true",
+        help="Use bulk_create instead of COPY on PostgreSQL",
+    )
+
+
+def run(importer_class, options, stdout, path=None, **kwargs):
+    """Импортирует файл из опций команды, возвращает число строк."""
+    fields = options.get("fields")
+    records = read_records(
+        path or options["path"],
+        options.get("format"),
+        fields.split(",") if fields else None,
+    )
+    importer = importer_class(
+        BatchWriter(use_copy=not options.get("no_copy")),
+        stdout=stdout,
+        batch_size=options.get("batch_size") or BATCH_SIZE,
+        **kwargs,
+    )
+    return importer.run(records)
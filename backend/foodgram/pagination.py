@@ -1,4 +1,27 @@
-from rest_framework.pagination import PageNumberPagination
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.paginator import InvalidPage
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
+
+# ?limit= коротких выборок без пагинации (похожие планы, рекомендации,
+# автодополнение).
+DEFAULT_LIMIT = 10
+MAX_LIMIT = 50
+
+
+def parse_limit(value):
+    """``?limit=`` в пределах 1..MAX_LIMIT; некорректное — DEFAULT_LIMIT."""
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        return DEFAULT_LIMIT
+    return max(1, min(limit, MAX_LIMIT))
 
 
 class PageLimitPagination(PageNumberPagination):
@@ -8,3 +31,259 @@ class PageLimitPagination(PageNumberPagination):
     page_query_param = "page"
     page_size_query_param = "limit"
     max_page_size = 100
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """Асинхронный вариант: COUNT и страница читаются async ORM."""
+        page_size = self.get_page_size(request)
+        if not page_size:
+            return None
+        paginator = self.django_paginator_class(queryset, page_size)
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(self.invalid_page_message.format(
+                page_number=page_number, message=str(exc)
+            ))
+        self.request = request
+        self.page.object_list = [obj async for obj in self.page.object_list]
+        return self.page.object_list
+
+
+class KeysetCursorPagination(BasePagination):
+    """Keyset-пагинация: ?cursor=&limit=.
+
+    Страница выбирается условием по ключу сортировки (по умолчанию
+    ``(created_at, id)``) вместо OFFSET, поэтому глубокие страницы стоят
+    столько же, сколько первая. COUNT(*) не выполняется; в ответе только
+    непрозрачные курсоры next/previous.
+    """
+
+    page_size = 6
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    max_page_size = 100
+    ordering = ("-created_at", "-id")
+    invalid_cursor_message = "Некорректный курсор."
+
+    def paginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        return self._set_page(list(queryset))
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        queryset = self._page_queryset(queryset, request, view)
+        return self._set_page([obj async for obj in queryset])
+
+    def _page_queryset(self, queryset, request, view):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.page_size = self.get_page_size(request)
+        # Источник с keyset_slice (лента) сам выбирает строки после
+        # позиции в своём порядке ordering.
+        keyset_slice = getattr(queryset, "keyset_slice", None)
+        if keyset_slice is not None:
+            self.ordering = tuple(queryset.ordering)
+        else:
+            self.ordering = tuple(self.get_ordering(request, queryset, view))
+        self.fields = [
+            queryset.model._meta.get_field(name.lstrip("-"))
+            for name in self.ordering
+        ]
+
+        self.position, self.reverse = self.decode_cursor(request)
+        if keyset_slice is not None:
+            return keyset_slice(
+                self.position, self.reverse, self.page_size + 1
+            )
+        queryset = queryset.order_by(*self._order_by(self.reverse))
+        if self.position is not None:
+            queryset = queryset.filter(
+                self._after(self.position, self.reverse)
+            )
+        return queryset[:self.page_size + 1]
+
+    def _set_page(self, results):
+        position, reverse = self.position, self.reverse
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return results
+
+    def get_page_size(self, request):
+        try:
+            size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        if size <= 0:
+            return self.page_size
+        return min(size, self.max_page_size)
+
+    def get_ordering(self, request, queryset, view):
+        """Порядок queryset (например, из ?ordering=), если он задан
+        полями модели и заканчивается первичным ключом, иначе ordering."""
+        ordering = queryset.query.order_by
+        if not ordering or not all(
+            isinstance(name, str) for name in ordering
+        ):
+            return self.ordering
+        field_names = {
+            field.name for field in queryset.model._meta.concrete_fields
+        }
+        if any(name.lstrip("-") not in field_names for name in ordering):
+            return self.ordering
+        if ordering[-1].lstrip("-") != queryset.model._meta.pk.name:
+            return self.ordering
+        return ordering
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), False)
+
+    def get_previous_link(self):
+        if not self.has_previous or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[0]), True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ("next", self.get_next_link()),
+            ("previous", self.get_previous_link()),
+            ("results", data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            "type": "object",
+            "required": ["results"],
+            "properties": {
+                "next": {"type": "string", "nullable": True, "format": "uri"},
+                "previous": {
+                    "type": "string", "nullable": True, "format": "uri"
+                },
+                "results": schema,
+            },
+        }
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            padded = encoded + "=" * (-len(encoded) % 4)
+            payload = json.loads(base64.urlsafe_b64decode(padded))
+            values, reverse = payload["p"], bool(payload.get("r"))
+            if len(values) != len(self.fields):
+                raise ValueError
+            position = [
+                field.to_python(value)
+                for field, value in zip(self.fields, values)
+            ]
+        except Exception:
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def encode_cursor(self, position, reverse):
+        payload = {"p": position}
+        if reverse:
+            payload["r"] = 1
+        encoded = base64.urlsafe_b64encode(
+            json.dumps(payload, separators=(",", ":")).encode()
+        ).decode().rstrip("=")
+        return replace_query_param(
+            self.base_url, self.cursor_query_param, encoded
+        )
+
+    def _position(self, obj):
+        values = []
+        for field in self.fields:
+            # Страница может состоять из строк values().
+            value = (
+                obj[field.attname] if isinstance(obj, dict)
+                else field.value_from_object(obj)
+            )
+            values.append(
+                value.isoformat() if hasattr(value, "isoformat") else value
+            )
+        return values
+
+    def _order_by(self, reverse):
+        if not reverse:
+            return self.ordering
+        return tuple(
+            name[1:] if name.startswith("-") else f"-{name}"
+            for name in self.ordering
+        )
+
+    def _after(self, position, reverse):
+        """Лексикографическое условие «строго после позиции»."""
+        condition = Q()
+        for index in reversed(range(len(self.ordering))):
+            name = self.ordering[index]
+            descending = name.startswith("-") != reverse
+            lookup = "lt" if descending else "gt"
+            field = name.lstrip("-")
+            strict = Q(**{f"{field}__{lookup}": position[index]})
+            if index == len(self.ordering) - 1:
+                condition = strict
+            else:
+                condition = strict | (
+                    Q(**{field: position[index]}) & condition
+                )
+        return condition
+
+
+class PageOrCursorPagination(PageLimitPagination):
+    """По умолчанию ?page=&limit=, при наличии ?cursor — keyset-режим.
+
+    Первая страница в keyset-режиме запрашивается пустым ``?cursor=``.
+    """
+
+    cursor_pagination_class = KeysetCursorPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        if self.cursor_pagination_class.cursor_query_param in (
+            request.query_params
+        ):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return self.cursor_paginator.paginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        return super().paginate_queryset(queryset, request, view)
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        if self.cursor_pagination_class.cursor_query_param in (
+            request.query_params
+        ):
+            self.cursor_paginator = self.cursor_pagination_class()
+            return await self.cursor_paginator.apaginate_queryset(
+                queryset, request, view
+            )
+        self.cursor_paginator = None
+        return await super().apaginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+    def get_next_link(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_next_link()
+        return super().get_next_link()
+
+    def get_previous_link(self):
+        if self.cursor_paginator is not None:
+            return self.cursor_paginator.get_previous_link()
+        return super().get_previous_link()
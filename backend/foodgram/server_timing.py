@@ -0,0 +1,179 @@
+"""Замер времени запроса: заголовок ``Server-Timing`` и лог медленных.
+
+Для каждого запроса считаются число и время SQL-запросов, время рендера
+ответа, общее время и остаток ``app`` — время Python вне SQL и рендера
+(сериализация, логика представления, middleware). Всё это отдаётся в
+заголовке ``Server-Timing`` — его показывают DevTools браузера. Остаток
+считается вычитанием в middleware, а не перехватом ``.data``
+сериализаторов: вложенные сериализаторы (например, в
+``SerializerMethodField``) дважды не считаются. Запросы дольше
+``SERVER_TIMING_SLOW_MS`` с вероятностью ``SERVER_TIMING_SAMPLE_RATE``
+пишутся в лог одной JSON-строкой вместе с самыми долгими SQL.
+
+При ``SERVER_TIMING = False`` middleware отказывается от подключения
+(``MiddlewareNotUsed``), а перехватчик SQL не ставится, так что
+выключенный замер ничего не стоит.
+
+Данные текущего запроса лежат в ``ContextVar``: он переходит в потоки
+``sync_to_async``, поэтому учитываются и запросы асинхронных
+представлений.
+"""
+import json
+import logging
+import random
+import time
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.db.backends.signals import connection_created
+
+TOP_QUERIES = 5
+SQL_PREVIEW = 500
+
+logger = logging.getLogger(__name__)
+
+_current = ContextVar("server_timing", default=None)
+_installed = False
+
+
+class RequestTimings:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.queries = []
+        self.db = 0.0
+        self.render = 0.0
+
+    def metrics(self):
+        total = time.perf_counter() - self.started
+        return {
+            "db": self.db * 1000,
+            "app": max(total - self.db - self.render, 0.0) * 1000,
+            "render": self.render * 1000,
+            "total": total * 1000,
+        }
+
+    def top_queries(self):
+        grouped = {}
+        for sql, duration in self.queries:
+            count, spent = grouped.get(sql, (0, 0.0))
+            grouped[sql] = (count + 1, spent + duration)
+        top = sorted(grouped.items(), key=lambda item: -item[1][1])
+        return [
+            {
+                "sql": sql[:SQL_PREVIEW],
+                "count": count,
+                "ms": round(spent * 1000, 3),
+            }
+            for sql, (count, spent) in top[:TOP_QUERIES]
+        ]
+
+
+def _record_query(execute, sql, params, many, context):
+    timings = _current.get()
+    if timings is None:
+        return execute(sql, params, many, context)
+    started = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        duration = time.perf_counter() - started
+        timings.db += duration
+        timings.queries.append((sql, duration))
+
+
+def _wrap_connection(connection, **kwargs):
+    if _record_query not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_record_query)
+
+
+def install():
+    """Ставит перехватчик SQL (один раз на процесс)."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    connection_created.connect(_wrap_connection)
+    for connection in connections.all(initialized_only=True):
+        _wrap_connection(connection)
+
+
+def header_value(metrics, query_count):
+    parts = []
+    for name, value in metrics.items():
+        part = f"{name};dur={value:.1f}"
+        if name == "db":
+            part += f';desc="{query_count} queries"'
+        parts.append(part)
+    return ", ".join(parts)
+
+
+class ServerTimingMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.SERVER_TIMING:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.is_async = iscoroutinefunction(get_response)
+        if self.is_async:
+            markcoroutinefunction(self)
+        install()
+
+    def __call__(self, request):
+        if self.is_async:
+            return self.__acall__(request)
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    async def __acall__(self, request):
+        timings = RequestTimings()
+        token = _current.set(timings)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, timings)
+
+    def process_template_response(self, request, response):
+        # Ответы DRF рендерятся обработчиком Django уже после этого хука.
+        timings = _current.get()
+        if timings is not None:
+            started = time.perf_counter()
+
+            def rendered(response):
+                timings.render += time.perf_counter() - started
+
+            response.add_post_render_callback(rendered)
+        return response
+
+    def finish(self, request, response, timings):
+        metrics = timings.metrics()
+        response["Server-Timing"] = header_value(
+            metrics, len(timings.queries)
+        )
+        if (
+            metrics["total"] >= settings.SERVER_TIMING_SLOW_MS
+            and random.random() < settings.SERVER_TIMING_SAMPLE_RATE
+        ):
+            logger.warning(json.dumps({
+                "event": "slow_request",
+                "method": request.method,
+                "path": request.get_full_path(),
+                "status": response.status_code,
+                "queries": len(timings.queries),
+                **{
+                    f"{name}_ms": round(value, 3)
+                    for name, value in metrics.items()
+                },
+                "top_queries": timings.top_queries(),
+            }, ensure_ascii=False))
+        return response
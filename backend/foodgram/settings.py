@@ -94,6 +94,8 @@ LOCAL_APPS = [
 INSTALLED_APPS = DJANGO_APPS + THIRD_PARTY_APPS + LOCAL_APPS
 
 MIDDLEWARE = [
+    # Первым, чтобы total в Server-Timing включал весь стек middleware.
+    "foodgram.server_timing.ServerTimingMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
@@ -104,8 +106,16 @@ MIDDLEWARE = [
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
 
-if DEBUG:
-    MIDDLEWARE.insert(0, "debug_toolbar.middleware.DebugToolbarMiddleware")
+# debug_toolbar сам по себе заметно замедляет каждый запрос, поэтому он
+# включается явно, а не вместе с DEBUG.
+DEBUG_TOOLBAR = DEBUG and os.getenv("DEBUG_TOOLBAR", "False").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+
+if DEBUG_TOOLBAR:
+    MIDDLEWARE.insert(1, "debug_toolbar.middleware.DebugToolbarMiddleware")
     INSTALLED_APPS.append("debug_toolbar")
     INTERNAL_IPS = ["127.0.0.1"]
     DEBUG_TOOLBAR_CONFIG = {
@@ -174,6 +184,9 @@ STATICFILES_DIRS = []
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = Path(os.getenv("MEDIA_ROOT", BASE_DIR / "media"))
+# Процессы для генерации уменьшенных копий изображений; при 0 копии
+# рендерятся сразу после коммита в потоке запроса.
+THUMBNAIL_WORKERS = int(os.getenv("THUMBNAIL_WORKERS", 2))
 
 # Отключаем ManifestStaticFilesStorage для отладки проблем со статикой
 STATICFILES_STORAGE = "django.contrib.staticfiles.storage.StaticFilesStorage"
@@ -188,6 +201,10 @@ REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": [
         "rest_framework.authentication.TokenAuthentication",
     ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "foodgram.renderers.ORJSONRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
 }
 
 DJOSER = {
@@ -229,9 +246,23 @@ LOGGING = {
             "level": os.getenv("DJANGO_LOG_LEVEL", "INFO"),
             "propagate": True,
         },
+        "foodgram.server_timing": {
+            "handlers": ["console"],
+            "level": "WARNING",
+            "propagate": False,
+        },
     },
 }
 
+# Заголовок Server-Timing и лог медленных запросов (foodgram/server_timing.py)
+SERVER_TIMING = os.getenv("SERVER_TIMING", "False").lower() in (
+    "1",
+    "true",
+    "yes",
+)
+SERVER_TIMING_SLOW_MS = int(os.getenv("SERVER_TIMING_SLOW_MS", 500))
+SERVER_TIMING_SAMPLE_RATE = float(os.getenv("SERVER_TIMING_SAMPLE_RATE", 0.1))
+
 # Cache settings
 CACHES = {
     "default": {
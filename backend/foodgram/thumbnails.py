@@ -0,0 +1,174 @@
+"""Уменьшенные копии загруженных изображений (планы, аватары).
+
+После коммита сохранения с новым изображением копии фиксированной
+ширины (``WIDTHS``) в WebP и JPEG рендерятся в пуле процессов и
+пишутся в ``MEDIA_ROOT/thumbnails/<ширина>/<модель>/<pk>/``, откуда их
+отдаёт nginx. Имя копии — полное имя исходного файла плюс формат: у
+каждого объекта свои копии, и удаляет объект только их.
+Список готовых копий хранится в JSON-поле ``<поле>_variants`` модели
+вместе с именем исходного файла: пока копии не готовы или устарели,
+клиенту отдаётся только оригинал.
+
+Воркеры пула не обращаются к БД — только к файлам; результат
+записывается в БД в родительском процессе, после чего отправляется
+сигнал ``variants_ready`` (``update`` обычных сигналов не шлёт).
+"""
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.db import connection, transaction
+from django.db.models import Q
+from django.dispatch import Signal
+
+WIDTHS = (160, 320, 640)
+FORMATS = (("webp", "WEBP"), ("jpg", "JPEG"))
+QUALITY = 80
+DIRECTORY = "thumbnails"
+
+variants_ready = Signal()
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def owner(model, pk):
+    """Папка копий объекта внутри ``thumbnails/<ширина>/``."""
+    return f"{model._meta.label_lower}/{pk}"
+
+
+def variant_name(owner, name, width, ext):
+    return f"{DIRECTORY}/{width}/{owner}/{name}.{ext}"
+
+
+def is_owned(variant, owner):
+    """Копия лежит в папке объекта (а не общая копия старого формата)."""
+    parts = variant.split("/", 2)
+    return len(parts) == 3 and parts[2].startswith(f"{owner}/")
+
+
+def render(source_path, media_root, name, owner):
+    """Рендерит копии изображения; выполняется в процессе пула."""
+    from PIL import Image, ImageOps
+
+    variants = []
+    with Image.open(source_path) as original:
+        image = ImageOps.exif_transpose(original)
+        has_alpha = "A" in image.getbands() or "transparency" in image.info
+        image = image.convert("RGBA" if has_alpha else "RGB")
+        for width in WIDTHS:
+            if width >= image.width:
+                break
+            height = max(1, round(image.height * width / image.width))
+            resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            for ext, image_format in FORMATS:
+                variant = variant_name(owner, name, width, ext)
+                path = os.path.join(media_root, variant)
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                frame = resized
+                if image_format == "JPEG" and has_alpha:
+                    frame = Image.new("RGB", resized.size, "white")
+                    frame.paste(resized, mask=resized.getchannel("A"))
+                # Запись через временный файл: nginx не отдаст недописанный.
+                temporary = f"{path}.{os.getpid()}.tmp"
+                frame.save(temporary, image_format, quality=QUALITY)
+                os.replace(temporary, path)
+                variants.append(
+                    {"width": width, "format": ext, "name": variant}
+                )
+    return variants
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.THUMBNAIL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+
+def sync(instance, field_name):
+    """Ставит перегенерацию копий, если изображение поменялось."""
+    name = getattr(instance, field_name).name or ""
+    variants = getattr(instance, f"{field_name}_variants") or {}
+    if variants.get("source", "") != name:
+        transaction.on_commit(
+            partial(generate, type(instance), instance.pk, field_name, name)
+        )
+
+
+def generate(model, pk, field_name, name):
+    """Рендерит копии в пуле (или сразу при THUMBNAIL_WORKERS = 0)."""
+    if not name:
+        store(model, pk, field_name, name, [])
+        return
+    args = (
+        default_storage.path(name), str(settings.MEDIA_ROOT), name,
+        owner(model, pk),
+    )
+    if not settings.THUMBNAIL_WORKERS:
+        try:
+            store(model, pk, field_name, name, render(*args))
+        except Exception:
+            logger.exception("Thumbnail generation failed for %s", name)
+        return
+    future = _get_executor().submit(render, *args)
+    future.add_done_callback(partial(
+        _rendered, model, pk, field_name, name, threading.get_ident()
+    ))
+
+
+def _rendered(model, pk, field_name, name, caller, future):
+    try:
+        store(model, pk, field_name, name, future.result())
+    except Exception:
+        logger.exception("Thumbnail generation failed for %s", name)
+    finally:
+        # Колбэк выполняется в служебном потоке пула со своим соединением.
+        if threading.get_ident() != caller:
+            connection.close()
+
+
+def store(model, pk, field_name, name, items):
+    variants_field = f"{field_name}_variants"
+    previous = model.objects.filter(pk=pk).values_list(
+        variants_field, flat=True
+    ).first() or {}
+    current = Q(**{field_name: name})
+    if not name:
+        current |= Q(**{f"{field_name}__isnull": True})
+    updated = model.objects.filter(current, pk=pk).update(
+        **{variants_field: {"source": name, "items": items} if name else {}}
+    )
+    previous = {item["name"] for item in previous.get("items", ())}
+    rendered = {item["name"] for item in items}
+    # Если изображение успели заменить, новые копии никому не нужны.
+    stale = previous - rendered if updated else rendered - previous
+    for stale_name in stale:
+        if is_owned(stale_name, owner(model, pk)):
+            default_storage.delete(stale_name)
+    if updated:
+        variants_ready.send(sender=model, pk=pk, field_name=field_name)
+
+
+def urls(variants, request=None):
+    """Копии для ответа API: ширина, формат и абсолютный URL."""
+    result = []
+    for item in (variants or {}).get("items", ()):
+        url = default_storage.url(item["name"])
+        if request is not None:
+            url = request.build_absolute_uri(url)
+        result.append(
+            {"width": item["width"], "format": item["format"], "url": url}
+        )
+    return result
@@ -0,0 +1,25 @@
+import threading
+from functools import partial
+
+from django.db import transaction
+
+_pending = threading.local()
+
+
+def defer_on_commit(func, items=()):
+    """Вызывает ``func(items)`` после коммита текущей транзакции.
+
+    Повторные вызовы с той же функцией до коммита объединяются: ``func``
+    выполнится один раз со всеми накопленными элементами.
+    """
+    batches = getattr(_pending, "batches", None)
+    if batches is None:
+        batches = _pending.batches = {}
+    batches.setdefault(func, set()).update(items)
+    transaction.on_commit(partial(_flush, func))
+
+
+def _flush(func):
+    items = _pending.batches.pop(func, None)
+    if items is not None:
+        func(items)
@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User
+from .models import Follow, User
 
 
 @admin.register(User)
@@ -8,3 +8,9 @@ class UserAdmin(admin.ModelAdmin):
     list_display = ("id", "email", "username",
                     "first_name", "last_name", "password")
     search_help_text = "Поиск по электронной почте и никнейму"
+
+
+@admin.register(Follow)
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ("user", "author")
+    search_fields = ("user__username", "author__username")
@@ -0,0 +1,29 @@
+# Generated by Django 4.2.21 on 2026-10-18 15:16
+
+from django.db import migrations, models
+
+# workout_plans.feed.FANOUT_MAX_FOLLOWERS на момент миграции.
+FANOUT_MAX_FOLLOWERS = 5000
+
+
+def mark_pulled_authors(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    User.objects.filter(
+        followers_count__gt=FANOUT_MAX_FOLLOWERS,
+    ).update(feed_pull=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0005_user_avatar_variants'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='feed_pull',
+            field=models.BooleanField(default=False, editable=False, verbose_name='Лента без раскладки'),
+        ),
+        migrations.RunPython(mark_pulled_authors, migrations.RunPython.noop),
+    ]
@@ -23,6 +23,24 @@ class User(AbstractUser):
         blank=True,
         null=True,
     )
+    followers_count = models.PositiveIntegerField(
+        verbose_name="Количество подписчиков",
+        default=0,
+        editable=False,
+    )
+    # Планы автора не раскладываются по лентам, а читаются при чтении
+    # ленты (``workout_plans.feed``).
+    feed_pull = models.BooleanField(
+        verbose_name="Лента без раскладки",
+        default=False,
+        editable=False,
+    )
+    avatar_variants = models.JSONField(
+        verbose_name="Уменьшенные копии фото профиля",
+        blank=True,
+        default=dict,
+        editable=False,
+    )
 
     USERNAME_FIELD = "email"
     REQUIRED_FIELDS = ["first_name", "last_name", "username"]
@@ -33,3 +51,35 @@ class User(AbstractUser):
 
     def __str__(self):
         return self.username
+
+
+class Follow(models.Model):
+    user = models.ForeignKey(
+        User,
+        verbose_name="Подписчик",
+        related_name="follower",
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор",
+        related_name="following",
+        on_delete=models.CASCADE,
+    )
+
+    class Meta:
+        verbose_name = "Подписка"
+        verbose_name_plural = "Подписки"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "author"],
+                name="unique_user_author_follow",
+            ),
+            models.CheckConstraint(
+                check=~models.Q(user=models.F("author")),
+                name="prevent_self_follow",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} -> {self.author}"
@@ -1,11 +1,16 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model
+from django.db.models import Count, Exists, OuterRef, Prefetch
+from const.photo import ImageVariantsField
+from users.models import Follow
+from workout_plans.models import WorkoutPlan
 from workout_plans.serializers import WorkoutPlanSerializer
 
 User = get_user_model()
 
 
 class UserSerializer(serializers.ModelSerializer):
+    avatar_variants = ImageVariantsField()
     is_subscribed = serializers.SerializerMethodField()
 
     class Meta:
@@ -17,11 +22,28 @@ class UserSerializer(serializers.ModelSerializer):
             'first_name',
             'last_name',
             'avatar',
+            'avatar_variants',
             'is_subscribed',
         )
 
+    @staticmethod
+    def annotate_subscribed(queryset, user):
+        if not user.is_authenticated:
+            return queryset
+        return queryset.annotate(
+            is_subscribed_flag=Exists(
+                Follow.objects.filter(user=user, author_id=OuterRef('pk'))
+            )
+        )
+
     def get_is_subscribed(self, obj):
-        return False
+        flag = getattr(obj, 'is_subscribed_flag', None)
+        if flag is not None:
+            return flag
+        request = self.context.get('request')
+        if request is None or not request.user.is_authenticated:
+            return False
+        return Follow.objects.filter(user=request.user, author=obj).exists()
 
 
 class UserWithWorkoutPlansSerializer(UserSerializer):
@@ -37,20 +59,59 @@ class UserWithWorkoutPlansSerializer(UserSerializer):
             'first_name',
             'last_name',
             'avatar',
+            'avatar_variants',
             'is_subscribed',
             'workout_plans',
             'workout_plans_count',
         )
 
-    def get_workout_plans(self, obj):
-        request = self.context.get('request')
-        workout_plans = obj.workout_plans.all()
+    @staticmethod
+    def get_workout_plans_limit(request):
         workout_plans_limit = request.query_params.get('workout_plans_limit')
         if workout_plans_limit and workout_plans_limit.isdigit():
-            workout_plans = workout_plans[:int(workout_plans_limit)]
+            return int(workout_plans_limit)
+        return None
+
+    @classmethod
+    def setup_eager_loading(cls, queryset, request):
+        """Счётчик планов аннотацией и первые workout_plans_limit планов
+        каждого автора одним оконным prefetch-запросом."""
+        workout_plans = WorkoutPlan.objects.with_items().annotate_favorited(
+            request.user
+        ).order_by('-created_at', '-id')
+        workout_plans_limit = cls.get_workout_plans_limit(request)
+        if workout_plans_limit is not None:
+            workout_plans = workout_plans[:workout_plans_limit]
+        queryset = cls.annotate_subscribed(queryset, request.user)
+        return queryset.annotate(
+            workout_plans_total=Count('workout_plans', distinct=True),
+        ).prefetch_related(
+            Prefetch(
+                'workout_plans',
+                queryset=workout_plans,
+                to_attr='prefetched_workout_plans',
+            ),
+        )
+
+    def get_workout_plans(self, obj):
+        workout_plans = getattr(obj, 'prefetched_workout_plans', None)
+        if workout_plans is None:
+            request = self.context.get('request')
+            workout_plans = obj.workout_plans.all()
+            workout_plans_limit = self.get_workout_plans_limit(request)
+            if workout_plans_limit is not None:
+                workout_plans = workout_plans[:workout_plans_limit]
         return WorkoutPlanSerializer(
             workout_plans, many=True, context=self.context
         ).data
 
     def get_workout_plans_count(self, obj):
-        return obj.workout_plans.count()
+        count = getattr(obj, 'workout_plans_total', None)
+        if count is None:
+            return obj.workout_plans.count()
+        return count
+
+
+class FollowSerializer(UserWithWorkoutPlansSerializer):
+    def get_is_subscribed(self, obj):
+        return True
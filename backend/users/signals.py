@@ -0,0 +1,30 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from foodgram import thumbnails
+
+from .models import Follow, User
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    if update_fields is None or "avatar" in update_fields:
+        thumbnails.sync(instance, "avatar")
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, created=False, raw=False, **kwargs):
+    if created and not raw:
+        User.objects.filter(pk=instance.author_id).update(
+            followers_count=F("followers_count") + 1
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    User.objects.filter(
+        pk=instance.author_id, followers_count__gt=0,
+    ).update(followers_count=F("followers_count") - 1)
@@ -38,6 +38,14 @@ class UserViewSet(DjoserUserViewSet):
             return UserWithWorkoutPlansSerializer
         return UserSerializer
 
+    def get_queryset(self):
+        queryset = super().get_queryset().order_by("id")
+        if self.action in ("list", "retrieve"):
+            queryset = UserWithWorkoutPlansSerializer.setup_eager_loading(
+                queryset, self.request
+            )
+        return queryset
+
     @action(
         detail=True,
         methods=["post", "delete"],
@@ -83,8 +91,10 @@ class UserViewSet(DjoserUserViewSet):
                 {"error": "Вы ни на кого не подписаны."},
                 status=status.HTTP_400_BAD_REQUEST,
             )
-        follows = Follow.objects.filter(user=user)
-        authors = [follow.author for follow in follows]
+        authors = FollowSerializer.setup_eager_loading(
+            User.objects.filter(following__user=user).order_by("id"),
+            request,
+        )
         serializer = FollowSerializer(authors, many=True, context={"request": request})
         return Response(serializer.data)
 
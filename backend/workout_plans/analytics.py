@@ -0,0 +1,163 @@
+"""Тренировочный объём планов: подходы, повторения и подходы × повторения.
+
+Профиль плана — суммы по группам мышц и по сложности упражнений и итог.
+Он считается в БД одним ``GROUP BY`` по строкам планов с JOIN упражнений
+(``group_rows``): клиенту не нужно скачивать планы целиком.
+
+В кэше лежат сгруппированные строки каждого плана под его версией;
+версию меняют сигналы после коммита, когда меняются строки плана или
+упражнения в нём. Профиль нескольких планов (пачка, избранное)
+складывается из тех же закэшированных строк.
+"""
+import uuid
+
+from django.core.cache import cache
+from django.db.models import F, Sum
+from rest_framework import serializers
+
+from const.errors import ERRORS
+from exercises.models import Exercise
+from foodgram.transactions import defer_on_commit
+
+VERSION_KEY = "workout_plans:analytics:{}:version"
+ROWS_KEY = "workout_plans:analytics:{}:{}"
+# Планов в одном запросе ``?ids=``.
+MAX_PLANS = 100
+MEASURES = ("sets", "reps", "volume")
+
+
+def _versions(plan_ids):
+    keys = {plan_id: VERSION_KEY.format(plan_id) for plan_id in plan_ids}
+    versions = cache.get_many(keys.values())
+    missing = [key for key in keys.values() if key not in versions]
+    if missing:
+        for key in missing:
+            cache.add(key, uuid.uuid4().hex, None)
+        versions.update(cache.get_many(missing))
+    return {plan_id: versions[key] for plan_id, key in keys.items()}
+
+
+def bump(plan_ids):
+    """Инвалидирует закэшированные профили планов."""
+    cache.set_many({
+        VERSION_KEY.format(plan_id): uuid.uuid4().hex for plan_id in plan_ids
+    }, None)
+
+
+def schedule_bump(plan_ids):
+    defer_on_commit(bump, plan_ids)
+
+
+def group_rows(plan_ids):
+    """``{id плана: [(группа мышц, сложность, подходы, повторения, объём)]}``.
+
+    Один запрос; планов без строк (и несуществующих) в ответе нет.
+    """
+    from .models import WorkoutPlanExercise
+
+    grouped = {}
+    for plan_id, *row in WorkoutPlanExercise.objects.filter(
+        workout_plan_id__in=plan_ids,
+    ).values(
+        "workout_plan_id", "exercise__muscle_group", "exercise__difficulty",
+    ).annotate(
+        total_sets=Sum("sets"),
+        total_reps=Sum("reps"),
+        volume=Sum(F("sets") * F("reps")),
+    ).order_by().values_list(
+        "workout_plan_id", "exercise__muscle_group", "exercise__difficulty",
+        "total_sets", "total_reps", "volume",
+    ):
+        grouped.setdefault(plan_id, []).append(tuple(row))
+    return grouped
+
+
+def plan_rows(plan_ids):
+    """Сгруппированные строки планов из кэша, недостающие — из БД.
+
+    Несуществующих планов в ответе нет.
+    """
+    from .models import WorkoutPlan
+
+    plan_ids = list(dict.fromkeys(plan_ids))
+    if not plan_ids:
+        return {}
+    versions = _versions(plan_ids)
+    keys = {
+        plan_id: ROWS_KEY.format(plan_id, versions[plan_id])
+        for plan_id in plan_ids
+    }
+    cached = cache.get_many(keys.values())
+    rows = {
+        plan_id: cached[key] for plan_id, key in keys.items() if key in cached
+    }
+    missing = [plan_id for plan_id in plan_ids if plan_id not in rows]
+    if missing:
+        computed = group_rows(missing)
+        empty = set(missing) - computed.keys()
+        if empty:
+            computed.update(dict.fromkeys(WorkoutPlan.objects.filter(
+                id__in=empty,
+            ).values_list("id", flat=True), []))
+        cache.set_many(
+            {keys[plan_id]: value for plan_id, value in computed.items()}
+        )
+        rows.update(computed)
+    return {plan_id: rows[plan_id] for plan_id in plan_ids if plan_id in rows}
+
+
+def batched_rows(plan_ids):
+    """Строки ``plan_rows`` планов по порядку, пачками по ``MAX_PLANS``:
+    длинный список (всё избранное) не уходит одним IN и одним get_many."""
+    plan_ids = list(plan_ids)
+    for start in range(0, len(plan_ids), MAX_PLANS):
+        yield from plan_rows(plan_ids[start:start + MAX_PLANS]).values()
+
+
+def profile(rows):
+    """Итог и разбивки по группам мышц и сложности для строк ``rows``."""
+    total = dict.fromkeys(MEASURES, 0)
+    muscle_groups, difficulties = {}, {}
+    for muscle_group, difficulty, *values in rows:
+        for target in (
+            total,
+            muscle_groups.setdefault(muscle_group, dict.fromkeys(MEASURES, 0)),
+            difficulties.setdefault(difficulty, dict.fromkeys(MEASURES, 0)),
+        ):
+            for measure, value in zip(MEASURES, values):
+                target[measure] += value
+    order = {
+        value: index for index, (value, _) in enumerate(
+            Exercise._meta.get_field("difficulty").choices
+        )
+    }
+    return {
+        "total": total,
+        "muscle_groups": [
+            {"value": value, **measures}
+            for value, measures in sorted(
+                muscle_groups.items(),
+                key=lambda item: (-item[1]["volume"], item[0]),
+            )
+        ],
+        "difficulties": [
+            {"value": value, **measures}
+            for value, measures in sorted(
+                difficulties.items(),
+                key=lambda item: order.get(item[0], len(order)),
+            )
+        ],
+    }
+
+
+def parse_ids(value):
+    """Id планов из ``?ids=1,2,3``: не пусто и не больше ``MAX_PLANS``."""
+    try:
+        plan_ids = [int(item) for item in (value or "").split(",") if item]
+    except ValueError:
+        plan_ids = None
+    if not plan_ids or len(plan_ids) > MAX_PLANS:
+        raise serializers.ValidationError(
+            {"ids": [ERRORS["invalid_plan_ids"].format(MAX_PLANS)]}
+        )
+    return plan_ids
@@ -5,3 +5,6 @@ class WorkoutPlansConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'workout_plans'
     verbose_name = 'Планы тренировок'
+
+    def ready(self):
+        from . import signals  # noqa: F401
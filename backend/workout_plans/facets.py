@@ -0,0 +1,208 @@
+"""Фасеты каталога планов: число планов на каждое значение фильтра.
+
+Для каждого плана в ``WorkoutPlanFacet`` хранятся его значения фасетов:
+группы мышц и сложности упражнений, диапазон длительности, автор. Тогда
+счётчики для любого состояния фильтров — один ``GROUP BY`` по этой
+таблице, без JOIN через строки плана и упражнения.
+
+Счётчики всего каталога (без фильтров) лежат готовыми в ``FacetCount`` и
+обновляются приращениями: после коммита пересчитываются значения только
+изменённых планов, а в счётчиках меняется лишь разница.
+"""
+from collections import Counter
+
+from django.db import transaction
+from django.db.models import Count, F
+
+from exercises.models import Exercise
+from foodgram.transactions import defer_on_commit
+
+MUSCLE_GROUP = "muscle_group"
+DIFFICULTY = "difficulty"
+DURATION_RANGE = "duration_range"
+AUTHOR = "author"
+FACETS = (MUSCLE_GROUP, DIFFICULTY, DURATION_RANGE, AUTHOR)
+# (верхняя граница не включительно, значение фасета).
+DURATION_RANGES = ((30, "0-29"), (60, "30-59"), (90, "60-89"), (None, "90+"))
+# Авторов много, в ответ попадают самые частые.
+AUTHOR_LIMIT = 20
+BATCH_SIZE = 1000
+
+
+def duration_range(duration):
+    for upper, value in DURATION_RANGES:
+        if upper is None or duration < upper:
+            return value
+
+
+def plan_facets(author_id, duration, exercises):
+    """Значения фасетов плана; ``exercises`` — пары (группа, сложность)."""
+    facets = {(AUTHOR, str(author_id)), (DURATION_RANGE, duration_range(
+        duration
+    ))}
+    for muscle_group, difficulty in exercises:
+        facets.add((MUSCLE_GROUP, muscle_group))
+        facets.add((DIFFICULTY, difficulty))
+    return facets
+
+
+def _current_facets(plan_ids):
+    from .models import WorkoutPlan, WorkoutPlanExercise
+
+    exercises = {}
+    for plan_id, *item in WorkoutPlanExercise.objects.filter(
+        workout_plan_id__in=plan_ids,
+    ).values_list(
+        "workout_plan_id", "exercise__muscle_group", "exercise__difficulty"
+    ):
+        exercises.setdefault(plan_id, []).append(item)
+    return {
+        plan_id: plan_facets(author_id, duration, exercises.get(plan_id, ()))
+        for plan_id, author_id, duration in WorkoutPlan.objects.filter(
+            id__in=plan_ids,
+        ).values_list("id", "author_id", "duration")
+    }
+
+
+def apply_counts(delta):
+    """Прибавляет ``delta`` ``{(фасет, значение): n}`` к ``FacetCount``."""
+    from .models import FacetCount
+
+    delta = {key: amount for key, amount in delta.items() if amount}
+    if not delta:
+        return
+    FacetCount.objects.bulk_create(
+        [FacetCount(facet=facet, value=value) for facet, value in delta],
+        ignore_conflicts=True,
+    )
+    # Один UPDATE на пару (приращение, фасет), а не на каждое значение.
+    groups = {}
+    for (facet, value), amount in delta.items():
+        groups.setdefault((amount, facet), []).append(value)
+    for (amount, facet), values in groups.items():
+        FacetCount.objects.filter(facet=facet, value__in=values).update(
+            count=F("count") + amount
+        )
+
+
+def refresh_facets(plan_ids):
+    """Сверяет значения фасетов планов с данными и правит счётчики."""
+    from .models import WorkoutPlan, WorkoutPlanFacet
+
+    plan_ids = sorted(set(plan_ids))
+    if not plan_ids:
+        return
+    with transaction.atomic():
+        # Блокировка планов: параллельные пересчёты одного плана не
+        # применят одну и ту же разницу дважды.
+        list(WorkoutPlan.objects.select_for_update().filter(
+            id__in=plan_ids,
+        ).order_by("id").values_list("id", flat=True))
+        wanted = _current_facets(plan_ids)
+        stored = {}
+        for pk, plan_id, facet, value in WorkoutPlanFacet.objects.filter(
+            workout_plan_id__in=plan_ids,
+        ).values_list("id", "workout_plan_id", "facet", "value"):
+            stored.setdefault(plan_id, {})[(facet, value)] = pk
+        delta = Counter()
+        to_create, to_delete = [], []
+        for plan_id, facets in wanted.items():
+            existing = stored.get(plan_id, {})
+            for key in facets - existing.keys():
+                to_create.append(WorkoutPlanFacet(
+                    workout_plan_id=plan_id, facet=key[0], value=key[1],
+                ))
+                delta[key] += 1
+            for key in existing.keys() - facets:
+                to_delete.append(existing[key])
+                delta[key] -= 1
+        if to_delete:
+            WorkoutPlanFacet.objects.filter(id__in=to_delete).delete()
+        if to_create:
+            WorkoutPlanFacet.objects.bulk_create(to_create)
+        apply_counts(delta)
+
+
+def schedule_refresh(plan_ids):
+    """``refresh_facets`` после коммита, одним вызовом на транзакцию."""
+    defer_on_commit(refresh_facets, plan_ids)
+
+
+def forget_plan(plan_id):
+    """Вычитает значения удаляемого плана (строки удалит каскад)."""
+    from .models import WorkoutPlanFacet
+
+    apply_counts(Counter({
+        key: -1 for key in WorkoutPlanFacet.objects.filter(
+            workout_plan_id=plan_id,
+        ).values_list("facet", "value")
+    }))
+
+
+def rebuild():
+    """Строит фасеты всех планов заново (массовая загрузка)."""
+    from .models import FacetCount, WorkoutPlan, WorkoutPlanFacet
+
+    WorkoutPlanFacet.objects.all().delete()
+    FacetCount.objects.all().delete()
+    plan_ids = list(
+        WorkoutPlan.objects.order_by("id").values_list("id", flat=True)
+    )
+    for start in range(0, len(plan_ids), BATCH_SIZE):
+        batch = _current_facets(plan_ids[start:start + BATCH_SIZE])
+        WorkoutPlanFacet.objects.bulk_create(
+            WorkoutPlanFacet(workout_plan_id=plan_id, facet=facet, value=value)
+            for plan_id, facets in batch.items()
+            for facet, value in facets
+        )
+    FacetCount.objects.bulk_create(
+        FacetCount(facet=row["facet"], value=row["value"], count=row["total"])
+        for row in WorkoutPlanFacet.objects.values("facet", "value").annotate(
+            total=Count("id")
+        ).order_by()
+    )
+
+
+def facet_counts(plans=None):
+    """Счётчики фасетов для планов ``plans`` (queryset) или всего каталога.
+
+    Каталог целиком читается из ``FacetCount``, выборка — одним
+    ``GROUP BY`` по ``WorkoutPlanFacet``.
+    """
+    from .models import FacetCount, WorkoutPlanFacet
+
+    if plans is None:
+        rows = FacetCount.objects.filter(count__gt=0).values_list(
+            "facet", "value", "count"
+        )
+    else:
+        rows = WorkoutPlanFacet.objects.filter(
+            workout_plan_id__in=plans.values("id"),
+        ).values("facet", "value").annotate(
+            total=Count("id")
+        ).order_by().values_list("facet", "value", "total")
+    grouped = {facet: [] for facet in FACETS}
+    for facet, value, count in rows:
+        grouped[facet].append({
+            "value": int(value) if facet == AUTHOR else value,
+            "count": count,
+        })
+    order = {
+        DIFFICULTY: {
+            value: index for index, (value, _) in enumerate(
+                Exercise._meta.get_field("difficulty").choices
+            )
+        },
+        DURATION_RANGE: {
+            value: index for index, (_, value) in enumerate(DURATION_RANGES)
+        },
+    }
+    for facet, items in grouped.items():
+        if facet in order:
+            items.sort(key=lambda item: order[facet].get(
+                item["value"], len(order[facet])
+            ))
+        else:
+            items.sort(key=lambda item: (-item["count"], item["value"]))
+    grouped[AUTHOR] = grouped[AUTHOR][:AUTHOR_LIMIT]
+    return grouped
@@ -0,0 +1,240 @@
+"""Лента планов от авторов, на которых подписан пользователь.
+
+Новые планы раскладываются по ``TimelineEntry`` подписчиков сразу после
+коммита (fan-out on write), поэтому страница ленты — диапазонный скан по
+индексу ``(user, created_at)``, а сами планы читаются потом по id.
+
+Авторы, у которых больше ``FANOUT_MAX_FOLLOWERS`` подписчиков, по лентам
+не раскладываются: их планы читаются отдельным запросом по индексу
+``(author, created_at)`` и сливаются с лентой при чтении (fan-out on read).
+Режим хранится в ``User.feed_pull`` и назад не переключается: если
+подписчиков снова станет меньше, в лентах всё равно не будет планов,
+вышедших без раскладки, поэтому автор остаётся в чтении напрямую.
+
+Лента каждого пользователя ограничивается примерно ``TIMELINE_SIZE``
+записями: её подрезает запись, а не чтение, — после подписки и при
+fan-out (у каждого ``TRIM_EVERY``-го подписчика, чтобы не перебирать
+все ленты на каждый план).
+"""
+import heapq
+
+from django.db.models import F, Q, Window
+from django.db.models.functions import RowNumber
+
+from users.models import Follow, User
+
+from .models import TimelineEntry, WorkoutPlan
+
+TIMELINE_SIZE = 500
+FANOUT_MAX_FOLLOWERS = 5000
+BATCH_SIZE = 1000
+TRIM_EVERY = 50
+
+
+def pulled_authors(author_ids):
+    """Id авторов из ``author_ids``, чьи планы лента читает напрямую.
+
+    Автор, у которого подписчиков больше ``FANOUT_MAX_FOLLOWERS``,
+    переводится в этот режим здесь, до раскладки его планов.
+    """
+    User.objects.filter(
+        pk__in=author_ids,
+        feed_pull=False,
+        followers_count__gt=FANOUT_MAX_FOLLOWERS,
+    ).update(feed_pull=True)
+    return set(User.objects.filter(
+        pk__in=author_ids, feed_pull=True,
+    ).values_list("pk", flat=True))
+
+
+def fan_out(workout_plans):
+    """Добавляет новые планы в ленты подписчиков их авторов.
+
+    Запросов — по одному на авторов, подписки и вставку, сколько бы
+    планов ни пришло (сохранение плана, импорт).
+    """
+    plans = {}
+    for workout_plan in workout_plans:
+        plans.setdefault(workout_plan.author_id, []).append(workout_plan)
+    authors = plans.keys() - pulled_authors(plans)
+    followers = {}
+    for user_id, author_id in Follow.objects.filter(
+        author_id__in=authors,
+    ).values_list("user_id", "author_id"):
+        followers.setdefault(author_id, []).append(user_id)
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user_id=follower_id,
+                workout_plan_id=workout_plan.pk,
+                author_id=author_id,
+                created_at=workout_plan.created_at,
+            )
+            for author_id, follower_ids in followers.items()
+            for workout_plan in plans[author_id]
+            for follower_id in follower_ids
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    # Каждая лента подрезается в среднем раз в TRIM_EVERY новых записей.
+    trim({
+        follower_id
+        for author_id, follower_ids in followers.items()
+        for workout_plan in plans[author_id]
+        for follower_id in follower_ids
+        if follower_id % TRIM_EVERY == workout_plan.pk % TRIM_EVERY
+    })
+
+
+def backfill(user, author):
+    """После подписки переносит в ленту последние планы автора."""
+    if author.pk in pulled_authors([author.pk]):
+        return
+    plans = WorkoutPlan.objects.filter(author=author).order_by(
+        "-created_at", "-id"
+    ).values_list("id", "created_at")[:TIMELINE_SIZE]
+    TimelineEntry.objects.bulk_create(
+        (
+            TimelineEntry(
+                user=user,
+                workout_plan_id=plan_id,
+                author=author,
+                created_at=created_at,
+            )
+            for plan_id, created_at in plans
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    trim([user.pk])
+
+
+def remove_author(user_id, author_id):
+    TimelineEntry.objects.filter(user_id=user_id, author_id=author_id).delete()
+
+
+def trim(user_ids):
+    """Удаляет из лент пользователей всё старше TIMELINE_SIZE-й записи.
+
+    Два запроса на любой список: границы лент — оконной функцией, затем
+    один DELETE.
+    """
+    user_ids = list(user_ids)
+    if not user_ids:
+        return
+    boundaries = TimelineEntry.objects.filter(user_id__in=user_ids).alias(
+        rank=Window(
+            RowNumber(),
+            partition_by=F("user_id"),
+            order_by=(F("created_at").desc(), F("workout_plan_id").desc()),
+        ),
+    ).filter(rank=TIMELINE_SIZE + 1).values_list(
+        "user_id", "created_at", "workout_plan_id"
+    )
+    condition = Q()
+    for user_id, created_at, plan_id in boundaries:
+        condition |= Q(user_id=user_id) & (
+            Q(created_at__lt=created_at)
+            | Q(created_at=created_at, workout_plan_id__lte=plan_id)
+        )
+    if condition:
+        TimelineEntry.objects.filter(condition).delete()
+
+
+class Feed:
+    """Лента пользователя как последовательность ``{"id", "created_at"}``,
+    новые первыми.
+
+    Поддерживает ``count()`` и срезы (для ``?page=``) и ``keyset_slice``
+    (для ``?cursor=``, см. ``KeysetCursorPagination``). Записи ленты и
+    планы авторов без fan-out читаются двумя запросами по индексам, каждый
+    не больше нужного числа строк, и сливаются в Python.
+    """
+
+    model = WorkoutPlan
+    ordering = ("-created_at", "-id")
+
+    def __init__(self, user):
+        self.user = user
+        self.pulled_authors = list(Follow.objects.filter(
+            user=user, author__feed_pull=True,
+        ).values_list("author_id", flat=True))
+
+    def _timeline(self):
+        # Записи авторов, которые читаются напрямую, пропускаются: они
+        # остаются от раскладки до перехода автора в этот режим.
+        entries = TimelineEntry.objects.filter(user=self.user)
+        if self.pulled_authors:
+            entries = entries.exclude(author_id__in=self.pulled_authors)
+        return entries
+
+    def _pulled(self):
+        return WorkoutPlan.objects.filter(author_id__in=self.pulled_authors)
+
+    def _pulled_page(self, position, reverse, limit):
+        """Планы авторов без fan-out: по ``limit`` строк каждого автора
+        (UNION ALL диапазонов индекса ``(author, created_at)``)."""
+        order = ("created_at", "id") if reverse else ("-created_at", "-id")
+        pages = [
+            self._keyset(
+                WorkoutPlan.objects.filter(author_id=author_id),
+                "id", position, reverse,
+            ).order_by(*order).values_list("created_at", "id")[:limit]
+            for author_id in self.pulled_authors
+        ]
+        if len(pages) == 1:
+            return pages[0]
+        return pages[0].union(*pages[1:], all=True).order_by(
+            *order
+        )[:limit]
+
+    @staticmethod
+    def _keyset(queryset, id_field, position, reverse):
+        if position is None:
+            return queryset
+        lookup = "gt" if reverse else "lt"
+        created_at, plan_id = position
+        return queryset.filter(
+            Q(**{f"created_at__{lookup}": created_at})
+            | Q(created_at=created_at, **{f"{id_field}__{lookup}": plan_id})
+        )
+
+    def count(self):
+        total = self._timeline().count()
+        if self.pulled_authors:
+            total += self._pulled().count()
+        return total
+
+    def keyset_slice(self, position, reverse, limit):
+        """До ``limit`` строк строго после ``position`` (created_at, id);
+        при ``reverse`` — до неё, от старых к новым."""
+        order = (
+            ("created_at", "workout_plan_id") if reverse
+            else ("-created_at", "-workout_plan_id")
+        )
+        pages = [self._keyset(
+            self._timeline(), "workout_plan_id", position, reverse,
+        ).order_by(*order).values_list(
+            "created_at", "workout_plan_id"
+        )[:limit]]
+        if self.pulled_authors:
+            pages.append(self._pulled_page(position, reverse, limit))
+        rows = [
+            [
+                {"id": plan_id, "created_at": created_at}
+                for created_at, plan_id in page
+            ]
+            for page in pages
+        ]
+        merged = heapq.merge(
+            *rows,
+            key=lambda row: (row["created_at"], row["id"]),
+            reverse=not reverse,
+        )
+        return list(merged)[:limit]
+
+    def __getitem__(self, index):
+        if not isinstance(index, slice) or index.step:
+            raise TypeError("Feed supports only slices without a step")
+        return self.keyset_slice(None, False, index.stop)[index.start or 0:]
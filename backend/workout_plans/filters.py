@@ -1,19 +1,101 @@
+from django.db.models import Count
 from django_filters import rest_framework as filters
+from rest_framework.filters import OrderingFilter, SearchFilter
 
-from .models import WorkoutPlan
+from .facets import (
+    DIFFICULTY,
+    DURATION_RANGE,
+    DURATION_RANGES,
+    MUSCLE_GROUP,
+)
+from .models import WorkoutPlan, WorkoutPlanExercise, WorkoutPlanFacet
+from .search import search_queryset
+
+EXERCISES_MATCH_CHOICES = (('all', 'all'), ('any', 'any'))
+
+
+class NumberInFilter(filters.BaseInFilter, filters.NumberFilter):
+    pass
+
+
+def plans_with_exercises(exercise_ids, match='all'):
+    """Подзапрос id планов, где есть все (или хотя бы одно) упражнения.
+
+    Одно сгруппированное полусоединение по ``WorkoutPlanExercise``
+    вместо JOIN на каждое упражнение: строки планов не размножаются,
+    а индекс ``(exercise, workout_plan)`` покрывает весь подзапрос.
+    """
+    exercise_ids = set(exercise_ids)
+    items = WorkoutPlanExercise.objects.filter(exercise_id__in=exercise_ids)
+    if match == 'all' and len(exercise_ids) > 1:
+        items = items.values('workout_plan_id').annotate(
+            matched=Count('exercise_id', distinct=True),
+        ).filter(matched=len(exercise_ids))
+    return items.values('workout_plan_id')
 
 
 class WorkoutPlanFilter(filters.FilterSet):
     author = filters.NumberFilter(field_name='author__id')
-    exercises = filters.NumberFilter(field_name='exercises__id')
+    # ?exercises=1,2,3 — планы со всеми упражнениями, с
+    # ?exercises_match=any — хотя бы с одним.
+    exercises = NumberInFilter(method='filter_exercises')
+    exercises_match = filters.ChoiceFilter(
+        choices=EXERCISES_MATCH_CHOICES, method='filter_exercises_match',
+    )
     is_favorited = filters.BooleanFilter(method='filter_is_favorited')
     duration = filters.NumberFilter(field_name='duration')
+    # Значения фасетов (см. workout_plans.facets).
+    muscle_group = filters.CharFilter(method='filter_facet')
+    difficulty = filters.CharFilter(method='filter_facet')
+    duration_range = filters.ChoiceFilter(
+        choices=[(value, value) for _, value in DURATION_RANGES],
+        method='filter_facet',
+    )
 
     class Meta:
         model = WorkoutPlan
-        fields = ('author', 'exercises', 'is_favorited', 'duration')
+        fields = (
+            'author', 'exercises', 'exercises_match', 'is_favorited',
+            'duration', MUSCLE_GROUP, DIFFICULTY, DURATION_RANGE,
+        )
+
+    def filter_exercises(self, queryset, name, value):
+        if not value:
+            return queryset
+        match = self.form.cleaned_data.get('exercises_match') or 'all'
+        return queryset.filter(id__in=plans_with_exercises(value, match))
+
+    def filter_exercises_match(self, queryset, name, value):
+        # Учитывается в filter_exercises.
+        return queryset
+
+    def filter_facet(self, queryset, name, value):
+        return queryset.filter(id__in=WorkoutPlanFacet.objects.filter(
+            facet=name, value=value,
+        ).values('workout_plan_id'))
 
     def filter_is_favorited(self, queryset, name, value):
         if value and self.request.user.is_authenticated:
             return queryset.filter(favorite__user=self.request.user)
-        return queryset 
\ No newline at end of file
+        return queryset
+
+
+class WorkoutPlanSearchFilter(SearchFilter):
+    """?search= по индексированному поисковому документу плана."""
+
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(self.search_param, '')
+        return search_queryset(queryset, query.replace('\x00', ''))
+
+
+class WorkoutPlanOrderingFilter(OrderingFilter):
+    """?ordering= с добавлением id, чтобы порядок был однозначным."""
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        if not ordering or ordering is self.get_default_ordering(view):
+            return ordering
+        ordering = list(ordering)
+        if ordering[-1].lstrip('-') != 'id':
+            ordering.append('-id' if ordering[-1].startswith('-') else 'id')
+        return ordering
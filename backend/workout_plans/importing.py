@@ -0,0 +1,177 @@
+from django.contrib.auth import get_user_model
+
+from exercises.models import Exercise
+from foodgram.importing import Importer, parse_id
+
+from . import analytics, facets, feed, response_cache, similar
+from .models import WorkoutPlan, WorkoutPlanExercise
+from .search import build_search_document, refresh_search_documents
+
+User = get_user_model()
+
+REFRESH_BATCH_SIZE = 1000
+
+
+def refresh_in_batches(refresh, plan_ids):
+    plan_ids = sorted(plan_ids)
+    for start in range(0, len(plan_ids), REFRESH_BATCH_SIZE):
+        refresh(plan_ids[start:start + REFRESH_BATCH_SIZE])
+
+
+class WorkoutPlanImporter(Importer):
+    """Планы тренировок с необязательным вложенным списком упражнений.
+
+    Упражнения в записи плана задаются как ``{"name"|"id", "sets",
+    "reps"}``; названия разрешаются по словарю, загруженному в
+    ``prepare``. План, у автора которого уже есть план с таким названием
+    (или с таким id), пропускается вместе с упражнениями.
+    """
+
+    label = "workout plans"
+    models = ("workout_plans.workoutplan",)
+
+    def __init__(self, writer, default_author=None, **kwargs):
+        super().__init__(writer, **kwargs)
+        self.default_author = default_author
+
+    def prepare(self):
+        self.plan_ids = set()
+        self.exercises = dict(Exercise.objects.values_list("name", "id"))
+        self.exercise_names = {pk: name for name, pk in self.exercises.items()}
+
+    def build(self, record):
+        items = []
+        for item in record.get("exercises") or ():
+            exercise_id = item.get("id") or self.exercises.get(
+                item.get("name")
+            )
+            if exercise_id not in self.exercise_names:
+                return None
+            items.append((exercise_id, item["sets"], item["reps"]))
+        # В CSV все значения — строки; запись с некорректным id или
+        # длительностью пропускается.
+        try:
+            pk = parse_id(record.get("pk") or record.get("id"))
+            author_id = parse_id(record.get("author"))
+            duration = int(record["duration"])
+        except (TypeError, ValueError):
+            return None
+        plan = WorkoutPlan(
+            pk=pk,
+            name=record["name"],
+            description=record.get("description", ""),
+            duration=duration,
+            author_id=author_id,
+            image=record.get("image") or "",
+        )
+        plan.search_document = build_search_document(
+            plan.name,
+            plan.description,
+            [self.exercise_names[exercise_id] for exercise_id, _, _ in items],
+        )
+        return plan, items
+
+    def flush(self, batch):
+        authors = set(User.objects.filter(
+            id__in={plan.author_id for plan, _ in batch if plan.author_id},
+        ).values_list("id", flat=True))
+        for plan, _ in batch:
+            if plan.author_id not in authors and self.default_author:
+                plan.author_id = self.default_author.id
+        batch = [(plan, items) for plan, items in batch if plan.author_id]
+
+        existing_ids = set(WorkoutPlan.objects.filter(
+            id__in=[plan.pk for plan, _ in batch if plan.pk],
+        ).values_list("id", flat=True))
+        existing_names = set(WorkoutPlan.objects.filter(
+            author_id__in={plan.author_id for plan, _ in batch},
+            name__in={plan.name for plan, _ in batch},
+        ).values_list("author_id", "name"))
+        new = []
+        for plan, items in batch:
+            key = (plan.author_id, plan.name)
+            if plan.pk in existing_ids or key in existing_names:
+                continue
+            existing_names.add(key)
+            new.append((plan, items))
+
+        self.writer.insert(
+            WorkoutPlan, [plan for plan, _ in new], key=("author", "name"),
+        )
+        self.writer.insert(WorkoutPlanExercise, [
+            WorkoutPlanExercise(
+                workout_plan_id=plan.pk,
+                exercise_id=exercise_id,
+                sets=sets,
+                reps=reps,
+            )
+            for plan, items in new
+            for exercise_id, sets, reps in items
+        ])
+        # Сигналы post_save при пакетной записи не срабатывают.
+        feed.fan_out([plan for plan, _ in new])
+        self.plan_ids.update(plan.pk for plan, _ in new)
+        return len(new)
+
+    def finish(self):
+        refresh_in_batches(facets.refresh_facets, self.plan_ids)
+        refresh_in_batches(similar.refresh_signatures, self.plan_ids)
+        refresh_in_batches(analytics.bump, self.plan_ids)
+        response_cache.bump()
+
+
+class WorkoutPlanExerciseImporter(Importer):
+    """Строки планов из фикстуры (ссылки на план и упражнение по id)."""
+
+    label = "workout plan exercises"
+    models = ("workout_plans.workoutplanexercise",)
+
+    def prepare(self):
+        self.exercise_ids = set(
+            Exercise.objects.values_list("id", flat=True)
+        )
+        self.plan_ids = set()
+
+    def accepts(self, record):
+        return record.get("model") in self.models
+
+    def build(self, record):
+        try:
+            pk = parse_id(record.get("pk"))
+            workout_plan_id = parse_id(record["workout_plan"])
+            exercise_id = parse_id(record["exercise"])
+        except (TypeError, ValueError):
+            return None
+        if exercise_id not in self.exercise_ids:
+            return None
+        return WorkoutPlanExercise(
+            pk=pk,
+            workout_plan_id=workout_plan_id,
+            exercise_id=exercise_id,
+            sets=record["sets"],
+            reps=record["reps"],
+        )
+
+    def flush(self, batch):
+        plans = set(WorkoutPlan.objects.filter(
+            id__in={item.workout_plan_id for item in batch},
+        ).values_list("id", flat=True))
+        existing = set(WorkoutPlanExercise.objects.filter(
+            id__in=[item.pk for item in batch if item.pk],
+        ).values_list("id", flat=True))
+        new = [
+            item for item in batch
+            if item.workout_plan_id in plans and item.pk not in existing
+        ]
+        self.writer.insert(WorkoutPlanExercise, new)
+        self.plan_ids.update(item.workout_plan_id for item in new)
+        return len(new)
+
+    def finish(self):
+        # Поисковые документы, фасеты и подписи зависят от упражнений,
+        # пришедших отдельно.
+        refresh_in_batches(refresh_search_documents, self.plan_ids)
+        refresh_in_batches(facets.refresh_facets, self.plan_ids)
+        refresh_in_batches(similar.refresh_signatures, self.plan_ids)
+        refresh_in_batches(analytics.bump, self.plan_ids)
+        response_cache.bump()
@@ -0,0 +1,110 @@
+import asyncio
+import json
+import time
+from urllib.parse import urlsplit
+
+from django.core.management.base import BaseCommand, CommandError
+
+from foodgram.benchmarking import summarize
+from exercises.models import Exercise
+from workout_plans.models import WorkoutPlan, WorkoutPlanShortLink
+
+MODES = (('sync', '/api/'), ('async', '/api/catalog/'))
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare sync and async (/api/catalog/) read endpoints on a running '
+        'server, e.g. one uvicorn worker: '
+        'uvicorn foodgram.asgi:application --workers 1'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--base-url', default='http://127.0.0.1:8000')
+        parser.add_argument(
+            '--concurrency', type=int, default=100,
+            help='Number of simultaneous clients',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Requests per endpoint and mode',
+        )
+        parser.add_argument('--output', help='Write results as JSON')
+
+    def handle(self, *args, **options):
+        url = urlsplit(options['base_url'])
+        if url.scheme != 'http' or not url.hostname:
+            raise CommandError('Only http:// base URLs are supported')
+        plan_id = WorkoutPlan.objects.values_list('id', flat=True).first()
+        url_hash = WorkoutPlanShortLink.objects.values_list(
+            'url_hash', flat=True
+        ).first()
+        if plan_id is None or not Exercise.objects.exists():
+            raise CommandError('Load data first (manage.py load_data)')
+
+        endpoints = [
+            ('plan list', '/api/workout-plans/'),
+            ('plan detail', f'/api/workout-plans/{plan_id}/'),
+            ('exercise list', '/api/exercises/'),
+        ]
+        if url_hash:
+            endpoints.append(('short link', f'/api/s/{url_hash}/'))
+
+        results = []
+        for name, path in endpoints:
+            for mode, prefix in MODES:
+                target = prefix + path[len('/api/'):]
+                summary = asyncio.run(self.run(
+                    url.hostname, url.port or 80, target,
+                    options['concurrency'], options['requests'],
+                ))
+                results.append({'endpoint': name, 'mode': mode, **summary})
+                self.stdout.write(
+                    f"{name:<14} {mode:<6} {summary['rps']:>8} rps  "
+                    f"p50 {summary['p50']:>8} ms  p99 {summary['p99']:>8} ms"
+                    f"  errors {summary['errors']}"
+                )
+        if options['output']:
+            with open(options['output'], 'w', encoding='utf-8') as file:
+                json.dump(results, file, ensure_ascii=False, indent=2)
+        self.stdout.write(self.style.SUCCESS('Benchmark finished'))
+
+    async def run(self, host, port, path, concurrency, total):
+        latencies, errors = [], 0
+        queue = asyncio.Queue()
+        for _ in range(total):
+            queue.put_nowait(None)
+
+        async def client():
+            nonlocal errors
+            while not queue.empty():
+                queue.get_nowait()
+                started = time.perf_counter()
+                try:
+                    status = await self.get(host, port, path)
+                except OSError:
+                    status = None
+                if status is None or status >= 400:
+                    errors += 1
+                else:
+                    latencies.append((time.perf_counter() - started) * 1000)
+
+        started = time.perf_counter()
+        await asyncio.gather(*(client() for _ in range(concurrency)))
+        summary = summarize(latencies, time.perf_counter() - started)
+        summary['errors'] = errors
+        return summary
+
+    @staticmethod
+    async def get(host, port, path):
+        reader, writer = await asyncio.open_connection(host, port)
+        writer.write(
+            f'GET {path} HTTP/1.1\r\nHost: {host}:{port}\r\n'
+            'Connection: close\r\n\r\n'.encode()
+        )
+        await writer.drain()
+        status_line = await reader.readline()
+        await reader.read()
+        writer.close()
+        await writer.wait_closed()
+        return int(status_line.split()[1])
@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+
+from workout_plans import recommendations
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuild plan neighbours for recommendations from the favorites '
+        'co-occurrence matrix'
+    )
+
+    def handle(self, *args, **options):
+        total = recommendations.rebuild()
+        self.stdout.write(
+            self.style.SUCCESS(f'Stored {total} plan neighbours')
+        )
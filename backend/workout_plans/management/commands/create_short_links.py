@@ -0,0 +1,34 @@
+from django.core.management.base import BaseCommand
+
+from workout_plans.models import WorkoutPlan
+from workout_plans.short_links import BATCH_SIZE, bulk_create_links
+
+
+class Command(BaseCommand):
+    help = 'Create short links for workout plans that do not have one yet'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'ids',
+            nargs='*',
+            type=int,
+            help='Workout plan ids (all plans if omitted)',
+        )
+
+    def handle(self, *args, **options):
+        plans = WorkoutPlan.objects.order_by('id')
+        if options['ids']:
+            plans = plans.filter(id__in=options['ids'])
+        batch, total = [], 0
+        for plan_id in plans.values_list('id', flat=True).iterator(
+            chunk_size=BATCH_SIZE
+        ):
+            batch.append(plan_id)
+            if len(batch) == BATCH_SIZE:
+                total += len(bulk_create_links(batch))
+                batch = []
+        if batch:
+            total += len(bulk_create_links(batch))
+        self.stdout.write(self.style.SUCCESS(
+            f'Short links ensured for {total} workout plans'
+        ))
@@ -0,0 +1,62 @@
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from django.conf import settings
+from django.core.files.storage import default_storage
+from django.core.management.base import BaseCommand
+
+from foodgram import thumbnails
+from users.models import User
+from workout_plans.models import WorkoutPlan
+
+
+class Command(BaseCommand):
+    help = 'Generate missing thumbnails for workout plan images and avatars'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Regenerate thumbnails that are already up to date',
+        )
+
+    def handle(self, *args, **options):
+        generated = failed = 0
+        with ProcessPoolExecutor(
+            max_workers=settings.THUMBNAIL_WORKERS or None,
+            mp_context=multiprocessing.get_context('spawn'),
+        ) as pool:
+            for model, field_name in (
+                (WorkoutPlan, 'image'), (User, 'avatar'),
+            ):
+                images = model.objects.exclude(
+                    **{f'{field_name}__isnull': True},
+                ).exclude(**{field_name: ''}).values_list(
+                    'pk', field_name, f'{field_name}_variants',
+                )
+                futures = {
+                    pool.submit(
+                        thumbnails.render,
+                        default_storage.path(name),
+                        str(settings.MEDIA_ROOT),
+                        name,
+                        thumbnails.owner(model, pk),
+                    ): (pk, name)
+                    for pk, name, variants in images.iterator()
+                    if options['all'] or (variants or {}).get('source') != name
+                }
+                for future in as_completed(futures):
+                    pk, name = futures[future]
+                    try:
+                        thumbnails.store(
+                            model, pk, field_name, name, future.result()
+                        )
+                        generated += 1
+                    except Exception as error:
+                        failed += 1
+                        self.stderr.write(f'{name}: {error}')
+        self.stdout.write(
+            self.style.SUCCESS(
+                f'Generated thumbnails for {generated} images, {failed} failed'
+            )
+        )
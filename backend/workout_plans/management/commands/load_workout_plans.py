@@ -1,16 +1,23 @@
-import json
 import os
 
 from django.core.management.base import BaseCommand
 from django.contrib.auth import get_user_model
 
-from workout_plans.models import WorkoutPlan
+from foodgram import importing
+from workout_plans.importing import WorkoutPlanImporter
 
 User = get_user_model()
 
 
 class Command(BaseCommand):
-    help = 'Load workout plans from JSON file'
+    help = 'Load workout plans from a JSON, JSON Lines or CSV file'
+
+    def add_arguments(self, parser):
+        importing.add_arguments(parser, os.path.join(
+            os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
+            'data',
+            'workout_plans.json',
+        ))
 
     def handle(self, *args, **options):
         # Get or create a superuser for the workout plans
@@ -26,24 +33,12 @@ class Command(BaseCommand):
             admin_user.set_password('admin')
             admin_user.save()
 
-        with open(
-            os.path.join(
-                os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                "data",
-                "workout_plans.json"
-            ),
-            encoding="utf-8",
-        ) as file:
-            data = json.load(file)
-            for item in data:
-                WorkoutPlan.objects.get_or_create(
-                    name=item['name'],
-                    defaults={
-                        'description': item['description'],
-                        'duration': item['duration'],
-                        'author': admin_user
-                    }
-                )
-            self.stdout.write(
-                self.style.SUCCESS(f'Successfully loaded {len(data)} workout plans')
-            ) 
\ No newline at end of file
+        rows = importing.run(
+            WorkoutPlanImporter,
+            options,
+            self.stdout,
+            default_author=admin_user,
+        )
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully loaded {rows} workout plans')
+        )
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, F, Max, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+from workout_plans.models import Favorite, WorkoutPlan
+
+
+class Command(BaseCommand):
+    help = 'Recalculate WorkoutPlan.favorites_count from Favorite in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Number of plan ids per UPDATE statement',
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        actual = Coalesce(
+            Subquery(
+                Favorite.objects.filter(workout_plan_id=OuterRef('pk'))
+                .order_by()
+                .values('workout_plan_id')
+                .annotate(total=Count('id'))
+                .values('total')
+            ),
+            0,
+        )
+        last_id = WorkoutPlan.objects.aggregate(last=Max('id'))['last'] or 0
+        fixed = 0
+        for start in range(0, last_id, batch_size):
+            # Каждая пачка — один UPDATE: значения считаются в той же
+            # инструкции, поэтому параллельные лайки не теряются.
+            fixed += WorkoutPlan.objects.filter(
+                id__gt=start, id__lte=start + batch_size,
+            ).alias(actual=actual).exclude(
+                favorites_count=F('actual'),
+            ).update(favorites_count=actual)
+        self.stdout.write(self.style.SUCCESS(
+            f'Fixed favorites_count for {fixed} workout plans'
+        ))
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['-created_at', '-id'], name='workout_plan_created_id_idx'),
+        ),
+    ]
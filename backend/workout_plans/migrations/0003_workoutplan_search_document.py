@@ -0,0 +1,86 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+
+BATCH_SIZE = 1000
+SEARCH_INDEX_NAME = 'workout_plan_search_gin_idx'
+
+
+# Копия workout_plans.search.build_search_document на момент миграции:
+# миграция не должна зависеть от живого кода.
+def build_search_document(name, description, exercise_names):
+    document = ' '.join([name, description, *exercise_names])
+    return ' '.join(document.lower().split())
+
+
+def fill_search_documents(apps, schema_editor):
+    WorkoutPlan = apps.get_model('workout_plans', 'WorkoutPlan')
+    WorkoutPlanExercise = apps.get_model(
+        'workout_plans', 'WorkoutPlanExercise'
+    )
+    plans = WorkoutPlan.objects.only('id', 'name', 'description')
+    batch = []
+    for plan in plans.iterator(chunk_size=BATCH_SIZE):
+        batch.append(plan)
+        if len(batch) == BATCH_SIZE:
+            _fill_batch(WorkoutPlan, WorkoutPlanExercise, batch)
+            batch = []
+    if batch:
+        _fill_batch(WorkoutPlan, WorkoutPlanExercise, batch)
+
+
+def _fill_batch(WorkoutPlan, WorkoutPlanExercise, plans):
+    names = {}
+    for plan_id, name in WorkoutPlanExercise.objects.filter(
+        workout_plan_id__in=[plan.id for plan in plans],
+    ).values_list('workout_plan_id', 'exercise__name'):
+        names.setdefault(plan_id, []).append(name)
+    for plan in plans:
+        plan.search_document = build_search_document(
+            plan.name, plan.description, names.get(plan.id, []),
+        )
+    WorkoutPlan.objects.bulk_update(plans, ['search_document'])
+
+
+# GIN-индекс по to_tsvector есть только на PostgreSQL; на остальных СУБД
+# поиск идёт подстрочно по search_document (workout_plans.search).
+def search_index():
+    return GinIndex(
+        SearchVector('search_document', config='russian'),
+        name=SEARCH_INDEX_NAME,
+    )
+
+
+def add_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.add_index(
+        apps.get_model('workout_plans', 'WorkoutPlan'), search_index()
+    )
+
+
+def remove_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.remove_index(
+        apps.get_model('workout_plans', 'WorkoutPlan'), search_index()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0002_workoutplan_created_id_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutplan',
+            name='search_document',
+            field=models.TextField(blank=True, default='', editable=False, verbose_name='Поисковый документ'),
+        ),
+        migrations.RunPython(
+            fill_search_documents, migrations.RunPython.noop
+        ),
+        migrations.RunPython(add_search_index, remove_search_index),
+    ]
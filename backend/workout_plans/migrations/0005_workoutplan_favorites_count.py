@@ -0,0 +1,46 @@
+# Generated by Django 4.2.21 on 2026-10-18 13:26
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def fill_favorites_count(apps, schema_editor):
+    WorkoutPlan = apps.get_model('workout_plans', 'WorkoutPlan')
+    Favorite = apps.get_model('workout_plans', 'Favorite')
+    WorkoutPlan.objects.update(favorites_count=Coalesce(
+        Subquery(
+            Favorite.objects.filter(workout_plan_id=OuterRef('pk'))
+            .order_by()
+            .values('workout_plan_id')
+            .annotate(total=Count('id'))
+            .values('total')
+        ),
+        0,
+    ))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0004_timelineentry'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='workoutplan',
+            name='favorites_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Добавлений в избранное'),
+        ),
+        migrations.RunPython(
+            fill_favorites_count, migrations.RunPython.noop
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['-favorites_count', '-id'], name='workout_plan_favorites_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['duration', 'id'], name='workout_plan_duration_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0006_workoutplan_image_variants'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workoutplanexercise',
+            index=models.Index(fields=['exercise', 'workout_plan'], name='workout_plan_item_exercise_idx'),
+        ),
+    ]
@@ -0,0 +1,109 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:12
+
+from collections import Counter
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+BATCH_SIZE = 1000
+# Копия workout_plans.facets на момент миграции: миграция не должна
+# зависеть от живого кода.
+DURATION_RANGES = ((30, '0-29'), (60, '30-59'), (90, '60-89'), (None, '90+'))
+
+
+def duration_range(duration):
+    for upper, value in DURATION_RANGES:
+        if upper is None or duration < upper:
+            return value
+
+
+def fill_facets(apps, schema_editor):
+    WorkoutPlan = apps.get_model('workout_plans', 'WorkoutPlan')
+    WorkoutPlanExercise = apps.get_model(
+        'workout_plans', 'WorkoutPlanExercise'
+    )
+    WorkoutPlanFacet = apps.get_model('workout_plans', 'WorkoutPlanFacet')
+    FacetCount = apps.get_model('workout_plans', 'FacetCount')
+
+    counts = Counter()
+    plans = list(WorkoutPlan.objects.order_by('id').values_list(
+        'id', 'author_id', 'duration'
+    ))
+    for start in range(0, len(plans), BATCH_SIZE):
+        batch = plans[start:start + BATCH_SIZE]
+        facets = {
+            plan_id: {
+                ('author', str(author_id)),
+                ('duration_range', duration_range(duration)),
+            }
+            for plan_id, author_id, duration in batch
+        }
+        for plan_id, muscle_group, difficulty in (
+            WorkoutPlanExercise.objects.filter(
+                workout_plan_id__in=facets,
+            ).values_list(
+                'workout_plan_id', 'exercise__muscle_group',
+                'exercise__difficulty',
+            )
+        ):
+            facets[plan_id].add(('muscle_group', muscle_group))
+            facets[plan_id].add(('difficulty', difficulty))
+        WorkoutPlanFacet.objects.bulk_create(
+            WorkoutPlanFacet(workout_plan_id=plan_id, facet=facet, value=value)
+            for plan_id, values in facets.items()
+            for facet, value in values
+        )
+        counts.update(key for values in facets.values() for key in values)
+    FacetCount.objects.bulk_create(
+        FacetCount(facet=facet, value=value, count=count)
+        for (facet, value), count in counts.items()
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0007_workoutplanexercise_exercise_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FacetCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=32, verbose_name='Фасет')),
+                ('value', models.CharField(max_length=128, verbose_name='Значение')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Число планов')),
+            ],
+            options={
+                'verbose_name': 'Счётчик фасета',
+                'verbose_name_plural': 'Счётчики фасетов',
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkoutPlanFacet',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('facet', models.CharField(max_length=32, verbose_name='Фасет')),
+                ('value', models.CharField(max_length=128, verbose_name='Значение')),
+                ('workout_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='facets', to='workout_plans.workoutplan', verbose_name='План тренировок')),
+            ],
+            options={
+                'verbose_name': 'Фасет плана',
+                'verbose_name_plural': 'Фасеты планов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='facetcount',
+            constraint=models.UniqueConstraint(fields=('facet', 'value'), name='unique_facet_value'),
+        ),
+        migrations.AddIndex(
+            model_name='workoutplanfacet',
+            index=models.Index(fields=['facet', 'value', 'workout_plan'], name='workout_plan_facet_value_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='workoutplanfacet',
+            constraint=models.UniqueConstraint(fields=('workout_plan', 'facet', 'value'), name='unique_workout_plan_facet'),
+        ),
+        migrations.RunPython(fill_facets, migrations.RunPython.noop),
+    ]
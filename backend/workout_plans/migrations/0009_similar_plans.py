@@ -0,0 +1,108 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:25
+
+from django.db import migrations, models
+import django.db.models.deletion
+import numpy as np
+
+# Копия MinHash из workout_plans.similar на момент миграции: миграция не
+# должна зависеть от живого кода. Параметры обязаны совпадать с живыми,
+# иначе подписи отсюда не сравнятся с пересчитанными после.
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+PRIME = (1 << 31) - 1
+RANDOM_SEED = 20240611
+BATCH_SIZE = 5000
+
+
+def fill_signatures(apps, schema_editor):
+    WorkoutPlan = apps.get_model('workout_plans', 'WorkoutPlan')
+    WorkoutPlanExercise = apps.get_model(
+        'workout_plans', 'WorkoutPlanExercise'
+    )
+    WorkoutPlanSignature = apps.get_model(
+        'workout_plans', 'WorkoutPlanSignature'
+    )
+    WorkoutPlanBucket = apps.get_model('workout_plans', 'WorkoutPlanBucket')
+
+    rng = np.random.default_rng(RANDOM_SEED)
+    a = rng.integers(1, PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+    b = rng.integers(0, PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+    band_multipliers = rng.integers(
+        1, 1 << 62, (BANDS, ROWS), dtype=np.uint64
+    ) | np.uint64(1)
+    band_salts = rng.integers(0, 1 << 62, BANDS, dtype=np.uint64)
+
+    plan_ids = list(
+        WorkoutPlan.objects.order_by('id').values_list('id', flat=True)
+    )
+    for start in range(0, len(plan_ids), BATCH_SIZE):
+        batch = plan_ids[start:start + BATCH_SIZE]
+        pairs = np.array(
+            WorkoutPlanExercise.objects.filter(
+                workout_plan_id__gte=batch[0], workout_plan_id__lte=batch[-1],
+            ).order_by('workout_plan_id').values_list(
+                'workout_plan_id', 'exercise_id'
+            ),
+            dtype=np.int64,
+        ).reshape(-1, 2)
+        if not len(pairs):
+            continue
+        plans = pairs[:, 0]
+        exercises = pairs[:, 1].astype(np.uint64)
+        hashes = (exercises[:, None] * a + b) % np.uint64(PRIME)
+        starts = np.flatnonzero(np.r_[True, plans[1:] != plans[:-1]])
+        signatures = np.minimum.reduceat(
+            hashes, starts, axis=0
+        ).astype(np.uint32)
+        bands = signatures.astype(np.uint64).reshape(-1, BANDS, ROWS)
+        buckets = (
+            (bands * band_multipliers).sum(axis=2) + band_salts
+        ) >> np.uint64(1)
+        plans = plans[starts].tolist()
+        WorkoutPlanSignature.objects.bulk_create([
+            WorkoutPlanSignature(
+                workout_plan_id=plan_id, signature=row.tobytes()
+            )
+            for plan_id, row in zip(plans, signatures)
+        ])
+        WorkoutPlanBucket.objects.bulk_create([
+            WorkoutPlanBucket(workout_plan_id=plan_id, bucket=bucket)
+            for plan_id, row in zip(plans, buckets.astype(np.int64))
+            for bucket in row.tolist()
+        ])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0008_facets'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='WorkoutPlanSignature',
+            fields=[
+                ('workout_plan', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='workout_plans.workoutplan', verbose_name='План тренировок')),
+                ('signature', models.BinaryField(verbose_name='Подпись')),
+            ],
+            options={
+                'verbose_name': 'Подпись плана',
+                'verbose_name_plural': 'Подписи планов',
+            },
+        ),
+        migrations.CreateModel(
+            name='WorkoutPlanBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('bucket', models.BigIntegerField(verbose_name='Корзина')),
+                ('workout_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='buckets', to='workout_plans.workoutplan', verbose_name='План тренировок')),
+            ],
+            options={
+                'verbose_name': 'Корзина похожих планов',
+                'verbose_name_plural': 'Корзины похожих планов',
+                'indexes': [models.Index(fields=['bucket', 'workout_plan'], name='workout_plan_bucket_idx')],
+            },
+        ),
+        migrations.RunPython(fill_signatures, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,73 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:30
+
+from collections import Counter
+from itertools import combinations, groupby
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+# Копия workout_plans.recommendations.NEIGHBOURS на момент миграции;
+# совместная встречаемость считается здесь без SciPy, чтобы миграция не
+# зависела от живого кода.
+NEIGHBOURS = 20
+BATCH_SIZE = 5000
+
+
+def fill_neighbours(apps, schema_editor):
+    Favorite = apps.get_model('workout_plans', 'Favorite')
+    PlanNeighbour = apps.get_model('workout_plans', 'PlanNeighbour')
+
+    weights = Counter()
+    favorites = Favorite.objects.order_by(
+        'user_id', 'workout_plan_id'
+    ).values_list('user_id', 'workout_plan_id').iterator(
+        chunk_size=BATCH_SIZE
+    )
+    for _, rows in groupby(favorites, key=lambda row: row[0]):
+        plans = sorted({plan_id for _, plan_id in rows})
+        for plan_id, other_id in combinations(plans, 2):
+            weights[plan_id, other_id] += 1
+    neighbours = {}
+    for (plan_id, other_id), weight in weights.items():
+        neighbours.setdefault(plan_id, []).append((-weight, other_id))
+        neighbours.setdefault(other_id, []).append((-weight, plan_id))
+    # Самые весомые соседи, при равном весе — с меньшим id.
+    PlanNeighbour.objects.bulk_create(
+        (
+            PlanNeighbour(
+                workout_plan_id=plan_id, neighbour_id=other_id,
+                weight=-weight,
+            )
+            for plan_id, items in neighbours.items()
+            for weight, other_id in sorted(items)[:NEIGHBOURS]
+        ),
+        batch_size=BATCH_SIZE,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0009_similar_plans'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PlanNeighbour',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('weight', models.IntegerField(default=0, verbose_name='Вес')),
+                ('neighbour', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='workout_plans.workoutplan', verbose_name='Соседний план')),
+                ('workout_plan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='neighbours', to='workout_plans.workoutplan', verbose_name='План тренировок')),
+            ],
+            options={
+                'verbose_name': 'Сосед плана',
+                'verbose_name_plural': 'Соседи планов',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='planneighbour',
+            constraint=models.UniqueConstraint(fields=('workout_plan', 'neighbour'), name='unique_plan_neighbour'),
+        ),
+        migrations.RunPython(fill_neighbours, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.21 on 2026-10-18 14:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('workout_plans', '0010_plan_neighbours'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='workoutplan',
+            index=models.Index(fields=['author', '-created_at', '-id'], name='workout_plan_author_idx'),
+        ),
+    ]
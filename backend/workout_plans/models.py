@@ -1,4 +1,5 @@
 from django.db import models
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 
@@ -7,6 +8,35 @@ from exercises.models import Exercise
 User = get_user_model()
 
 
+class WorkoutPlanQuerySet(models.QuerySet):
+    def with_items(self):
+        """Автор и строки плана — без N+1 в сериализаторе.
+
+        Сами упражнения не подгружаются: сериализатор берёт их из снимка
+        каталога (``exercises.catalog``).
+        """
+        return self.select_related("author").prefetch_related(
+            Prefetch(
+                "exercises_items",
+                queryset=WorkoutPlanExercise.objects.order_by("id"),
+            ),
+        )
+
+    def annotate_favorited(self, user):
+        if user is None or not user.is_authenticated:
+            return self.annotate(
+                is_favorited_flag=Value(False, output_field=BooleanField()),
+            )
+        return self.annotate(
+            is_favorited_flag=Exists(
+                Favorite.objects.filter(
+                    user=user,
+                    workout_plan_id=OuterRef("pk"),
+                )
+            )
+        )
+
+
 class WorkoutPlan(models.Model):
     name = models.CharField(
         verbose_name="Название плана тренировок",
@@ -46,11 +76,49 @@ class WorkoutPlan(models.Model):
         auto_now_add=True,
         db_index=True,
     )
+    favorites_count = models.PositiveIntegerField(
+        verbose_name="Добавлений в избранное",
+        default=0,
+        editable=False,
+    )
+    search_document = models.TextField(
+        verbose_name="Поисковый документ",
+        blank=True,
+        default="",
+        editable=False,
+    )
+    image_variants = models.JSONField(
+        verbose_name="Уменьшенные копии фотографии",
+        blank=True,
+        default=dict,
+        editable=False,
+    )
+
+    objects = WorkoutPlanQuerySet.as_manager()
 
     class Meta:
         verbose_name = "План тренировок"
         verbose_name_plural = "Планы тренировок"
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["-created_at", "-id"],
+                name="workout_plan_created_id_idx",
+            ),
+            models.Index(
+                fields=["-favorites_count", "-id"],
+                name="workout_plan_favorites_idx",
+            ),
+            models.Index(
+                fields=["duration", "id"],
+                name="workout_plan_duration_idx",
+            ),
+            # Лента: планы авторов без fan-out (``workout_plans.feed``).
+            models.Index(
+                fields=["author", "-created_at", "-id"],
+                name="workout_plan_author_idx",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -84,11 +152,119 @@ class WorkoutPlanExercise(models.Model):
     class Meta:
         verbose_name = "Упражнение в плане"
         verbose_name_plural = "Упражнения в планах"
+        indexes = [
+            # Фильтр ?exercises=: id планов берутся из одного индекса.
+            models.Index(
+                fields=["exercise", "workout_plan"],
+                name="workout_plan_item_exercise_idx",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.exercise.name} - {self.sets}x{self.reps}"
 
 
+class WorkoutPlanFacet(models.Model):
+    """Значение фасета плана (см. ``workout_plans.facets``)."""
+
+    workout_plan = models.ForeignKey(
+        WorkoutPlan,
+        verbose_name="План тренировок",
+        on_delete=models.CASCADE,
+        related_name="facets",
+    )
+    facet = models.CharField(verbose_name="Фасет", max_length=32)
+    value = models.CharField(verbose_name="Значение", max_length=128)
+
+    class Meta:
+        verbose_name = "Фасет плана"
+        verbose_name_plural = "Фасеты планов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["workout_plan", "facet", "value"],
+                name="unique_workout_plan_facet",
+            ),
+        ]
+        indexes = [
+            # Фильтры по фасету: id планов берутся из одного индекса.
+            models.Index(
+                fields=["facet", "value", "workout_plan"],
+                name="workout_plan_facet_value_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.workout_plan_id} {self.facet}={self.value}"
+
+
+class FacetCount(models.Model):
+    """Число планов каталога с данным значением фасета."""
+
+    facet = models.CharField(verbose_name="Фасет", max_length=32)
+    value = models.CharField(verbose_name="Значение", max_length=128)
+    count = models.PositiveIntegerField(
+        verbose_name="Число планов", default=0
+    )
+
+    class Meta:
+        verbose_name = "Счётчик фасета"
+        verbose_name_plural = "Счётчики фасетов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["facet", "value"], name="unique_facet_value",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.facet}={self.value}: {self.count}"
+
+
+class WorkoutPlanSignature(models.Model):
+    """MinHash-подпись набора упражнений плана (``workout_plans.similar``)."""
+
+    workout_plan = models.OneToOneField(
+        WorkoutPlan,
+        verbose_name="План тренировок",
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="signature",
+    )
+    signature = models.BinaryField(verbose_name="Подпись")
+
+    class Meta:
+        verbose_name = "Подпись плана"
+        verbose_name_plural = "Подписи планов"
+
+    def __str__(self):
+        return str(self.workout_plan_id)
+
+
+class WorkoutPlanBucket(models.Model):
+    """LSH-корзина, в которую попадает план."""
+
+    workout_plan = models.ForeignKey(
+        WorkoutPlan,
+        verbose_name="План тренировок",
+        on_delete=models.CASCADE,
+        related_name="buckets",
+    )
+    bucket = models.BigIntegerField(verbose_name="Корзина")
+
+    class Meta:
+        verbose_name = "Корзина похожих планов"
+        verbose_name_plural = "Корзины похожих планов"
+        indexes = [
+            # Кандидаты в похожие: id планов берутся из одного индекса.
+            models.Index(
+                fields=["bucket", "workout_plan"],
+                name="workout_plan_bucket_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.workout_plan_id} {self.bucket}"
+
+
 class Favorite(models.Model):
     user = models.ForeignKey(
         User, verbose_name="Пользователь", on_delete=models.CASCADE
@@ -113,6 +289,38 @@ class Favorite(models.Model):
         return f"{self.user} {self.workout_plan}"
 
 
+class PlanNeighbour(models.Model):
+    """Сосед плана по избранному (``workout_plans.recommendations``)."""
+
+    workout_plan = models.ForeignKey(
+        WorkoutPlan,
+        verbose_name="План тренировок",
+        on_delete=models.CASCADE,
+        related_name="neighbours",
+    )
+    neighbour = models.ForeignKey(
+        WorkoutPlan,
+        verbose_name="Соседний план",
+        on_delete=models.CASCADE,
+        related_name="+",
+    )
+    # Число пользователей, добавивших в избранное оба плана.
+    weight = models.IntegerField(verbose_name="Вес", default=0)
+
+    class Meta:
+        verbose_name = "Сосед плана"
+        verbose_name_plural = "Соседи планов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["workout_plan", "neighbour"],
+                name="unique_plan_neighbour",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.workout_plan_id} -> {self.neighbour_id}"
+
+
 class WorkoutPlanShortLink(models.Model):
     workout_plan = models.ForeignKey(
         WorkoutPlan, 
@@ -136,3 +344,55 @@ class WorkoutPlanShortLink(models.Model):
 
     def __str__(self):
         return f"{self.url_hash} -> {self.workout_plan.name}"
+
+
+class TimelineEntry(models.Model):
+    """Материализованная лента подписок (fan-out on write).
+
+    created_at копируется из плана, чтобы лента читалась одним
+    диапазонным сканом по индексу (user, created_at).
+    """
+
+    user = models.ForeignKey(
+        User,
+        verbose_name="Читатель ленты",
+        related_name="timeline_entries",
+        on_delete=models.CASCADE,
+    )
+    workout_plan = models.ForeignKey(
+        WorkoutPlan,
+        verbose_name="План тренировок",
+        related_name="timeline_entries",
+        on_delete=models.CASCADE,
+    )
+    author = models.ForeignKey(
+        User,
+        verbose_name="Автор плана",
+        related_name="+",
+        on_delete=models.CASCADE,
+        db_index=False,
+    )
+    created_at = models.DateTimeField(verbose_name="Дата создания плана")
+
+    class Meta:
+        verbose_name = "Запись ленты"
+        verbose_name_plural = "Записи ленты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "workout_plan"],
+                name="unique_user_workout_plan_in_timeline",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-workout_plan"],
+                name="timeline_user_created_idx",
+            ),
+            models.Index(
+                fields=["user", "author"],
+                name="timeline_user_author_idx",
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user} {self.workout_plan_id}"
@@ -0,0 +1,197 @@
+"""Быстрая сериализация планов для чтения (список, карточка, лента).
+
+Ответ совпадает с ``WorkoutPlanSerializer`` байт в байт, но собирается
+напрямую из строк ``values()``: без объектов моделей и без обхода полей
+DRF. Строки плана для всей страницы читаются одним запросом, поля
+упражнений берутся из снимка каталога (``exercises.catalog``).
+
+``?fields=`` и ``?omit=`` сужают ответ; невыбранные поля не читаются из
+БД: без автора нет JOIN с пользователями, без упражнений — запроса строк
+плана, без is_favorited — подзапроса к избранному.
+
+``WorkoutPlanSerializer`` остаётся для вложенных планов и запросов на
+запись; при изменении его полей нужно поменять и ``GETTERS`` здесь —
+расхождение ловит ``ReadSerializerTests`` в ``workout_plans/tests.py``.
+"""
+from django.core.files.storage import default_storage
+from rest_framework import serializers
+
+from const.errors import ERRORS
+from exercises.catalog import FIELDS as EXERCISE_FIELDS, catalog
+from exercises.models import Exercise
+from foodgram import thumbnails
+
+from .models import WorkoutPlanExercise
+
+AUTHOR_FIELDS = (
+    "id", "email", "username", "first_name", "last_name", "avatar",
+    "avatar_variants",
+)
+# Поля ответа в порядке WorkoutPlanSerializer и нужные им колонки values().
+FIELD_COLUMNS = {
+    "id": ("id",),
+    "name": ("name",),
+    "author": tuple(f"author__{name}" for name in AUTHOR_FIELDS),
+    "description": ("description",),
+    "image": ("image",),
+    "image_variants": ("image_variants",),
+    "exercises": (),
+    "duration": ("duration",),
+    "created_at": ("created_at",),
+    "favorites_count": ("favorites_count",),
+    "is_favorited": ("is_favorited_flag",),
+}
+FIELDS = tuple(FIELD_COLUMNS)
+# Ключи сортировки (в том числе курсора) выбираются всегда.
+ORDERING_COLUMNS = ("id", "created_at", "duration", "favorites_count")
+FIELDS_CONTEXT_KEY = "workout_plan_fields"
+# Ключ контекста с заранее загруженными строками планов {id плана: [...]}.
+ITEMS_CONTEXT_KEY = "workout_plan_items"
+
+# Форматирование даты — тем же полем DRF, что и в ModelSerializer.
+_datetime = serializers.DateTimeField()
+
+
+def file_url(name, request):
+    """То же, что ``serializers.ImageField.to_representation``."""
+    if not name:
+        return None
+    url = default_storage.url(name)
+    if request is not None:
+        return request.build_absolute_uri(url)
+    return url
+
+
+def parse_fields(query_params):
+    """Поля ответа из ``?fields=`` / ``?omit=``; id возвращается всегда.
+
+    id нужен, чтобы проставить is_favorited в ответе из общего кэша.
+    """
+    requested = query_params.get("fields")
+    omitted = query_params.get("omit")
+    if not requested and not omitted:
+        return FIELDS
+    errors = {}
+    fields = set(FIELDS)
+    for param, value in (("fields", requested), ("omit", omitted)):
+        names = {name.strip() for name in (value or "").split(",")}
+        names.discard("")
+        unknown = names - fields
+        if unknown:
+            errors[param] = [ERRORS["unknown_fields"].format(
+                ", ".join(sorted(unknown))
+            )]
+        elif names:
+            fields = fields & names if param == "fields" else fields - names
+    if errors:
+        raise serializers.ValidationError(errors)
+    return tuple(name for name in FIELDS if name in fields or name == "id")
+
+
+def columns(fields):
+    """Колонки values() для полей ответа."""
+    selected = dict.fromkeys(ORDERING_COLUMNS)
+    for name in fields:
+        selected.update(dict.fromkeys(FIELD_COLUMNS[name]))
+    return tuple(selected)
+
+
+def load_items(plan_ids, snapshot):
+    """Строки планов ``{id плана: [...]}`` в порядке добавления."""
+    items = {plan_id: [] for plan_id in plan_ids}
+    rows = list(WorkoutPlanExercise.objects.filter(
+        workout_plan_id__in=plan_ids,
+    ).order_by("id").values_list(
+        "workout_plan_id", "exercise_id", "sets", "reps"
+    ))
+    exercises = snapshot.rows
+    missing = {row[1] for row in rows} - exercises.keys()
+    if missing:
+        # Упражнения, добавленные после построения снимка.
+        exercises = {**exercises, **{
+            row["id"]: row for row in Exercise.objects.filter(
+                id__in=missing
+            ).values(*EXERCISE_FIELDS)
+        }}
+    for plan_id, exercise_id, sets, reps in rows:
+        items[plan_id].append(
+            {**exercises[exercise_id], "sets": sets, "reps": reps}
+        )
+    return items
+
+
+def _author(row, items, request):
+    return {
+        "id": row["author__id"],
+        "email": row["author__email"],
+        "username": row["author__username"],
+        "first_name": row["author__first_name"],
+        "last_name": row["author__last_name"],
+        "avatar": file_url(row["author__avatar"], request),
+        "avatar_variants": thumbnails.urls(
+            row["author__avatar_variants"], request
+        ),
+    }
+
+
+# Значение каждого поля ответа из строки values() и строк плана.
+GETTERS = {
+    "id": lambda row, items, request: row["id"],
+    "name": lambda row, items, request: row["name"],
+    "author": _author,
+    "description": lambda row, items, request: row["description"],
+    "image": lambda row, items, request: file_url(row["image"], request),
+    "image_variants": lambda row, items, request: thumbnails.urls(
+        row["image_variants"], request
+    ),
+    "exercises": lambda row, items, request: items,
+    "duration": lambda row, items, request: row["duration"],
+    "created_at": lambda row, items, request: _datetime.to_representation(
+        row["created_at"]
+    ),
+    "favorites_count": lambda row, items, request: row["favorites_count"],
+    "is_favorited": lambda row, items, request: bool(
+        row["is_favorited_flag"]
+    ),
+}
+
+
+class WorkoutPlanReadListSerializer(serializers.ListSerializer):
+    def to_representation(self, data):
+        rows = list(data)
+        items = self.child.items([row["id"] for row in rows])
+        return [
+            self.child.represent(row, items.get(row["id"])) for row in rows
+        ]
+
+
+class WorkoutPlanReadSerializer(serializers.BaseSerializer):
+    """Только чтение; ``instance`` — строка из ``values(*columns(fields))``.
+
+    Поля ответа — ``context[FIELDS_CONTEXT_KEY]``, по умолчанию все.
+    """
+
+    class Meta:
+        list_serializer_class = WorkoutPlanReadListSerializer
+
+    def to_representation(self, row):
+        return self.represent(row, self.items([row["id"]]).get(row["id"]))
+
+    @property
+    def selected_fields(self):
+        return self.context.get(FIELDS_CONTEXT_KEY, FIELDS)
+
+    def items(self, plan_ids):
+        preloaded = self.context.get(ITEMS_CONTEXT_KEY)
+        if preloaded is not None:
+            return preloaded
+        if "exercises" not in self.selected_fields:
+            return {}
+        return load_items(plan_ids, catalog.from_context(self.context))
+
+    def represent(self, row, items):
+        request = self.context.get("request")
+        return {
+            name: GETTERS[name](row, items, request)
+            for name in self.selected_fields
+        }
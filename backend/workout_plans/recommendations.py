@@ -0,0 +1,194 @@
+"""Рекомендации «вам может понравиться» по совместным добавлениям в избранное.
+
+Два плана — соседи, если их добавляли в избранное одни и те же
+пользователи; вес соседства — число таких пользователей. Для каждого
+плана в ``PlanNeighbour`` хранится не больше ``NEIGHBOURS`` самых весомых
+соседей.
+
+Полная сборка (``rebuild``, команда ``build_recommendations``) считает
+матрицу совместной встречаемости планов разреженным произведением
+``Xᵀ·X`` (X — пользователи × планы) в SciPy. Новое или удалённое
+избранное после коммита меняет только веса пар с остальным избранным
+того же пользователя (``apply_favorites``), без полной пересборки.
+
+Рекомендации пользователю — один запрос: сумма весов соседей его
+избранного по индексу ``(workout_plan, neighbour)``, без вычислений
+модели во время запроса.
+"""
+from collections import Counter
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, F, Q, Sum
+from scipy import sparse
+
+from foodgram.transactions import defer_on_commit
+
+NEIGHBOURS = 20
+BATCH_SIZE = 5000
+
+
+def cooccurrence(user_ids, plan_ids):
+    """Матрица совместной встречаемости и id планов её строк.
+
+    Диагональ (план сам с собой) обнулена.
+    """
+    users, user_index = np.unique(user_ids, return_inverse=True)
+    plans, plan_index = np.unique(plan_ids, return_inverse=True)
+    favorites = sparse.csr_matrix(
+        (np.ones(len(plan_index), dtype=np.int32), (user_index, plan_index)),
+        shape=(len(users), len(plans)),
+    )
+    # Повторы пар схлопываются в 1: избранное уникально, но так надёжнее.
+    favorites.data[:] = 1
+    matrix = (favorites.T @ favorites).tocsr()
+    matrix.setdiag(0)
+    matrix.eliminate_zeros()
+    return plans, matrix
+
+
+def top_neighbours(plans, matrix, limit=NEIGHBOURS):
+    """(план, сосед, вес) — до ``limit`` самых весомых соседей плана.
+
+    При равном весе выше сосед с меньшим id.
+    """
+    for row in range(matrix.shape[0]):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        if start == end:
+            continue
+        columns = matrix.indices[start:end]
+        weights = matrix.data[start:end]
+        order = np.lexsort((plans[columns], -weights))[:limit]
+        for column, weight in zip(columns[order], weights[order]):
+            yield int(plans[row]), int(plans[column]), int(weight)
+
+
+def rebuild():
+    """Пересобирает ``PlanNeighbour`` по всему избранному."""
+    from .models import Favorite, PlanNeighbour
+
+    pairs = np.array(
+        Favorite.objects.values_list("user_id", "workout_plan_id"),
+        dtype=np.int64,
+    ).reshape(-1, 2)
+    plans, matrix = cooccurrence(pairs[:, 0], pairs[:, 1])
+    rows = [
+        PlanNeighbour(
+            workout_plan_id=plan_id, neighbour_id=neighbour_id, weight=weight,
+        )
+        for plan_id, neighbour_id, weight in top_neighbours(plans, matrix)
+    ]
+    with transaction.atomic():
+        PlanNeighbour.objects.all().delete()
+        PlanNeighbour.objects.bulk_create(rows, batch_size=BATCH_SIZE)
+    return len(rows)
+
+
+def apply_favorites(changes):
+    """Учитывает изменения избранного ``{(user, план, +1 | -1)}``.
+
+    Вес пары плана с каждым другим избранным пользователя меняется на
+    ±1; новые пары добавляются, списки соседей обрезаются до
+    ``NEIGHBOURS``. Пара, выпавшая раньше из top-N, начинается заново —
+    полную точность возвращает периодический ``rebuild``.
+    """
+    from .models import Favorite, PlanNeighbour
+
+    by_user = {}
+    for user_id, plan_id, sign in changes:
+        by_user.setdefault(user_id, []).append((plan_id, sign))
+    others = {}
+    for user_id, plan_id in Favorite.objects.filter(
+        user_id__in=by_user,
+    ).values_list("user_id", "workout_plan_id"):
+        others.setdefault(user_id, set()).add(plan_id)
+    delta = Counter()
+    for user_id, plans in by_user.items():
+        added = {plan_id for plan_id, sign in plans if sign > 0}
+        removed = {plan_id for plan_id, sign in plans if sign < 0}
+        added, removed = added - removed, removed - added
+        current = others.get(user_id, set())
+        previous = (current - added) | removed
+        seen = set()
+        for plan_id in added | removed:
+            for other_id in (previous | current) - {plan_id}:
+                pair = (min(plan_id, other_id), max(plan_id, other_id))
+                if pair in seen:
+                    continue
+                seen.add(pair)
+                amount = (
+                    (plan_id in current and other_id in current)
+                    - (plan_id in previous and other_id in previous)
+                )
+                delta[plan_id, other_id] += amount
+                delta[other_id, plan_id] += amount
+    delta = {pair: amount for pair, amount in delta.items() if amount}
+    if not delta:
+        return
+    plan_ids = {plan_id for plan_id, _ in delta}
+    with transaction.atomic():
+        PlanNeighbour.objects.bulk_create(
+            [
+                PlanNeighbour(workout_plan_id=plan_id, neighbour_id=other_id)
+                for (plan_id, other_id), amount in delta.items()
+                if amount > 0
+            ],
+            ignore_conflicts=True,
+        )
+        # Пары читаются одним запросом по индексу (workout_plan, neighbour):
+        # у плана не больше NEIGHBOURS строк, так что лишних строк мало.
+        groups = {}
+        for pk, plan_id, other_id in PlanNeighbour.objects.filter(
+            workout_plan_id__in=plan_ids, neighbour_id__in=plan_ids,
+        ).values_list("id", "workout_plan_id", "neighbour_id"):
+            amount = delta.get((plan_id, other_id))
+            if amount:
+                groups.setdefault(amount, []).append(pk)
+        # Один UPDATE на приращение, а не на каждую пару.
+        for amount, ids in groups.items():
+            PlanNeighbour.objects.filter(id__in=ids).update(
+                weight=F("weight") + amount
+            )
+        PlanNeighbour.objects.filter(
+            id__in=[pk for ids in groups.values() for pk in ids],
+            weight__lte=0,
+        ).delete()
+        _trim(plan_ids)
+
+
+def _trim(plan_ids):
+    from .models import PlanNeighbour
+
+    crowded = PlanNeighbour.objects.filter(
+        workout_plan_id__in=plan_ids,
+    ).values("workout_plan_id").annotate(total=Count("id")).filter(
+        total__gt=NEIGHBOURS
+    ).values_list("workout_plan_id", flat=True)
+    extra = []
+    for plan_id in crowded:
+        extra.extend(PlanNeighbour.objects.filter(
+            workout_plan_id=plan_id,
+        ).order_by("-weight", "neighbour_id").values_list(
+            "id", flat=True
+        )[NEIGHBOURS:])
+    if extra:
+        PlanNeighbour.objects.filter(id__in=extra).delete()
+
+
+def schedule_favorite(user_id, plan_id, sign):
+    """``apply_favorites`` после коммита, одним вызовом на транзакцию."""
+    defer_on_commit(apply_favorites, [(user_id, plan_id, sign)])
+
+
+def recommended_plan_ids(user, limit):
+    """Id рекомендованных планов: соседи избранного без него самого."""
+    from .models import Favorite, PlanNeighbour
+
+    favorites = Favorite.objects.filter(user=user).values("workout_plan_id")
+    return list(
+        PlanNeighbour.objects.filter(workout_plan_id__in=favorites).exclude(
+            Q(neighbour_id__in=favorites) | Q(neighbour__author=user)
+        ).values("neighbour_id").annotate(score=Sum("weight")).order_by(
+            "-score", "neighbour_id"
+        ).values_list("neighbour_id", flat=True)[:limit]
+    )
@@ -0,0 +1,117 @@
+"""Кэш ответов списка и карточки плана.
+
+Ключ ответа включает версию: общую для списков и отдельную для каждого
+плана. Сигналы меняют версии после коммита, и старые записи просто
+перестают читаться (и вытесняются по TIMEOUT). Версии — случайные токены,
+а не счётчики: если ключ версии вытеснен из кэша, новая версия не может
+совпасть со старой.
+
+Версии видны только тем, с кем общий бэкенд кэша. С LocMemCache
+(настройка по умолчанию) и версии, и ответы у каждого процесса свои:
+``bump`` из соседнего воркера или из команды импорта здесь ничего не
+меняет, и устаревший ответ отдаётся до истечения TIMEOUT. Если воркеров
+несколько и такая задержка недопустима, нужен общий кэш (Redis,
+Memcached).
+
+Тело кэшируется без учёта пользователя (is_favorited = False); флаг
+накладывается после чтения одним запросом по id планов на странице.
+"""
+import hashlib
+import uuid
+from urllib.parse import urlencode
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from foodgram.transactions import defer_on_commit
+
+from .models import Favorite
+
+LIST_VERSION_KEY = "workout_plans:list:version"
+PLAN_VERSION_KEY = "workout_plans:plan:{}:version"
+# Параметры, от которых ответ зависит не только через версию.
+USER_SPECIFIC_PARAMS = ("is_favorited",)
+
+
+def _version(key):
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, uuid.uuid4().hex, None)
+        version = cache.get(key)
+    return version
+
+
+def bump(plan_ids=()):
+    """Инвалидирует списки и карточки перечисленных планов."""
+    versions = {LIST_VERSION_KEY: uuid.uuid4().hex}
+    for plan_id in plan_ids:
+        versions[PLAN_VERSION_KEY.format(plan_id)] = uuid.uuid4().hex
+    cache.set_many(versions, None)
+
+
+def schedule_bump(plan_ids=()):
+    defer_on_commit(bump, plan_ids)
+
+
+def is_cacheable(request):
+    params = request.query_params
+    return not any(params.get(name) for name in USER_SPECIFIC_PARAMS)
+
+
+def _normalized_params(request):
+    params = sorted(
+        (name, value)
+        for name, values in request.query_params.lists()
+        for value in values
+    )
+    return urlencode(params)
+
+
+def _digest(request):
+    # Хост и схема попадают в ключ: ссылки next/previous и image абсолютные.
+    url = request.build_absolute_uri(request.path)
+    return hashlib.md5(
+        f"{url}?{_normalized_params(request)}".encode(),
+        usedforsecurity=False,
+    ).hexdigest()
+
+
+def list_key(request):
+    version = _version(LIST_VERSION_KEY)
+    return f"workout_plans:list:{version}:{_digest(request)}"
+
+
+def detail_key(request, pk):
+    version = _version(PLAN_VERSION_KEY.format(pk))
+    return f"workout_plans:plan:{pk}:{version}:{_digest(request)}"
+
+
+def load(key):
+    return cache.get(key)
+
+
+def store(key, data):
+    cache.set(key, data)
+
+
+def overlay_favorited(plans, user):
+    """Проставляет is_favorited для пользователя в закэшированных планах."""
+    if not plans or "is_favorited" not in plans[0]:
+        return plans
+    favorited = set()
+    if user.is_authenticated:
+        favorited = set(Favorite.objects.filter(
+            user=user,
+            workout_plan_id__in=[plan["id"] for plan in plans],
+        ).values_list("workout_plan_id", flat=True))
+    for plan in plans:
+        plan["is_favorited"] = plan["id"] in favorited
+    return plans
+
+
+# Асинхронные варианты для ASGI-представлений (``api.async_views``).
+alist_key = sync_to_async(list_key)
+adetail_key = sync_to_async(detail_key)
+aload = sync_to_async(load)
+astore = sync_to_async(store)
+aoverlay_favorited = sync_to_async(overlay_favorited)
@@ -0,0 +1,112 @@
+"""Полнотекстовый поиск по планам тренировок.
+
+В ``WorkoutPlan.search_document`` хранится денормализованный текст
+(название, описание и названия упражнений плана), поэтому поиск не
+делает JOIN через ``WorkoutPlanExercise`` и не размножает строки.
+На PostgreSQL по документу построен GIN-индекс ``to_tsvector``,
+результаты ранжируются ``ts_rank``; на остальных СУБД — подстрочный
+поиск по нормализованному документу.
+"""
+import re
+
+from django.contrib.postgres.search import (
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import connection
+from django.db.models import Case, IntegerField, Q, Value, When
+
+from foodgram.transactions import defer_on_commit
+
+SEARCH_CONFIG = "russian"
+WORD_RE = re.compile(r"\w+")
+
+
+def search_vector():
+    # Совпадает с выражением GIN-индекса из миграции 0003.
+    return SearchVector("search_document", config=SEARCH_CONFIG)
+
+
+def normalize(text):
+    return " ".join(text.lower().split())
+
+
+def build_search_document(name, description, exercise_names):
+    return normalize(" ".join([name, description, *exercise_names]))
+
+
+def refresh_search_documents(plan_ids):
+    """Пересобирает ``search_document`` для планов за два запроса."""
+    from .models import WorkoutPlan, WorkoutPlanExercise
+
+    plan_ids = set(plan_ids)
+    if not plan_ids:
+        return
+    names = {}
+    for plan_id, exercise_name in WorkoutPlanExercise.objects.filter(
+        workout_plan_id__in=plan_ids,
+    ).values_list("workout_plan_id", "exercise__name"):
+        names.setdefault(plan_id, []).append(exercise_name)
+
+    plans = list(
+        WorkoutPlan.objects.filter(id__in=plan_ids).only(
+            "id", "name", "description", "search_document",
+        )
+    )
+    changed = []
+    for plan in plans:
+        document = build_search_document(
+            plan.name, plan.description, names.get(plan.id, []),
+        )
+        if document != plan.search_document:
+            plan.search_document = document
+            changed.append(plan)
+    if changed:
+        WorkoutPlan.objects.bulk_update(changed, ["search_document"])
+
+
+def schedule_refresh(plan_ids):
+    """Откладывает ``refresh_search_documents`` до коммита транзакции.
+
+    Идентификаторы накапливаются, поэтому массовые изменения строк плана
+    внутри одного ``atomic`` обновляют документ один раз.
+    """
+    defer_on_commit(refresh_search_documents, plan_ids)
+
+
+def search_queryset(queryset, query):
+    """Фильтрует и ранжирует планы по строке ``?search=``."""
+    terms = WORD_RE.findall(normalize(query))
+    if not terms:
+        return queryset
+    if connection.vendor == "postgresql":
+        # Каждое слово ищется как префикс: «присед» находит «приседания».
+        vector = search_vector()
+        ts_query = SearchQuery(
+            " & ".join(f"{term}:*" for term in terms),
+            config=SEARCH_CONFIG,
+            search_type="raw",
+        )
+        return (
+            queryset.alias(search=vector)
+            .filter(search=ts_query)
+            .annotate(search_rank=SearchRank(vector, ts_query))
+            .order_by("-search_rank", "-created_at", "-id")
+        )
+
+    condition = Q()
+    for term in terms:
+        condition &= Q(search_document__contains=term)
+    in_name = Q()
+    for term in terms:
+        in_name &= Q(name__icontains=term)
+    return (
+        queryset.filter(condition)
+        .annotate(search_rank=Case(
+            When(in_name, then=Value(1)),
+            default=Value(0),
+            output_field=IntegerField(),
+        ))
+        .order_by("-search_rank", "-created_at", "-id")
+    )
@@ -1,16 +1,19 @@
-import secrets
-import string
-
 from django.contrib.auth import get_user_model
+from django.db import transaction
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from const.errors import ERROR_MESSAGES
+from const.photo import ImageField, ImageVariantsField
+from exercises.catalog import catalog
+from exercises.models import Exercise
 from .models import (
     WorkoutPlan,
     WorkoutPlanExercise,
     Favorite,
     WorkoutPlanShortLink,
 )
+from .short_links import get_or_create_link
 
 User = get_user_model()
 
@@ -60,6 +63,8 @@ class ExercisesWriteField(serializers.ListField):
 
 
 class WorkoutPlanAuthorSerializer(serializers.ModelSerializer):
+    avatar_variants = ImageVariantsField()
+
     class Meta:
         model = User
         fields = (
@@ -69,10 +74,13 @@ class WorkoutPlanAuthorSerializer(serializers.ModelSerializer):
             "first_name",
             "last_name",
             "avatar",
+            "avatar_variants",
         )
 
 
 class WorkoutPlanExerciseSerializer(serializers.ModelSerializer):
+    """Строка плана; поля упражнения берутся из снимка каталога."""
+
     id = serializers.ReadOnlyField(source='exercise.id')
     name = serializers.ReadOnlyField(source='exercise.name')
     muscle_group = serializers.ReadOnlyField(source='exercise.muscle_group')
@@ -82,6 +90,15 @@ class WorkoutPlanExerciseSerializer(serializers.ModelSerializer):
         model = WorkoutPlanExercise
         fields = ('id', 'name', 'muscle_group', 'difficulty', 'sets', 'reps')
 
+    def to_representation(self, instance):
+        row = catalog.from_context(self.context).rows.get(
+            instance.exercise_id
+        )
+        if row is None:
+            # Упражнение добавлено после построения снимка.
+            return super().to_representation(instance)
+        return {**row, 'sets': instance.sets, 'reps': instance.reps}
+
 
 class WorkoutPlanSerializer(serializers.ModelSerializer):
     exercises = WorkoutPlanExerciseSerializer(
@@ -90,6 +107,7 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
         read_only=True,
     )
     author = WorkoutPlanAuthorSerializer(read_only=True)
+    image_variants = ImageVariantsField()
     is_favorited = serializers.SerializerMethodField()
 
     class Meta:
@@ -100,12 +118,20 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
             "author",
             "description",
             "image",
+            "image_variants",
             "exercises",
             "duration",
             "created_at",
+            "favorites_count",
+            "is_favorited",
+        )
+        read_only_fields = (
+            "id",
+            "author",
+            "created_at",
+            "favorites_count",
             "is_favorited",
         )
-        read_only_fields = ("id", "author", "created_at", "is_favorited")
 
     def get_is_favorited(self, obj):
         return bool(getattr(obj, "is_favorited_flag", False))
@@ -113,6 +139,7 @@ class WorkoutPlanSerializer(serializers.ModelSerializer):
 
 class WorkoutPlanCreateSerializer(serializers.ModelSerializer):
     exercises = ExercisesWriteField(write_only=True)
+    image = ImageField()
 
     class Meta:
         model = WorkoutPlan
@@ -125,32 +152,46 @@ class WorkoutPlanCreateSerializer(serializers.ModelSerializer):
             'duration',
         )
 
+    def validate_exercises(self, value):
+        if not value:
+            raise serializers.ValidationError(
+                ERROR_MESSAGES['empty_exercises']
+            )
+        ids = [item['id'] for item in value]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError(
+                ERROR_MESSAGES['exercise_duplicate']
+            )
+        found = set(
+            Exercise.objects.filter(id__in=ids).order_by().values_list(
+                'id', flat=True
+            )
+        )
+        if len(found) != len(ids):
+            raise serializers.ValidationError(
+                ERROR_MESSAGES['exercise_not_found']
+            )
+        return value
+
+    @transaction.atomic
     def create(self, validated_data):
         exercises_data = validated_data.pop('exercises')
         workout_plan = WorkoutPlan.objects.create(**validated_data)
-        
-        for exercise_data in exercises_data:
-            WorkoutPlanExercise.objects.create(
+        WorkoutPlanExercise.objects.bulk_create(
+            WorkoutPlanExercise(
                 workout_plan=workout_plan,
                 exercise_id=exercise_data['id'],
-                sets=exercise_data.get('sets', 1),
+                sets=exercise_data['sets'],
                 reps=exercise_data['reps'],
             )
-        
+            for exercise_data in exercises_data
+        )
         return workout_plan
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         if 'exercises' in validated_data:
-            exercises_data = validated_data.pop('exercises')
-            instance.exercises_items.all().delete()
-
-            for exercise_data in exercises_data:
-                WorkoutPlanExercise.objects.create(
-                    workout_plan=instance,
-                    exercise_id=exercise_data['id'],
-                    sets=exercise_data.get('sets', 1),
-                    reps=exercise_data['reps'],
-                )
+            self._sync_exercises(instance, validated_data.pop('exercises'))
 
         for attr, value in validated_data.items():
             setattr(instance, attr, value)
@@ -158,6 +199,41 @@ class WorkoutPlanCreateSerializer(serializers.ModelSerializer):
         instance.save()
         return instance
 
+    @staticmethod
+    def _sync_exercises(instance, exercises_data):
+        """Приводит строки плана к exercises_data, трогая только разницу."""
+        existing = {
+            item.exercise_id: item for item in instance.exercises_items.all()
+        }
+        wanted = {item['id']: item for item in exercises_data}
+
+        to_create, to_update = [], []
+        for exercise_id, data in wanted.items():
+            item = existing.get(exercise_id)
+            if item is None:
+                to_create.append(WorkoutPlanExercise(
+                    workout_plan=instance,
+                    exercise_id=exercise_id,
+                    sets=data['sets'],
+                    reps=data['reps'],
+                ))
+            elif (item.sets, item.reps) != (data['sets'], data['reps']):
+                item.sets, item.reps = data['sets'], data['reps']
+                to_update.append(item)
+        to_delete = [
+            item.id for exercise_id, item in existing.items()
+            if exercise_id not in wanted
+        ]
+
+        if to_delete:
+            WorkoutPlanExercise.objects.filter(id__in=to_delete).delete()
+        if to_update:
+            WorkoutPlanExercise.objects.bulk_update(
+                to_update, ['sets', 'reps']
+            )
+        if to_create:
+            WorkoutPlanExercise.objects.bulk_create(to_create)
+
 
 class FavoriteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -179,13 +255,5 @@ class WorkoutPlanShortLinkSerializer(serializers.ModelSerializer):
         read_only_fields = ('url_hash', 'created_at')
 
     def create(self, validated_data):
-        alphabet = string.ascii_lowercase + string.digits
-        for _ in range(50):
-            url_hash = ''.join(secrets.choice(alphabet) for _ in range(10))
-            if not WorkoutPlanShortLink.objects.filter(url_hash=url_hash).exists():
-                return WorkoutPlanShortLink.objects.create(
-                    url_hash=url_hash, **validated_data
-                )
-        raise serializers.ValidationError(
-            {'url_hash': ['Не удалось сгенерировать уникальный хэш.']}
-        )
\ No newline at end of file
+        link, _ = get_or_create_link(validated_data['workout_plan'].id)
+        return link
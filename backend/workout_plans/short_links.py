@@ -0,0 +1,155 @@
+"""Короткие ссылки на планы: выдача и разрешение url_hash -> id плана.
+
+Хэш детерминированно получается из id плана: id перемешивается
+обратимой сетью Фейстеля на 48 битах и записывается в base62 фиксированной
+длины. Перестановка биективна, поэтому разные планы всегда получают разные
+хэши и проверять коллизии не нужно, а повторный запрос для того же плана
+даёт ту же ссылку. Старые случайные хэши имеют длину 10 и с новыми
+(длина ``HASH_LENGTH``) не пересекаются.
+
+Разрешение идёт по трём уровням: LRU в памяти процесса, общий кэш, БД.
+Из БД читается только ``workout_plan_id`` — сам план не загружается.
+Неизвестные хэши кэшируются как отрицательный результат на короткое
+время, чтобы перебор несуществующих ссылок не доходил до БД.
+"""
+import string
+import threading
+import time
+from collections import OrderedDict
+
+from asgiref.sync import sync_to_async
+from django.core.cache import cache
+
+from .models import WorkoutPlanShortLink
+
+CACHE_KEY = "workout_plans:short_link:{}"
+CACHE_TIMEOUT = 24 * 60 * 60
+NEGATIVE_TIMEOUT = 60
+LOCAL_SIZE = 10000
+# Записи в памяти процесса живут недолго: удаление ссылки в другом
+# воркере сбрасывает только общий кэш.
+LOCAL_TIMEOUT = 60
+MISSING = 0
+
+ALPHABET = string.digits + string.ascii_letters
+HALF_BITS = 24
+HALF_MASK = (1 << HALF_BITS) - 1
+HASH_LENGTH = 9  # 62 ** 9 > 2 ** 48
+ROUND_KEYS = (0x3C6EF3, 0xA54FF5, 0x510E52, 0x9B0568)
+BATCH_SIZE = 1000
+
+
+def _round(value, key):
+    value = (value * 0x2F0A29 + key) & HALF_MASK
+    return value ^ (value >> 11)
+
+
+def _permute(number):
+    left, right = number >> HALF_BITS, number & HALF_MASK
+    for key in ROUND_KEYS:
+        left, right = right, left ^ _round(right, key)
+    return (left << HALF_BITS) | right
+
+
+def encode(plan_id):
+    number = _permute(plan_id)
+    chars = []
+    for _ in range(HASH_LENGTH):
+        number, remainder = divmod(number, len(ALPHABET))
+        chars.append(ALPHABET[remainder])
+    return "".join(reversed(chars))
+
+
+def get_or_create_link(workout_plan_id):
+    """Возвращает (ссылка, создана ли) — для плана она всегда одна."""
+    return WorkoutPlanShortLink.objects.get_or_create(
+        url_hash=encode(workout_plan_id),
+        defaults={"workout_plan_id": workout_plan_id},
+    )
+
+
+def bulk_create_links(workout_plan_ids):
+    """Создаёт ссылки для многих планов одним INSERT на пачку.
+
+    Уже существующие ссылки не дублируются. Возвращает {id плана: хэш}.
+    """
+    hashes = {plan_id: encode(plan_id) for plan_id in workout_plan_ids}
+    WorkoutPlanShortLink.objects.bulk_create(
+        (
+            WorkoutPlanShortLink(workout_plan_id=plan_id, url_hash=url_hash)
+            for plan_id, url_hash in hashes.items()
+        ),
+        batch_size=BATCH_SIZE,
+        ignore_conflicts=True,
+    )
+    # Сбрасываем отрицательный кэш, если хэш уже запрашивали до создания.
+    cache.delete_many([CACHE_KEY.format(h) for h in hashes.values()])
+    for url_hash in hashes.values():
+        local_cache.delete(url_hash)
+    return hashes
+
+
+class LRUCache:
+    def __init__(self, maxsize, timeout):
+        self.maxsize = maxsize
+        self.timeout = timeout
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            value, expires = item
+            if expires < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (value, time.monotonic() + self.timeout)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+local_cache = LRUCache(LOCAL_SIZE, LOCAL_TIMEOUT)
+
+
+def resolve(url_hash):
+    """Возвращает id плана по хэшу или None, если ссылки нет."""
+    plan_id = local_cache.get(url_hash)
+    if plan_id is None:
+        key = CACHE_KEY.format(url_hash)
+        plan_id = cache.get(key)
+        if plan_id is None:
+            plan_id = WorkoutPlanShortLink.objects.filter(
+                url_hash=url_hash,
+            ).values_list("workout_plan_id", flat=True).first() or MISSING
+            cache.set(
+                key,
+                plan_id,
+                CACHE_TIMEOUT if plan_id != MISSING else NEGATIVE_TIMEOUT,
+            )
+        local_cache.set(url_hash, plan_id)
+    return None if plan_id == MISSING else plan_id
+
+
+# Асинхронный вариант ``resolve`` для ASGI-представлений.
+aresolve = sync_to_async(resolve)
+
+
+def invalidate(url_hash):
+    cache.delete(CACHE_KEY.format(url_hash))
+    local_cache.delete(url_hash)
@@ -0,0 +1,160 @@
+from functools import partial
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from exercises.models import Exercise
+from foodgram import thumbnails
+from users.models import Follow, User
+
+from . import (
+    analytics,
+    facets,
+    feed,
+    recommendations,
+    response_cache,
+    short_links,
+    similar,
+)
+from .models import (
+    Favorite,
+    WorkoutPlan,
+    WorkoutPlanExercise,
+    WorkoutPlanShortLink,
+)
+from .search import schedule_refresh
+
+
+@receiver(post_save, sender=WorkoutPlan)
+def plan_saved(sender, instance, raw=False, created=False,
+               update_fields=None, **kwargs):
+    if raw:
+        return
+    response_cache.schedule_bump([instance.pk])
+    if created:
+        transaction.on_commit(partial(feed.fan_out, [instance]))
+    if update_fields is None or "image" in update_fields:
+        thumbnails.sync(instance, "image")
+    if created or update_fields is None or "duration" in update_fields:
+        facets.schedule_refresh([instance.pk])
+    if created or update_fields is None:
+        # Строки плана сериализатор пишет bulk-операциями без сигналов;
+        # пересчёты идут после коммита, когда строки уже записаны.
+        similar.schedule_refresh([instance.pk])
+        analytics.schedule_bump([instance.pk])
+    if update_fields is not None and not (
+        {"name", "description"} & set(update_fields)
+    ):
+        return
+    schedule_refresh([instance.pk])
+
+
+@receiver(post_save, sender=WorkoutPlanExercise)
+@receiver(post_delete, sender=WorkoutPlanExercise)
+def plan_item_changed(sender, instance, raw=False, **kwargs):
+    if raw:
+        return
+    schedule_refresh([instance.workout_plan_id])
+    facets.schedule_refresh([instance.workout_plan_id])
+    similar.schedule_refresh([instance.workout_plan_id])
+    analytics.schedule_bump([instance.workout_plan_id])
+    response_cache.schedule_bump([instance.workout_plan_id])
+
+
+@receiver(pre_delete, sender=WorkoutPlan)
+def plan_deleting(sender, instance, **kwargs):
+    facets.forget_plan(instance.pk)
+
+
+@receiver(post_delete, sender=WorkoutPlan)
+def plan_deleted(sender, instance, **kwargs):
+    response_cache.schedule_bump([instance.pk])
+    analytics.schedule_bump([instance.pk])
+
+
+@receiver(post_save, sender=Exercise)
+def exercise_saved(sender, instance, raw=False, created=False, **kwargs):
+    if raw or created:
+        return
+    plan_ids = set(
+        WorkoutPlanExercise.objects.filter(
+            exercise=instance,
+        ).values_list("workout_plan_id", flat=True)
+    )
+    schedule_refresh(plan_ids)
+    facets.schedule_refresh(plan_ids)
+    analytics.schedule_bump(plan_ids)
+    response_cache.schedule_bump(plan_ids)
+
+
+AUTHOR_FIELDS = {"email", "username", "first_name", "last_name", "avatar"}
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, raw=False, created=False,
+                 update_fields=None, **kwargs):
+    if raw or created:
+        return
+    if update_fields is not None and not AUTHOR_FIELDS & set(update_fields):
+        return
+    response_cache.schedule_bump(
+        WorkoutPlan.objects.filter(author=instance).values_list(
+            "id", flat=True
+        )
+    )
+
+
+@receiver(thumbnails.variants_ready, sender=WorkoutPlan)
+def plan_variants_ready(sender, pk, **kwargs):
+    response_cache.bump([pk])
+
+
+@receiver(thumbnails.variants_ready, sender=User)
+def author_variants_ready(sender, pk, **kwargs):
+    response_cache.bump(
+        WorkoutPlan.objects.filter(author_id=pk).values_list("id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Follow)
+def follow_created(sender, instance, raw=False, created=False, **kwargs):
+    if created and not raw:
+        transaction.on_commit(
+            partial(feed.backfill, instance.user, instance.author)
+        )
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    feed.remove_author(instance.user_id, instance.author_id)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_created(sender, instance, raw=False, created=False, **kwargs):
+    if created and not raw:
+        WorkoutPlan.objects.filter(pk=instance.workout_plan_id).update(
+            favorites_count=F("favorites_count") + 1
+        )
+        response_cache.schedule_bump([instance.workout_plan_id])
+        recommendations.schedule_favorite(
+            instance.user_id, instance.workout_plan_id, 1
+        )
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    WorkoutPlan.objects.filter(
+        pk=instance.workout_plan_id, favorites_count__gt=0,
+    ).update(favorites_count=F("favorites_count") - 1)
+    response_cache.schedule_bump([instance.workout_plan_id])
+    recommendations.schedule_favorite(
+        instance.user_id, instance.workout_plan_id, -1
+    )
+
+
+@receiver(post_save, sender=WorkoutPlanShortLink)
+@receiver(post_delete, sender=WorkoutPlanShortLink)
+def short_link_changed(sender, instance, **kwargs):
+    short_links.invalidate(instance.url_hash)
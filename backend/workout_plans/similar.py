@@ -0,0 +1,171 @@
+"""Похожие планы: MinHash по набору упражнений и LSH-корзины.
+
+Сходство планов — коэффициент Жаккара их наборов упражнений. Для каждого
+плана хранится MinHash-подпись (``SIGNATURE_SIZE`` минимумов случайных
+хэш-функций): доля совпавших позиций двух подписей оценивает Жаккара.
+Подпись режется на ``BANDS`` полос, хэш каждой полосы — корзина в
+``WorkoutPlanBucket``. Кандидаты для плана — планы, совпавшие с ним хотя
+бы в одной корзине; это один индексированный ``IN`` вместо сравнения со
+всем каталогом. Кандидаты ранжируются по подписям в NumPy.
+
+Подписи считаются пачками в NumPy (``build_signatures``) и
+пересчитываются после коммита, когда меняются строки плана.
+"""
+import numpy as np
+from django.db import transaction
+from django.db.models import Count
+
+from foodgram.transactions import defer_on_commit
+
+SIGNATURE_SIZE = 64
+BANDS = 16
+ROWS = SIGNATURE_SIZE // BANDS
+# Простое Мерсенна 2**31 - 1: a * x + b не переполняет uint64.
+PRIME = (1 << 31) - 1
+RANDOM_SEED = 20240611
+# Кандидатов с наибольшим числом общих корзин, которые сравниваются.
+MAX_CANDIDATES = 500
+BATCH_SIZE = 5000
+
+_rng = np.random.default_rng(RANDOM_SEED)
+_A = _rng.integers(1, PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+_B = _rng.integers(0, PRIME, SIGNATURE_SIZE, dtype=np.uint64)
+# Нечётные множители для хэша полосы; номер полосы входит в хэш, так что
+# корзины разных полос не пересекаются.
+_BAND_MULTIPLIERS = _rng.integers(
+    1, 1 << 62, (BANDS, ROWS), dtype=np.uint64
+) | np.uint64(1)
+_BAND_SALTS = _rng.integers(0, 1 << 62, BANDS, dtype=np.uint64)
+
+
+def build_signatures(plan_ids, exercise_ids):
+    """Подписи планов по парам (план, упражнение) одним проходом NumPy.
+
+    Возвращает (id планов по возрастанию, матрица ``len × SIGNATURE_SIZE``
+    uint32).
+    """
+    plan_ids = np.asarray(plan_ids, dtype=np.int64)
+    exercise_ids = np.asarray(exercise_ids, dtype=np.uint64)
+    if not len(plan_ids):
+        return plan_ids, np.empty((0, SIGNATURE_SIZE), dtype=np.uint32)
+    order = np.argsort(plan_ids, kind="stable")
+    plan_ids, exercise_ids = plan_ids[order], exercise_ids[order]
+    hashes = (exercise_ids[:, None] * _A + _B) % np.uint64(PRIME)
+    starts = np.flatnonzero(np.r_[True, plan_ids[1:] != plan_ids[:-1]])
+    signatures = np.minimum.reduceat(hashes, starts, axis=0)
+    return plan_ids[starts], signatures.astype(np.uint32)
+
+
+def band_buckets(signatures):
+    """Корзины LSH: матрица ``len × BANDS`` int64."""
+    bands = signatures.astype(np.uint64).reshape(-1, BANDS, ROWS)
+    buckets = (bands * _BAND_MULTIPLIERS).sum(axis=2) + _BAND_SALTS
+    # Старший бит отбрасывается: значение помещается в BigIntegerField.
+    return (buckets >> np.uint64(1)).astype(np.int64)
+
+
+def _pairs(items):
+    """Столбцы (id плана, id упражнения) строк планов."""
+    pairs = np.array(
+        items.values_list("workout_plan_id", "exercise_id"), dtype=np.int64
+    ).reshape(-1, 2)
+    return pairs[:, 0], pairs[:, 1]
+
+
+def _store(plan_ids, signatures):
+    from .models import WorkoutPlanBucket, WorkoutPlanSignature
+
+    WorkoutPlanSignature.objects.bulk_create([
+        WorkoutPlanSignature(workout_plan_id=plan_id, signature=row.tobytes())
+        for plan_id, row in zip(plan_ids.tolist(), signatures)
+    ])
+    WorkoutPlanBucket.objects.bulk_create([
+        WorkoutPlanBucket(workout_plan_id=plan_id, bucket=bucket)
+        for plan_id, row in zip(plan_ids.tolist(), band_buckets(signatures))
+        for bucket in row.tolist()
+    ])
+
+
+def refresh_signatures(plan_ids):
+    """Пересчитывает подписи и корзины планов ``plan_ids``."""
+    from .models import (
+        WorkoutPlanBucket,
+        WorkoutPlanExercise,
+        WorkoutPlanSignature,
+    )
+
+    plan_ids = sorted(set(plan_ids))
+    if not plan_ids:
+        return
+    with transaction.atomic():
+        WorkoutPlanBucket.objects.filter(workout_plan_id__in=plan_ids).delete()
+        WorkoutPlanSignature.objects.filter(
+            workout_plan_id__in=plan_ids
+        ).delete()
+        _store(*build_signatures(*_pairs(WorkoutPlanExercise.objects.filter(
+            workout_plan_id__in=plan_ids,
+        ))))
+
+
+def schedule_refresh(plan_ids):
+    """``refresh_signatures`` после коммита, одним вызовом на транзакцию."""
+    defer_on_commit(refresh_signatures, plan_ids)
+
+
+def rebuild():
+    """Подписи всех планов заново, пачками по ``BATCH_SIZE`` планов."""
+    from .models import (
+        WorkoutPlan,
+        WorkoutPlanBucket,
+        WorkoutPlanExercise,
+        WorkoutPlanSignature,
+    )
+
+    WorkoutPlanBucket.objects.all().delete()
+    WorkoutPlanSignature.objects.all().delete()
+    plan_ids = list(
+        WorkoutPlan.objects.order_by("id").values_list("id", flat=True)
+    )
+    for start in range(0, len(plan_ids), BATCH_SIZE):
+        batch = plan_ids[start:start + BATCH_SIZE]
+        _store(*build_signatures(*_pairs(WorkoutPlanExercise.objects.filter(
+            workout_plan_id__gte=batch[0], workout_plan_id__lte=batch[-1],
+        ))))
+
+
+def similar_plan_ids(plan_id, limit):
+    """До ``limit`` id похожих планов, от самого похожего.
+
+    ``None``, если у плана нет подписи (нет упражнений или она ещё не
+    посчитана).
+    """
+    from .models import WorkoutPlanBucket, WorkoutPlanSignature
+
+    signature = WorkoutPlanSignature.objects.filter(
+        workout_plan_id=plan_id
+    ).values_list("signature", flat=True).first()
+    if signature is None:
+        return None
+    signature = np.frombuffer(signature, dtype=np.uint32)
+    candidates = list(
+        WorkoutPlanBucket.objects.filter(
+            bucket__in=band_buckets(signature[None, :])[0].tolist(),
+        ).exclude(workout_plan_id=plan_id).values("workout_plan_id").annotate(
+            hits=Count("id")
+        ).order_by("-hits", "workout_plan_id").values_list(
+            "workout_plan_id", flat=True
+        )[:MAX_CANDIDATES]
+    )
+    if not candidates:
+        return []
+    rows = list(WorkoutPlanSignature.objects.filter(
+        workout_plan_id__in=candidates
+    ).values_list("workout_plan_id", "signature"))
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    matrix = np.frombuffer(
+        b"".join(bytes(row[1]) for row in rows), dtype=np.uint32
+    ).reshape(-1, SIGNATURE_SIZE)
+    scores = (matrix == signature).mean(axis=1)
+    # По убыванию сходства, при равенстве — по id.
+    order = np.lexsort((ids, -scores))[:limit]
+    return ids[order].tolist()
@@ -1,3 +1,914 @@
-from django.test import TestCase
+import base64
+import binascii
+import io
+import os
+import random
+import tempfile
+from collections import Counter
+from unittest import mock
 
-# Create your tests here.
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.utils import timezone
+from PIL import Image
+from rest_framework.exceptions import ValidationError
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from const import photo
+from const.errors import ERROR_MESSAGES
+from exercises.models import Exercise
+from foodgram.importing import BatchWriter
+from foodgram.renderers import ORJSONRenderer
+from users.models import Follow, User
+
+from . import analytics, facets, feed, recommendations
+from .importing import WorkoutPlanExerciseImporter
+from .models import (
+    FacetCount,
+    Favorite,
+    PlanNeighbour,
+    TimelineEntry,
+    WorkoutPlan,
+    WorkoutPlanExercise,
+    WorkoutPlanFacet,
+)
+from .read_serializer import (
+    FIELDS,
+    WorkoutPlanReadSerializer,
+    columns,
+)
+from .serializers import WorkoutPlanSerializer
+
+
+def stored_neighbours():
+    return sorted(PlanNeighbour.objects.values_list(
+        "workout_plan_id", "neighbour_id", "weight"
+    ))
+
+
+class RecommendationsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.users = [
+            User.objects.create_user(
+                email=f"user{index}@example.com",
+                username=f"user{index}",
+                password="password",
+            )
+            for index in range(6)
+        ]
+        cls.plans = [
+            WorkoutPlan.objects.create(
+                name=f"План {index}",
+                author=cls.users[0],
+                description="Описание",
+                duration=30,
+                image="workout_plans_photo/plan.png",
+            )
+            for index in range(8)
+        ]
+
+    def favorite(self, user, plan):
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.create(user=user, workout_plan=plan)
+
+    def unfavorite(self, user, plan):
+        with self.captureOnCommitCallbacks(execute=True):
+            Favorite.objects.get(user=user, workout_plan=plan).delete()
+
+    def rebuilt_neighbours(self):
+        """Соседи после полной пересборки; таблица возвращается как была."""
+        stored = stored_neighbours()
+        recommendations.rebuild()
+        rebuilt = stored_neighbours()
+        PlanNeighbour.objects.all().delete()
+        PlanNeighbour.objects.bulk_create(
+            PlanNeighbour(workout_plan_id=plan_id, neighbour_id=other_id,
+                          weight=weight)
+            for plan_id, other_id, weight in stored
+        )
+        return rebuilt
+
+    def test_cooccurrence(self):
+        plans, matrix = recommendations.cooccurrence(
+            [1, 1, 2, 2, 2, 3], [10, 20, 10, 20, 30, 30]
+        )
+        self.assertEqual(plans.tolist(), [10, 20, 30])
+        self.assertEqual(
+            matrix.toarray().tolist(), [[0, 2, 1], [2, 0, 1], [1, 1, 0]]
+        )
+        self.assertEqual(
+            list(recommendations.top_neighbours(plans, matrix, limit=1)),
+            [(10, 20, 2), (20, 10, 2), (30, 10, 1)],
+        )
+
+    def test_rebuild_without_favorites(self):
+        PlanNeighbour.objects.create(
+            workout_plan=self.plans[0], neighbour=self.plans[1], weight=1
+        )
+        self.assertEqual(recommendations.rebuild(), 0)
+        self.assertFalse(PlanNeighbour.objects.exists())
+
+    def test_incremental_updates_match_rebuild(self):
+        rng = random.Random(0)
+        for _ in range(60):
+            user, plan = rng.choice(self.users), rng.choice(self.plans)
+            if Favorite.objects.filter(user=user, workout_plan=plan).exists():
+                self.unfavorite(user, plan)
+            else:
+                self.favorite(user, plan)
+            self.assertEqual(stored_neighbours(), self.rebuilt_neighbours())
+
+    def test_changes_in_one_transaction(self):
+        self.favorite(self.users[0], self.plans[0])
+        self.favorite(self.users[1], self.plans[0])
+        with self.captureOnCommitCallbacks(execute=True):
+            for plan in self.plans[1:4]:
+                Favorite.objects.create(user=self.users[0], workout_plan=plan)
+            Favorite.objects.create(
+                user=self.users[1], workout_plan=self.plans[1]
+            )
+            Favorite.objects.get(
+                user=self.users[1], workout_plan=self.plans[0]
+            ).delete()
+        self.assertEqual(stored_neighbours(), self.rebuilt_neighbours())
+
+    def test_removing_all_favorites_drops_pairs(self):
+        self.favorite(self.users[0], self.plans[0])
+        self.favorite(self.users[0], self.plans[1])
+        self.assertEqual(PlanNeighbour.objects.count(), 2)
+        self.unfavorite(self.users[0], self.plans[1])
+        self.assertFalse(PlanNeighbour.objects.exists())
+
+    def test_trim_keeps_heaviest_neighbours(self):
+        with mock.patch.object(recommendations, "NEIGHBOURS", 2):
+            for user in self.users[:3]:
+                self.favorite(user, self.plans[0])
+                self.favorite(user, self.plans[1])
+            for user in self.users[:2]:
+                self.favorite(user, self.plans[2])
+            for plan in self.plans[3:6]:
+                self.favorite(self.users[0], plan)
+            counts = Counter(PlanNeighbour.objects.values_list(
+                "workout_plan_id", flat=True
+            ))
+            self.assertLessEqual(max(counts.values()), 2)
+            self.assertEqual(
+                list(PlanNeighbour.objects.filter(
+                    workout_plan=self.plans[0],
+                ).order_by("-weight", "neighbour_id").values_list(
+                    "neighbour_id", "weight"
+                )),
+                [(self.plans[1].id, 3), (self.plans[2].id, 2)],
+            )
+            # Без выпавших раньше пар инкремент совпадает с пересборкой.
+            favorites = list(Favorite.objects.values_list(
+                "user_id", "workout_plan_id"
+            ))
+            plans, matrix = recommendations.cooccurrence(
+                [user_id for user_id, _ in favorites],
+                [plan_id for _, plan_id in favorites],
+            )
+            self.assertEqual(stored_neighbours(), sorted(
+                recommendations.top_neighbours(plans, matrix, limit=2)
+            ))
+
+    def test_recommended_endpoint(self):
+        for user, plans in (
+            (self.users[1], self.plans[:3]),
+            (self.users[2], self.plans[:2] + self.plans[3:4]),
+            (self.users[3], self.plans[:1]),
+        ):
+            for plan in plans:
+                self.favorite(user, plan)
+        client = APIClient()
+        client.force_authenticate(self.users[3])
+        response = client.get("/api/workout-plans/recommended/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [plan["id"] for plan in response.json()],
+            [plan.id for plan in self.plans[1:4]],
+        )
+
+
+class ReadSerializerTests(TestCase):
+    """``WorkoutPlanReadSerializer`` — копия ``WorkoutPlanSerializer``
+    для чтения; ответы должны совпадать байт в байт."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="author@example.com",
+            username="author",
+            password="password",
+            first_name="Имя",
+            last_name="Фамилия",
+            avatar="avatar_photos/author.png",
+            avatar_variants={
+                "source": "avatar_photos/author.png",
+                "items": [{
+                    "width": 160,
+                    "format": "webp",
+                    "name": "thumbnails/160/avatar_photos/author.webp",
+                }],
+            },
+        )
+        exercises = [
+            Exercise.objects.create(
+                name=name, muscle_group=group, difficulty=difficulty
+            )
+            for name, group, difficulty in (
+                ("Приседания", "Ноги", "beginner"),
+                ("Жим лёжа", "Грудь", "advanced"),
+            )
+        ]
+        cls.plans = []
+        for index, description in enumerate((
+            "Обычный план",
+            "Кавычки \" и \\, разделители \u2028 \u2029, эмодзи 💪",
+        )):
+            plan = WorkoutPlan.objects.create(
+                name=f"План {index}",
+                author=cls.user,
+                description=description,
+                duration=30 + index,
+                image="workout_plans_photo/plan.png",
+                image_variants={
+                    "source": "workout_plans_photo/plan.png",
+                    "items": [{
+                        "width": 320,
+                        "format": "webp",
+                        "name": "thumbnails/320/workout_plans_photo/plan.webp",
+                    }],
+                } if index else {},
+            )
+            for exercise, sets in zip(exercises[index:], (3, 5)):
+                WorkoutPlanExercise.objects.create(
+                    workout_plan=plan, exercise=exercise, sets=sets, reps=10
+                )
+            cls.plans.append(plan)
+        Favorite.objects.create(user=cls.user, workout_plan=cls.plans[1])
+
+    def render_both(self, user):
+        request = Request(APIRequestFactory().get("/api/workout-plans/"))
+        request.user = user
+        context = {"request": request}
+        plans = WorkoutPlan.objects.annotate_favorited(user).order_by("id")
+        expected = WorkoutPlanSerializer(
+            plans.with_items(), many=True, context=context
+        ).data
+        actual = WorkoutPlanReadSerializer(
+            plans.values(*columns(FIELDS)), many=True, context=context
+        ).data
+        renderer = ORJSONRenderer()
+        return renderer.render(actual), renderer.render(expected)
+
+    def test_fields_match(self):
+        self.assertEqual(FIELDS, WorkoutPlanSerializer.Meta.fields)
+
+    def test_same_bytes(self):
+        self.assertEqual(*self.render_both(self.user))
+
+    def test_same_bytes_anonymous(self):
+        self.assertEqual(*self.render_both(None))
+
+
+class AnalyticsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com", username="user", password="password",
+        )
+        cls.exercises = [
+            Exercise.objects.create(
+                name=name, muscle_group=group, difficulty="beginner"
+            )
+            for name, group in (("Приседания", "Ноги"), ("Жим", "Грудь"))
+        ]
+        cls.plans = [
+            WorkoutPlan.objects.create(
+                name=f"План {index}",
+                author=cls.user,
+                description="Описание",
+                duration=30,
+                image="workout_plans_photo/plan.png",
+            )
+            for index in range(3)
+        ]
+        for plan, exercise in zip(cls.plans, cls.exercises * 2):
+            WorkoutPlanExercise.objects.create(
+                workout_plan=plan, exercise=exercise, sets=3, reps=10
+            )
+
+    def test_import_invalidates_cached_rows(self):
+        plan, exercise = self.plans[0], self.exercises[1]
+        self.assertEqual(len(analytics.plan_rows([plan.id])[plan.id]), 1)
+        WorkoutPlanExerciseImporter(BatchWriter(use_copy=False)).run([{
+            "model": "workout_plans.workoutplanexercise",
+            "workout_plan": plan.id,
+            "exercise": exercise.id,
+            "sets": 2,
+            "reps": 5,
+        }])
+        self.assertEqual(
+            sorted(analytics.plan_rows([plan.id])[plan.id]),
+            [("Грудь", "beginner", 2, 5, 10), ("Ноги", "beginner", 3, 10, 30)],
+        )
+
+    def test_favorites_profile_in_batches(self):
+        for plan in self.plans:
+            Favorite.objects.create(user=self.user, workout_plan=plan)
+        client = APIClient()
+        client.force_authenticate(self.user)
+        with mock.patch.object(analytics, "MAX_PLANS", 2):
+            response = client.get("/api/workout-plans/favorites/analytics/")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["plans"], 3)
+        self.assertEqual(
+            response.json()["total"], {"sets": 9, "reps": 30, "volume": 90}
+        )
+
+
+class FacetCountTests(TestCase):
+    """Счётчики ``FacetCount`` после приращений равны полной пересборке."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com", username="user", password="password",
+        )
+        cls.exercises = [
+            Exercise.objects.create(
+                name=name, muscle_group=group, difficulty=difficulty
+            )
+            for name, group, difficulty in (
+                ("Приседания", "Ноги", "beginner"),
+                ("Жим лёжа", "Грудь", "advanced"),
+                ("Подтягивания", "Спина", "beginner"),
+            )
+        ]
+
+    def stored(self):
+        return (
+            sorted(FacetCount.objects.filter(count__gt=0).values_list(
+                "facet", "value", "count"
+            )),
+            sorted(WorkoutPlanFacet.objects.values_list(
+                "workout_plan_id", "facet", "value"
+            )),
+        )
+
+    def assertMatchesRebuild(self):
+        stored = self.stored()
+        facets.rebuild()
+        self.assertEqual(stored, self.stored())
+
+    def create_plan(self, duration, exercises):
+        with self.captureOnCommitCallbacks(execute=True):
+            plan = WorkoutPlan.objects.create(
+                name="План",
+                author=self.user,
+                description="Описание",
+                duration=duration,
+                image="workout_plans_photo/plan.png",
+                image_variants={
+                    "source": "workout_plans_photo/plan.png", "items": [],
+                },
+            )
+            for exercise in exercises:
+                WorkoutPlanExercise.objects.create(
+                    workout_plan=plan, exercise=exercise, sets=3, reps=10
+                )
+        return plan
+
+    def test_counts_match_rebuild(self):
+        plan = self.create_plan(45, self.exercises[:2])
+        other = self.create_plan(95, self.exercises[1:])
+        self.assertMatchesRebuild()
+
+        item = plan.exercises_items.get(exercise=self.exercises[1])
+        with self.captureOnCommitCallbacks(execute=True):
+            item.exercise = self.exercises[2]
+            item.save()
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            plan.duration = 100
+            plan.save(update_fields=["duration"])
+        self.assertMatchesRebuild()
+
+        exercise = self.exercises[2]
+        with self.captureOnCommitCallbacks(execute=True):
+            exercise.muscle_group = "Кор"
+            exercise.save()
+        self.assertMatchesRebuild()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            other.delete()
+        self.assertMatchesRebuild()
+        self.assertFalse(FacetCount.objects.filter(
+            facet=facets.MUSCLE_GROUP, value="Грудь", count__gt=0,
+        ).exists())
+
+
+class SearchTests(TestCase):
+    """Поиск работает на любой СУБД: GIN-индекс есть только на
+    PostgreSQL, иначе — подстрочный поиск по ``search_document``."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com", username="user", password="password",
+        )
+        squat = Exercise.objects.create(
+            name="Приседания", muscle_group="Ноги", difficulty="beginner"
+        )
+        cls.plans = []
+        for name in ("Силовой день", "Растяжка"):
+            cls.plans.append(WorkoutPlan.objects.create(
+                name=name,
+                author=cls.user,
+                description="Описание",
+                duration=30,
+                image="workout_plans_photo/plan.png",
+            ))
+        with cls.captureOnCommitCallbacks(execute=True):
+            WorkoutPlanExercise.objects.create(
+                workout_plan=cls.plans[0], exercise=squat, sets=3, reps=10
+            )
+
+    def search(self, query):
+        response = APIClient().get(
+            "/api/workout-plans/", {"search": query, "fields": "id"}
+        )
+        self.assertEqual(response.status_code, 200)
+        return [plan["id"] for plan in response.json()["results"]]
+
+    def test_search_by_name_and_exercise(self):
+        self.assertEqual(self.search("растяжка"), [self.plans[1].id])
+        self.assertEqual(self.search("присед"), [self.plans[0].id])
+        self.assertEqual(self.search("бег"), [])
+
+    def test_gin_index_only_on_postgresql(self):
+        with connection.cursor() as cursor:
+            constraints = connection.introspection.get_constraints(
+                cursor, WorkoutPlan._meta.db_table
+            )
+        self.assertEqual(
+            "workout_plan_search_gin_idx" in constraints,
+            connection.vendor == "postgresql",
+        )
+
+
+class ExerciseSyncTests(TestCase):
+    """PATCH с упражнениями переписывает только разницу строк плана,
+    а поисковый документ обновляет сигнал сохранения плана."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com", username="user", password="password",
+        )
+        cls.exercises = [
+            Exercise.objects.create(
+                name=name, muscle_group="Ноги", difficulty="beginner"
+            )
+            for name in ("Приседания", "Выпады", "Становая тяга", "Бёрпи")
+        ]
+        cls.plan = WorkoutPlan.objects.create(
+            name="Силовой день",
+            author=cls.user,
+            description="Описание",
+            duration=30,
+            image="workout_plans_photo/plan.png",
+            # Файла нет: копии считаются уже построенными.
+            image_variants={
+                "source": "workout_plans_photo/plan.png", "items": [],
+            },
+        )
+        cls.items = WorkoutPlanExercise.objects.bulk_create(
+            WorkoutPlanExercise(
+                workout_plan=cls.plan, exercise=exercise, sets=3, reps=10
+            )
+            for exercise in cls.exercises[:3]
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def test_patch_writes_only_the_difference(self):
+        kept, changed, removed = self.items
+        added = self.exercises[3]
+        bulk_update = WorkoutPlanExercise.objects.bulk_update
+        with mock.patch.object(
+            WorkoutPlanExercise.objects, "bulk_update", wraps=bulk_update,
+        ) as patched, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(
+                f"/api/workout-plans/{self.plan.id}/",
+                {"exercises": [
+                    {"id": kept.exercise_id, "sets": 3, "reps": 10},
+                    {"id": changed.exercise_id, "sets": 5, "reps": 8},
+                    {"id": added.id, "sets": 2, "reps": 15},
+                ]},
+                format="json",
+            )
+        self.assertEqual(response.status_code, 200)
+
+        patched.assert_called_once()
+        self.assertEqual([item.id for item in patched.call_args.args[0]],
+                         [changed.id])
+        rows = {
+            item.exercise_id: item
+            for item in WorkoutPlanExercise.objects.filter(
+                workout_plan=self.plan
+            )
+        }
+        self.assertEqual(
+            set(rows), {kept.exercise_id, changed.exercise_id, added.id}
+        )
+        self.assertEqual(
+            (rows[kept.exercise_id].id, rows[kept.exercise_id].sets,
+             rows[kept.exercise_id].reps),
+            (kept.id, 3, 10),
+        )
+        self.assertEqual(
+            (rows[changed.exercise_id].id, rows[changed.exercise_id].sets,
+             rows[changed.exercise_id].reps),
+            (changed.id, 5, 8),
+        )
+        self.assertFalse(
+            WorkoutPlanExercise.objects.filter(id=removed.id).exists()
+        )
+
+        self.plan.refresh_from_db()
+        document = self.plan.search_document.lower()
+        self.assertIn("бёрпи", document)
+        self.assertNotIn("становая", document)
+
+
+def image_data_uri(image_format, size=(400, 200)):
+    buffer = io.BytesIO()
+    Image.new("RGB", size, "red").save(buffer, image_format)
+    encoded = base64.b64encode(buffer.getvalue()).decode()
+    return f"data:image/{image_format.lower()};base64,{encoded}"
+
+
+class ThumbnailTests(TestCase):
+    """Загрузки называются ``photo.<ext>``: копии разных планов не должны
+    совпадать и удаляться друг у друга."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com", username="user", password="password",
+        )
+        cls.exercise = Exercise.objects.create(
+            name="Приседания", muscle_group="Ноги", difficulty="beginner"
+        )
+
+    def setUp(self):
+        media = tempfile.TemporaryDirectory()
+        self.addCleanup(media.cleanup)
+        settings = override_settings(
+            MEDIA_ROOT=media.name, THUMBNAIL_WORKERS=0
+        )
+        settings.enable()
+        self.addCleanup(settings.disable)
+        self.media_root = media.name
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def upload(self, image, plan=None):
+        payload = {"image": image}
+        with self.captureOnCommitCallbacks(execute=True):
+            if plan is None:
+                response = self.client.post("/api/workout-plans/", {
+                    **payload,
+                    "name": f"План {WorkoutPlan.objects.count()}",
+                    "description": "Описание",
+                    "duration": 30,
+                    "exercises": [
+                        {"id": self.exercise.id, "sets": 3, "reps": 10}
+                    ],
+                }, format="json")
+            else:
+                response = self.client.patch(
+                    f"/api/workout-plans/{plan.id}/", payload, format="json"
+                )
+        self.assertIn(response.status_code, (200, 201), response.content)
+        return WorkoutPlan.objects.get(pk=response.json()["id"])
+
+    def variants(self, plan):
+        return {item["name"] for item in plan.image_variants["items"]}
+
+    def existing(self, names):
+        return {
+            name for name in names
+            if os.path.exists(os.path.join(self.media_root, name))
+        }
+
+    def test_same_basename_does_not_share_variants(self):
+        first = self.upload(image_data_uri("PNG"))
+        second = self.upload(image_data_uri("JPEG"))
+        for plan in (first, second):
+            self.assertTrue(
+                os.path.basename(plan.image.name).startswith("photo")
+            )
+        first_variants, second_variants = (
+            self.variants(first), self.variants(second)
+        )
+        self.assertTrue(first_variants)
+        self.assertFalse(first_variants & second_variants)
+
+        first = self.upload(image_data_uri("PNG", (200, 100)), first)
+        self.assertEqual(
+            self.existing(self.variants(first)), self.variants(first)
+        )
+        self.assertEqual(self.existing(second_variants), second_variants)
+        self.assertEqual(self.existing(first_variants), set())
+
+
+class ImportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author, cls.reader = (
+            User.objects.create_user(
+                email=f"{name}@example.com", username=name,
+                password="password",
+            )
+            for name in ("author", "reader")
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def load_csv(self, text):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "plans.csv")
+        with open(path, "w", encoding="utf-8") as fp:
+            fp.write(text)
+        call_command("load_workout_plans", path, stdout=io.StringIO())
+
+    def test_csv_authors_and_feed(self):
+        self.load_csv(
+            "name,description,duration,author\n"
+            f"Свой автор,Описание,30,{self.author.id}\n"
+            "Без автора,Описание,30,\n"
+            "Чужой id,Описание,30,999999\n"
+            "Плохой id,Описание,30,abc\n"
+            "Плохая длительность,Описание,долго,\n"
+        )
+        self.assertEqual(
+            dict(WorkoutPlan.objects.values_list("name", "author__username")),
+            {
+                "Свой автор": "author",
+                "Без автора": "admin",
+                "Чужой id": "admin",
+            },
+        )
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader).values_list(
+                "workout_plan__name", flat=True
+            )),
+            ["Свой автор"],
+        )
+
+
+class KeysetCursorTests(TestCase):
+    """``?cursor=``: обход в обе стороны без пропусков и повторов при
+    одинаковом ``created_at``, некорректный курсор — 404."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
+            email="user@example.com", username="user", password="password",
+        )
+        for index in range(7):
+            WorkoutPlan.objects.create(
+                name=f"План {index}",
+                author=cls.user,
+                description="Описание",
+                duration=30,
+                image="workout_plans_photo/plan.png",
+            )
+        # Три группы с одинаковым временем создания.
+        moment = timezone.now()
+        plan_ids = list(
+            WorkoutPlan.objects.order_by("id").values_list("id", flat=True)
+        )
+        for offset, group in enumerate(
+            (plan_ids[:3], plan_ids[3:6], plan_ids[6:])
+        ):
+            WorkoutPlan.objects.filter(id__in=group).update(
+                created_at=moment + timezone.timedelta(seconds=offset)
+            )
+        cls.expected = list(WorkoutPlan.objects.order_by(
+            "-created_at", "-id"
+        ).values_list("id", flat=True))
+
+    def get(self, url):
+        response = APIClient().get(url)
+        self.assertEqual(response.status_code, 200, response.content)
+        return response.json()
+
+    def test_walk_forward_and_back(self):
+        pages = []
+        url = "/api/workout-plans/?cursor=&limit=2&fields=id"
+        while url:
+            data = self.get(url)
+            pages.append([plan["id"] for plan in data["results"]])
+            url = data["next"]
+        self.assertEqual(sum(pages, []), self.expected)
+        self.assertIsNone(data["next"])
+
+        walked_back = [pages[-1]]
+        url = data["previous"]
+        while url:
+            data = self.get(url)
+            walked_back.append([plan["id"] for plan in data["results"]])
+            url = data["previous"]
+        self.assertEqual(walked_back[::-1], pages)
+
+    def test_invalid_cursor(self):
+        valid = self.get("/api/workout-plans/?cursor=&limit=2")["next"]
+        encoded = valid.split("cursor=")[1].split("&")[0]
+        payloads = [
+            "not-base64!",
+            base64.urlsafe_b64encode(b"not json").decode(),
+            base64.urlsafe_b64encode(b'{"p": [1]}').decode(),
+            base64.urlsafe_b64encode(b'{"p": ["soon", 1]}').decode(),
+            base64.urlsafe_b64encode(b'{"p": "ab"}').decode(),
+            encoded[:-3],
+        ]
+        for cursor in payloads:
+            with self.subTest(cursor=cursor):
+                response = APIClient().get(
+                    "/api/workout-plans/", {"cursor": cursor}
+                )
+                self.assertEqual(response.status_code, 404)
+
+
+class Base64DecodeTests(TestCase):
+    """Потоковое декодирование base64 из ``const.photo``: данные приходят
+    от клиента как есть."""
+
+    def decode(self, encoded, chunk_size):
+        return b"".join(
+            photo.iter_base64_chunks(encoded, 0, chunk_size=chunk_size)
+        )
+
+    def test_whitespace_and_padding_across_chunks(self):
+        for raw in (b"", b"a", b"ab", b"abc", bytes(range(256)) * 3):
+            encoded = base64.b64encode(raw).decode()
+            spaced = "\n".join(
+                encoded[start:start + 5]
+                for start in range(0, len(encoded), 5)
+            )
+            # Пробел и перевод строки внутри паддинга «==».
+            spaced = spaced.replace("==", "= \r\n=")
+            for chunk_size in range(1, 10):
+                with self.subTest(raw=raw[:8], chunk_size=chunk_size):
+                    self.assertEqual(self.decode(encoded, chunk_size), raw)
+                    self.assertEqual(self.decode(spaced, chunk_size), raw)
+
+    def test_invalid_data_rejected(self):
+        for encoded in ("QQ", "QQ=", "QQ==QQ==", "QQ=A", "Q!==", "QUJD-A=="):
+            for chunk_size in (1, 3, 4, 64):
+                with self.subTest(encoded=encoded, chunk_size=chunk_size):
+                    with self.assertRaises(binascii.Error):
+                        self.decode(encoded, chunk_size)
+
+    def assertRejected(self, data, message):
+        with self.assertRaises(ValidationError) as context:
+            photo.ImageField().to_internal_value(data)
+        self.assertEqual(context.exception.detail, [message])
+
+    def test_image_field(self):
+        image = image_data_uri("PNG")
+        header, encoded = image.split(",", 1)
+        wrapped = "\n".join(
+            encoded[start:start + 76] for start in range(0, len(encoded), 76)
+        )
+        upload = photo.ImageField().to_internal_value(f"{header},{wrapped}")
+        self.assertEqual(upload.read(), base64.b64decode(encoded))
+
+        self.assertRejected(
+            f"{header},{encoded[:-2]}!!", ERROR_MESSAGES["invalid_base64_data"]
+        )
+        self.assertRejected(
+            f"{header},{encoded}QQ", ERROR_MESSAGES["invalid_base64_data"]
+        )
+        self.assertRejected(image.split(",", 1)[1], ERROR_MESSAGES[
+            "invalid_base64"
+        ])
+        self.assertRejected(
+            "data:image/png;base64," + base64.b64encode(b"text" * 4).decode(),
+            ERROR_MESSAGES["invalid_image_format"],
+        )
+        with mock.patch.object(photo, "MAX_IMAGE_SIZE", 64):
+            # Отсекается по длине строки, до декодирования.
+            with mock.patch.object(photo.ImageField, "_decode") as decode:
+                self.assertRejected(image, ERROR_MESSAGES["image_too_large"])
+            decode.assert_not_called()
+            # Оценка по длине завышена пробелами: точный размер после
+            # декодирования тоже проверяется.
+            small = base64.b64encode(
+                base64.b64decode(encoded)[:8] + bytes(80)
+            ).decode()
+            self.assertRejected(
+                f"{header},{small}", ERROR_MESSAGES["image_too_large"]
+            )
+
+
+class FeedTests(TestCase):
+    """Лента: раскладка по ``TimelineEntry`` и чтение автора напрямую."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.reader, cls.author, cls.star, cls.fan = (
+            User.objects.create_user(
+                email=f"{name}@example.com", username=name,
+                password="password",
+            )
+            for name in ("reader", "author", "star", "fan")
+        )
+
+    def setUp(self):
+        patcher = mock.patch.object(feed, "FANOUT_MAX_FOLLOWERS", 1)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.client = APIClient()
+        self.client.force_authenticate(self.reader)
+
+    def follow(self, user, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.create(user=user, author=author)
+
+    def unfollow(self, user, author):
+        with self.captureOnCommitCallbacks(execute=True):
+            Follow.objects.get(user=user, author=author).delete()
+
+    def publish(self, author, name):
+        with self.captureOnCommitCallbacks(execute=True):
+            return WorkoutPlan.objects.create(
+                name=name,
+                author=author,
+                description="Описание",
+                duration=30,
+                image="workout_plans_photo/plan.png",
+                image_variants={
+                    "source": "workout_plans_photo/plan.png", "items": [],
+                },
+            )
+
+    def feed_names(self, query=""):
+        names, url = [], f"/api/workout-plans/feed/?fields=name{query}"
+        while url:
+            response = self.client.get(url)
+            self.assertEqual(response.status_code, 200, response.content)
+            names += [plan["name"] for plan in response.json()["results"]]
+            url = response.json()["next"]
+        return names
+
+    def timeline(self):
+        return set(TimelineEntry.objects.filter(user=self.reader).values_list(
+            "workout_plan__name", flat=True
+        ))
+
+    def test_push_and_pull(self):
+        self.publish(self.author, "a1")
+        self.follow(self.reader, self.author)
+        self.follow(self.reader, self.star)
+        self.follow(self.fan, self.star)
+        self.publish(self.star, "s1")
+        self.publish(self.author, "a2")
+        self.publish(self.star, "s2")
+
+        self.assertEqual(self.timeline(), {"a1", "a2"})
+        self.assertTrue(User.objects.get(pk=self.star.pk).feed_pull)
+        expected = ["s2", "a2", "s1", "a1"]
+        self.assertEqual(self.feed_names("&limit=3"), expected)
+        self.assertEqual(self.feed_names("&cursor=&limit=3"), expected)
+
+    def test_pull_is_kept_when_followers_drop(self):
+        self.follow(self.reader, self.star)
+        self.follow(self.fan, self.star)
+        self.publish(self.star, "s1")
+        self.unfollow(self.fan, self.star)
+        self.assertEqual(
+            User.objects.get(pk=self.star.pk).followers_count, 1
+        )
+        self.publish(self.star, "s2")
+        self.assertEqual(self.timeline(), set())
+        self.assertEqual(self.feed_names(), ["s2", "s1"])
+
+    def test_pull_after_push_has_no_duplicates(self):
+        self.follow(self.reader, self.star)
+        self.publish(self.star, "s1")
+        self.assertEqual(self.timeline(), {"s1"})
+        self.follow(self.fan, self.star)
+        self.publish(self.star, "s2")
+        self.assertEqual(self.feed_names("&cursor="), ["s2", "s1"])
+        self.assertEqual(self.feed_names(), ["s2", "s1"])
@@ -1,62 +1,228 @@
+from django.db import transaction
 from django.shortcuts import get_object_or_404
-from django.db.models import BooleanField, Exists, OuterRef, Value
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
+from rest_framework.exceptions import NotFound
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
 from django_filters.rest_framework import DjangoFilterBackend
-from rest_framework.filters import SearchFilter
 
 from .models import WorkoutPlan, Favorite, WorkoutPlanShortLink
+from .read_serializer import (
+    FIELDS_CONTEXT_KEY,
+    WorkoutPlanReadSerializer,
+    columns,
+    parse_fields,
+)
 from .serializers import (
-    WorkoutPlanSerializer,
     WorkoutPlanCreateSerializer,
     FavoriteSerializer,
     WorkoutPlanShortLinkSerializer,
 )
-from .filters import WorkoutPlanFilter
-from foodgram.pagination import PageLimitPagination
+from . import analytics, response_cache
+from .facets import facet_counts
+from .similar import similar_plan_ids
+from . import recommendations
+from .feed import Feed
+from .short_links import get_or_create_link
+from .filters import (
+    WorkoutPlanFilter,
+    WorkoutPlanOrderingFilter,
+    WorkoutPlanSearchFilter,
+)
+from foodgram.pagination import PageOrCursorPagination, parse_limit
+
+
+READ_ACTIONS = ("list", "retrieve", "feed", "similar", "recommended")
 
 
 class WorkoutPlanViewSet(viewsets.ModelViewSet):
     queryset = WorkoutPlan.objects.all()
     permission_classes = (IsAuthenticatedOrReadOnly,)
-    filter_backends = (DjangoFilterBackend, SearchFilter)
+    filter_backends = (
+        DjangoFilterBackend,
+        WorkoutPlanSearchFilter,
+        WorkoutPlanOrderingFilter,
+    )
     filterset_class = WorkoutPlanFilter
-    search_fields = ("name", "description", "exercises__name")
-    pagination_class = PageLimitPagination
+    ordering_fields = ("favorites_count", "duration", "created_at")
+    pagination_class = PageOrCursorPagination
+
+    # Ответ собирается без учёта пользователя, чтобы его можно было
+    # положить в общий кэш; is_favorited накладывается после.
+    shared_response = False
+
+    def requested_fields(self):
+        """Поля ответа из ``?fields=`` / ``?omit=`` (только для чтения)."""
+        if not hasattr(self, '_requested_fields'):
+            self._requested_fields = parse_fields(self.request.query_params)
+        return self._requested_fields
 
     def get_queryset(self):
-        qs = WorkoutPlan.objects.select_related("author").prefetch_related(
-            "exercises_items__exercise",
-        )
-        user = self.request.user
-        if user.is_authenticated:
-            return qs.annotate(
-                is_favorited_flag=Exists(
-                    Favorite.objects.filter(
-                        user=user,
-                        workout_plan_id=OuterRef("pk"),
-                    )
-                )
+        if self.action not in READ_ACTIONS:
+            return WorkoutPlan.objects.annotate_favorited(
+                self.request.user
+            ).with_items()
+        fields = self.requested_fields()
+        queryset = WorkoutPlan.objects.all()
+        if 'is_favorited' in fields:
+            queryset = queryset.annotate_favorited(
+                None if self.shared_response else self.request.user
             )
-        return qs.annotate(
-            is_favorited_flag=Value(False, output_field=BooleanField()),
+        # Строки values() для WorkoutPlanReadSerializer: только колонки
+        # запрошенных полей.
+        return queryset.values(*columns(fields))
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        if self.action in READ_ACTIONS:
+            context[FIELDS_CONTEXT_KEY] = self.requested_fields()
+        return context
+
+    def ordered_plans(self, plan_ids):
+        """Строки планов ``plan_ids`` в том же порядке; удалённые
+        пропускаются."""
+        rows = {
+            row['id']: row
+            for row in self.get_queryset().filter(id__in=plan_ids)
+        }
+        return [rows[plan_id] for plan_id in plan_ids if plan_id in rows]
+
+    def ordered_plans_response(self, plan_ids):
+        serializer = self.get_serializer(
+            self.ordered_plans(plan_ids), many=True
         )
+        return Response(serializer.data)
+
+    def list(self, request, *args, **kwargs):
+        if not response_cache.is_cacheable(request):
+            return super().list(request, *args, **kwargs)
+        key = response_cache.list_key(request)
+        data = response_cache.load(key)
+        if data is None:
+            self.shared_response = True
+            data = super().list(request, *args, **kwargs).data
+            response_cache.store(key, data)
+        plans = data["results"] if isinstance(data, dict) else data
+        response_cache.overlay_favorited(plans, request.user)
+        return Response(data)
+
+    def retrieve(self, request, *args, **kwargs):
+        if not response_cache.is_cacheable(request):
+            return super().retrieve(request, *args, **kwargs)
+        key = response_cache.detail_key(request, kwargs[self.lookup_field])
+        data = response_cache.load(key)
+        if data is None:
+            self.shared_response = True
+            data = super().retrieve(request, *args, **kwargs).data
+            response_cache.store(key, data)
+        response_cache.overlay_favorited([data], request.user)
+        return Response(data)
 
     def get_serializer_class(self):
-        if self.action in ("create", "update", "partial_update"):
-            return WorkoutPlanCreateSerializer
-        return WorkoutPlanSerializer
+        if self.action in READ_ACTIONS:
+            return WorkoutPlanReadSerializer
+        return WorkoutPlanCreateSerializer
 
     def perform_create(self, serializer):
         serializer.save(author=self.request.user)
 
+    @action(
+        detail=False,
+        methods=['get'],
+        permission_classes=(IsAuthenticated,)
+    )
+    def feed(self, request):
+        """Планы авторов, на которых подписан пользователь."""
+        page = self.paginate_queryset(Feed(request.user))
+        serializer = self.get_serializer(
+            self.ordered_plans([row['id'] for row in page]), many=True
+        )
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    def similar(self, request, pk=None):
+        """Планы с похожим набором упражнений, от самого похожего."""
+        if not pk.isdigit():
+            raise NotFound()
+        plan_ids = similar_plan_ids(
+            int(pk), parse_limit(request.query_params.get('limit'))
+        )
+        if plan_ids is None:
+            # Подписи нет: плана нет или в нём нет упражнений.
+            get_object_or_404(WorkoutPlan.objects.only('id'), pk=pk)
+            plan_ids = []
+        return self.ordered_plans_response(plan_ids)
+
+    @action(
+        detail=False, methods=['get'], permission_classes=(IsAuthenticated,)
+    )
+    def recommended(self, request):
+        """Планы, которые добавляли в избранное вместе с избранным
+        пользователя, от самого частого соседа."""
+        plan_ids = recommendations.recommended_plan_ids(
+            request.user,
+            parse_limit(request.query_params.get('limit')),
+        )
+        return self.ordered_plans_response(plan_ids)
+
+    @action(
+        detail=True, methods=['get'], url_path='analytics',
+        url_name='analytics',
+    )
+    def plan_analytics(self, request, pk=None):
+        """Подходы, повторения и объём плана по группам мышц и сложности."""
+        rows = analytics.plan_rows([int(pk)]) if pk.isdigit() else {}
+        if not rows:
+            raise NotFound()
+        return Response(analytics.profile(*rows.values()))
+
+    @action(detail=False, methods=['get'], url_path='analytics')
+    def batch_analytics(self, request):
+        """Профили планов из ``?ids=1,2,3`` в порядке запроса."""
+        rows = analytics.plan_rows(
+            analytics.parse_ids(request.query_params.get('ids'))
+        )
+        return Response([
+            {'id': plan_id, **analytics.profile(plan_rows)}
+            for plan_id, plan_rows in rows.items()
+        ])
+
+    @action(
+        detail=False, methods=['get'], url_path='favorites/analytics',
+        permission_classes=(IsAuthenticated,),
+    )
+    def favorites_analytics(self, request):
+        """Суммарный профиль избранных планов пользователя."""
+        rows = list(analytics.batched_rows(
+            Favorite.objects.filter(user=request.user).order_by(
+                'id'
+            ).values_list('workout_plan_id', flat=True)
+        ))
+        return Response({
+            'plans': len(rows),
+            **analytics.profile(
+                row for plan_rows in rows for row in plan_rows
+            ),
+        })
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """Число планов на каждое значение фасета при текущих фильтрах."""
+        params = (*self.filterset_class.base_filters, 'search')
+        if not any(request.query_params.get(name) for name in params):
+            return Response(facet_counts())
+        queryset = WorkoutPlan.objects.all()
+        for backend in (DjangoFilterBackend, WorkoutPlanSearchFilter):
+            queryset = backend().filter_queryset(request, queryset, self)
+        return Response(facet_counts(queryset))
+
     @action(
         detail=True,
         methods=['post', 'delete'],
         permission_classes=(IsAuthenticated,)
     )
+    @transaction.atomic
     def favorite(self, request, pk=None):
         workout_plan = get_object_or_404(WorkoutPlan, pk=pk)
         
@@ -82,10 +248,10 @@ class WorkoutPlanViewSet(viewsets.ModelViewSet):
         permission_classes=(IsAuthenticated,)
     )
     def create_short_link(self, request, pk=None):
-        workout_plan = get_object_or_404(WorkoutPlan, pk=pk)
-        serializer = WorkoutPlanShortLinkSerializer(
-            data={'workout_plan': workout_plan.id}
+        workout_plan = get_object_or_404(WorkoutPlan.objects.only('id'), pk=pk)
+        link, created = get_or_create_link(workout_plan.id)
+        serializer = WorkoutPlanShortLinkSerializer(link)
+        return Response(
+            serializer.data,
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
         )
-        serializer.is_valid(raise_exception=True)
-        serializer.save()
-        return Response(serializer.data, status=status.HTTP_201_CREATED)